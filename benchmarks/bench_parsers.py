@@ -0,0 +1,155 @@
+# benchmarks/bench_parsers.py
+# v1.0.0 (2026-10-17)
+# 保存済みフィクスチャで旧パーサ（html.parser 全体構築）と新パーサ（page_parser）の
+# 出力一致とスループットを比較するベンチマーク。
+#
+# 使い方:
+#   python benchmarks/bench_parsers.py                 # 一致確認 + 計測
+#   python benchmarks/bench_parsers.py --iterations 20
+#   python benchmarks/bench_parsers.py --record epg URL [URL ...]   # 実ページをフィクスチャとして保存
+import os
+import sys
+import glob
+import time
+import hashlib
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from page_parser import HTML_PARSER, make_soup, parse_epg_page, parse_program_detail  # noqa: E402
+
+FIXTURE_DIR = os.path.join(REPO_ROOT, "benchmarks", "fixtures")
+FIXTURE_KINDS = ("epg", "detail", "talent")
+
+# タレントページで参照するブロック（旧実装の検索条件と同じ）
+TALENT_BLOCK_LABELS = ("名前：", "情報：")
+TALENT_DETAIL_IDS = ("ジャンル", "特技", "趣味", "芸歴")
+
+
+def load_fixtures(kind):
+    """フィクスチャを (ファイル名, バイト列) のリストで返す"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, kind, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def talent_blocks(html, parser):
+    """タレントページの名前・情報ブロックと詳細欄のテキストを抽出する（比較用）"""
+    soup = make_soup(html, parser=parser)
+    blocks = {}
+    for label in TALENT_BLOCK_LABELS:
+        element = soup.find("li", string=lambda s, label=label: s and label in s)
+        if not element:
+            span = soup.find("span", string=lambda s, label=label: s and label in s)
+            element = span.parent if span else None
+        blocks[label] = element.get_text() if element else None
+    for key in TALENT_DETAIL_IDS:
+        element = soup.find("p", id=key)
+        if not element:
+            span = soup.find("span", string=lambda s, key=key: s and s.startswith(key))
+            element = span.find_next("p") if span else None
+        blocks[key] = element.get_text().strip() if element else None
+    img = soup.find("img", class_="talent_img")
+    blocks["img"] = img.get("src") if img else None
+    return blocks
+
+
+def _decode(html):
+    return html.decode("utf-8")
+
+
+# kind ごとの (旧実装, 新実装)
+PARSERS = {
+    "epg": (
+        lambda html: parse_epg_page(_decode(html), parser="html.parser", strained=False),
+        lambda html: parse_epg_page(_decode(html)),
+    ),
+    "detail": (
+        lambda html: parse_program_detail(_decode(html), parser="html.parser", strained=False),
+        lambda html: parse_program_detail(_decode(html)),
+    ),
+    "talent": (
+        lambda html: talent_blocks(html, "html.parser"),
+        lambda html: talent_blocks(html, None),
+    ),
+}
+
+
+def check_equivalence(kind, pages):
+    """旧実装と新実装の出力が全ページで一致するか確認する"""
+    old_parse, new_parse = PARSERS[kind]
+    mismatches = []
+    for name, html in pages:
+        if old_parse(html) != new_parse(html):
+            mismatches.append(name)
+    return mismatches
+
+
+def measure(parse, pages, iterations):
+    """ページ/秒 と 1ページあたりのミリ秒を返す"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for _, html in pages:
+            parse(html)
+    elapsed = time.perf_counter() - started
+    count = iterations * len(pages)
+    return count / elapsed, elapsed * 1000 / count
+
+
+def record(kind, urls):
+    """実ページを取得してフィクスチャとして保存する（ネットワーク接続が必要）"""
+    from http_client import create_session
+
+    session = create_session({"User-Agent": "Mozilla/5.0 (fixture recorder)"})
+    os.makedirs(os.path.join(FIXTURE_DIR, kind), exist_ok=True)
+    for url in urls:
+        res = session.get(url, timeout=20)
+        res.raise_for_status()
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        path = os.path.join(FIXTURE_DIR, kind, f"recorded_{name}.html")
+        with open(path, "wb") as f:
+            f.write(res.content)
+        print(f"保存: {url} -> {os.path.relpath(path, REPO_ROOT)}")
+        time.sleep(1.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML パーサのベンチマーク")
+    parser.add_argument("--iterations", type=int, default=10, help="計測の繰り返し回数")
+    parser.add_argument("--record", nargs="+", metavar=("KIND", "URL"),
+                        help="フィクスチャを記録する（KIND は epg / detail / talent）")
+    args = parser.parse_args()
+
+    if args.record:
+        kind, urls = args.record[0], args.record[1:]
+        if kind not in FIXTURE_KINDS or not urls:
+            parser.error("--record KIND URL [URL ...] の形式で指定してください")
+        record(kind, urls)
+        return 0
+
+    print(f"新パーサ: {HTML_PARSER}（SoupStrainer 使用） / 旧パーサ: html.parser（全体構築）")
+    failed = False
+    for kind in FIXTURE_KINDS:
+        pages = load_fixtures(kind)
+        if not pages:
+            print(f"[{kind}] フィクスチャなし")
+            continue
+        mismatches = check_equivalence(kind, pages)
+        old_parse, new_parse = PARSERS[kind]
+        old_pps, old_ms = measure(old_parse, pages, args.iterations)
+        new_pps, new_ms = measure(new_parse, pages, args.iterations)
+        status = "一致" if not mismatches else f"不一致 {len(mismatches)}件: {', '.join(mismatches)}"
+        print(
+            f"[{kind}] {len(pages)}ページ 出力{status}\n"
+            f"    旧: {old_pps:8.1f} pages/s ({old_ms:6.2f} ms/page)\n"
+            f"    新: {new_pps:8.1f} pages/s ({new_ms:6.2f} ms/page)  x{new_pps / old_pps:.2f}"
+        )
+        failed = failed or bool(mismatches)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+# benchmarks/bench_profile_extractor.py
+# v1.0.0 (2026-10-17)
+# profile_extractor（事前コンパイル・1回走査）と旧 _extract_*_fixed（呼び出しごとに正規表現を構築し、
+# 項目ごとに find / find_all する実装）の抽出結果一致と処理時間を、保存済みタレントページで比較する。
+#
+# 使い方:
+#   python benchmarks/bench_profile_extractor.py
+#   python benchmarks/bench_profile_extractor.py --iterations 200
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from page_parser import make_soup  # noqa: E402
+from profile_extractor import extract_profile_fields  # noqa: E402
+
+FIXTURE_DIR = os.path.join(REPO_ROOT, "benchmarks", "fixtures", "talent")
+
+
+# --- v1.2.0 までの TalentProfileScraperFixed の抽出メソッド（比較用にそのまま残した旧実装） ---
+
+
+def legacy_extract_name_info(soup, profile_data):
+    """名前情報を抽出（修正版）"""
+
+    # 修正1: string引数を使用（text引数は非推奨）
+    name_element = soup.find('li', string=re.compile(r'名前：'))
+
+    # 修正2: 見つからない場合はspan検索
+    if not name_element:
+        name_spans = soup.find_all('span', string=re.compile(r'名前：'))
+        if name_spans:
+            name_element = name_spans[0].parent
+
+    # 修正3: より柔軟な名前パターンマッチング
+    if name_element:
+        name_text = name_element.get_text()
+
+        # パターン1: 名前：山之内 すず（ヤマノウチ スズ）
+        name_match = re.search(r'名前[：:]\s*(.+?)（(.+?)）', name_text)
+        if name_match:
+            profile_data['full_name'] = name_match.group(1).strip()
+            profile_data['reading'] = name_match.group(2).strip()
+        else:
+            # パターン2: 名前のみの場合
+            simple_match = re.search(r'名前[：:]\s*(.+)', name_text)
+            if simple_match:
+                name_only = simple_match.group(1).strip()
+                # 読み方が含まれていない場合
+                if not '（' in name_only:
+                    profile_data['full_name'] = name_only
+
+
+def legacy_extract_basic_info(soup, profile_data):
+    """基本情報を抽出（修正版）"""
+
+    # 修正: string引数を使用
+    info_element = soup.find('li', string=re.compile(r'情報：'))
+    if not info_element:
+        info_spans = soup.find_all('span', string=re.compile(r'情報：'))
+        if info_spans:
+            info_element = info_spans[0].parent
+
+    if info_element:
+        info_text = info_element.get_text()
+
+        # 生年月日
+        birth_match = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', info_text)
+        if birth_match:
+            year, month, day = birth_match.groups()
+            profile_data['birth_date'] = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+
+        # 星座
+        zodiac_match = re.search(r'(おひつじ座|おうし座|ふたご座|かに座|しし座|おとめ座|てんびん座|さそり座|いて座|やぎ座|みずがめ座|うお座)', info_text)
+        if zodiac_match:
+            profile_data['zodiac_sign'] = zodiac_match.group(1)
+
+        # 血液型
+        blood_match = re.search(r'([ABO]B?)型', info_text)
+        if blood_match:
+            profile_data['blood_type'] = blood_match.group(1) + '型'
+
+        # 身長
+        height_match = re.search(r'(\d+)cm', info_text)
+        if height_match:
+            profile_data['height_cm'] = int(height_match.group(1))
+
+        # 出身地（修正版：データクリーニング）
+        birthplace_match = re.search(r'([^0-9]+?)出身', info_text)
+        if birthplace_match:
+            raw_birthplace = birthplace_match.group(1).strip()
+            # 修正: 不要な文字列を除去
+            cleaned_birthplace = legacy_clean_birthplace(raw_birthplace)
+            if cleaned_birthplace:
+                profile_data['birthplace'] = cleaned_birthplace
+
+
+def legacy_clean_birthplace(raw_text):
+    """出身地データのクリーニング"""
+
+    # 不要な文字列を除去
+    cleaned = re.sub(r'(cm|kg)\s*\n\s*', '', raw_text)
+    cleaned = re.sub(r'\s+', '', cleaned)  # 余分な空白除去
+    cleaned = re.sub(r'^[日月火水木金土]+\s*', '', cleaned)  # 曜日文字除去
+
+    # 空文字や意味のない文字列をフィルタ
+    if len(cleaned) < 2 or cleaned in ['日', '月', '火', '水', '木', '金', '土']:
+        return ''
+
+    return cleaned.strip()
+
+
+def legacy_extract_profile_details(soup, profile_data):
+    """ジャンル、特技、趣味、芸歴を抽出（修正版）"""
+
+    # 修正: string引数を使用
+    detail_fields = {
+        'ジャンル': 'genres',
+        '特技': 'skills',
+        '趣味': 'hobbies',
+        '芸歴': 'career_history'
+    }
+
+    for japanese_key, english_key in detail_fields.items():
+        # id属性で検索
+        element = soup.find('p', id=japanese_key)
+
+        # id属性がない場合はspan検索（修正版）
+        if not element:
+            spans = soup.find_all('span', string=re.compile(f'{japanese_key}[：:]'))
+            if spans:
+                element = spans[0].find_next('p')
+
+        if element:
+            text = element.get_text().strip()
+
+            if english_key == 'career_history':
+                profile_data[english_key] = text
+            else:
+                # リスト形式で保存（修正版：より正確な分割）
+                items = legacy_split_detail_items(text)
+                if items:
+                    profile_data[english_key] = items
+
+
+def legacy_split_detail_items(text):
+    """詳細項目の分割処理"""
+
+    # 複数の区切り文字に対応
+    items = re.split(r'[\s\u3000\n]+', text.replace('　', ' '))
+
+    # 空文字や短すぎる項目を除去
+    filtered_items = []
+    for item in items:
+        item = item.strip()
+        if len(item) > 1 and item not in ['、', '，', '・']:
+            filtered_items.append(item)
+
+    return filtered_items
+
+
+def legacy_extract(soup):
+    """旧実装の呼び出し順（名前 → 基本情報 → 画像 → 詳細）で抽出する"""
+    profile_data = {}
+    legacy_extract_name_info(soup, profile_data)
+    legacy_extract_basic_info(soup, profile_data)
+    img_element = soup.find('img', class_='talent_img')
+    if img_element and img_element.get('src'):
+        profile_data['profile_image_url'] = img_element['src']
+    legacy_extract_profile_details(soup, profile_data)
+    return profile_data
+
+
+def new_extract(soup):
+    return extract_profile_fields(soup, {})
+
+
+def load_pages():
+    """フィクスチャを (ファイル名, soup) のリストで返す（解析時間は計測に含めない）"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), make_soup(f.read())))
+    return pages
+
+
+def measure(extract, pages, iterations):
+    """1ページあたりのマイクロ秒を返す"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for _, soup in pages:
+            extract(soup)
+    return (time.perf_counter() - started) * 1e6 / (iterations * len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="プロフィール項目抽出の一致確認とベンチマーク")
+    parser.add_argument("--iterations", type=int, default=100, help="計測の繰り返し回数")
+    args = parser.parse_args()
+
+    pages = load_pages()
+    if not pages:
+        print("フィクスチャなし")
+        return 1
+
+    mismatches = []
+    for name, soup in pages:
+        expected, actual = legacy_extract(soup), new_extract(soup)
+        if expected != actual or list(expected) != list(actual):
+            mismatches.append((name, expected, actual))
+
+    print(f"タレントページ {len(pages)}件: 不一致 {len(mismatches)}件")
+    for name, expected, actual in mismatches:
+        print(f"  ✗ {name}\n    旧: {expected}\n    新: {actual}")
+
+    legacy_us = measure(legacy_extract, pages, args.iterations)
+    new_us = measure(new_extract, pages, args.iterations)
+    print(f"旧 _extract_*_fixed: {legacy_us:8.1f} µs/page")
+    print(f"profile_extractor : {new_us:8.1f} µs/page  x{legacy_us / new_us:.2f}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
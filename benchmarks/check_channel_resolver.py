@@ -0,0 +1,50 @@
+# benchmarks/check_channel_resolver.py
+# v1.0.0 (2026-10-17)
+# ChannelResolver と旧 find_channel_code（線形走査版）の1件あたりの処理時間を比較する。
+# 結果の一致は tests/test_channel_resolver.py で確認する（旧実装とチャンネル名の一覧もそちらにある）。
+#
+# 使い方:
+#   python benchmarks/check_channel_resolver.py
+#   python benchmarks/check_channel_resolver.py --iterations 200
+import os
+import sys
+import time
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "tests"))
+
+from channel_resolver import CHANNEL_MAPPING, ChannelResolver  # noqa: E402
+from test_channel_resolver import build_corpus, legacy_find_channel_code  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChannelResolver のベンチマーク")
+    parser.add_argument("--iterations", type=int, default=50, help="計測の繰り返し回数")
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    resolver = ChannelResolver(CHANNEL_MAPPING)
+
+    mismatches = [name for name in corpus if resolver.resolve(name) != legacy_find_channel_code(name)]
+    print(f"チャンネル名 {len(corpus)}件: 旧実装との不一致 {len(mismatches)}件")
+
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        for name in corpus:
+            legacy_find_channel_code(name)
+    legacy_us = (time.perf_counter() - started) * 1e6 / (args.iterations * len(corpus))
+
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        for name in corpus:
+            resolver.resolve(name)
+    cached_us = (time.perf_counter() - started) * 1e6 / (args.iterations * len(corpus))
+
+    print(f"旧 find_channel_code: {legacy_us:.2f} µs/件, ChannelResolver（メモ化後）: {cached_us:.2f} µs/件")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
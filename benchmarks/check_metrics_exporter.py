@@ -0,0 +1,200 @@
+# benchmarks/check_metrics_exporter.py
+# v1.0.0 (2026-10-17)
+# metrics_exporter をローカルの代替コレクタ（Pushgateway 相当の HTTP サーバ）に向けて動かし、
+# /metrics（Prometheus テキスト形式 / OpenMetrics）と終了時の push の内容を検証する。
+#
+# 使い方:
+#   python benchmarks/check_metrics_exporter.py
+#   python benchmarks/check_metrics_exporter.py --hold 60   # 60秒間 /metrics を開けたままにする（curl で確認用）
+import os
+import re
+import sys
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from http_client import create_session  # noqa: E402
+from metrics_exporter import MetricsExporter, METRIC_PREFIX  # noqa: E402
+from run_metrics import RunMetrics  # noqa: E402
+
+SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})? (\S+)$')
+
+
+class StubCollector:
+    """Pushgateway の代わりに PUT / POST を受けて本文を記録する HTTP サーバ。
+
+    /flaky へのアクセスは最初の1回だけ 503 を返す（HTTP リトライの計測確認用）。
+    """
+
+    def __init__(self):
+        self.pushes = []
+        self.flaky_calls = 0
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _receive(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+                collector.pushes.append((self.command, self.path, self.headers.get("Content-Type"), body))
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            do_PUT = _receive
+            do_POST = _receive
+
+            def do_GET(self):
+                collector.flaky_calls += 1
+                status = 503 if collector.flaky_calls == 1 else 200
+                body = b"x" * 2048
+                self.send_response(status)
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def validate_exposition(text, openmetrics):
+    """テキスト形式の構文と、ヒストグラムのバケットが累積になっていることを確認する。問題の一覧を返す"""
+    problems = []
+    types = {}
+    buckets = {}
+    counts = {}
+    lines = text.rstrip("\n").split("\n")
+    if openmetrics and lines[-1] != "# EOF":
+        problems.append("OpenMetrics の末尾に # EOF がありません")
+    for line in lines:
+        if line.startswith("# TYPE "):
+            _, _, name, metric_type = line.split(" ", 3)
+            types[name] = metric_type
+            if openmetrics and metric_type == "counter" and name.endswith("_total"):
+                problems.append(f"OpenMetrics の counter 名に _total が付いています: {name}")
+            continue
+        if line.startswith("#"):
+            continue
+        match = SAMPLE_LINE.match(line)
+        if not match:
+            problems.append(f"解釈できない行: {line}")
+            continue
+        name, labels, value = match.groups()
+        family = next((f for f in (name, re.sub(r'_(bucket|sum|count|total)$', '', name)) if f in types), None)
+        if family is None:
+            problems.append(f"TYPE 宣言のないサンプル: {name}")
+        float(value)
+        if name.endswith("_bucket"):
+            series = re.sub(r',?le="[^"]*"', '', labels or "")
+            previous = buckets.get((name, series))
+            if previous is not None and float(value) < previous:
+                problems.append(f"バケットが累積になっていません: {line}")
+            buckets[(name, series)] = float(value)
+            if 'le="+Inf"' in (labels or ""):
+                counts[(name[:-len("_bucket")], series)] = float(value)
+        elif name.endswith("_count"):
+            inf = counts.get((name[:-len("_count")], labels or ""))
+            if inf is not None and inf != float(value):
+                problems.append(f"+Inf バケットと _count が一致しません: {line}")
+    return problems
+
+
+def build_sample_metrics(collector):
+    """段階の所要時間・バッチ行数・キュー長・HTTP を一通り記録した RunMetrics を作る"""
+    metrics = RunMetrics("check_metrics")
+    for seconds in (0.004, 0.02, 0.3, 1.2, 75.0):
+        metrics.observe("detail_fetch", seconds)
+    write = metrics.timed_batch("program_upsert", lambda rows: (len(rows), 0))
+    for size in (1, 120, 500):
+        write([{}] * size)
+    try:
+        with metrics.stage("epg_parse"):
+            raise ValueError("解析エラー")
+    except ValueError:
+        pass
+    metrics.count("details", 490)
+    metrics.track_queue("json_upload", lambda: 7)
+    metrics.track_queue("broken", lambda: 1 / 0)  # 評価に失敗するキューは出力しない
+
+    session = metrics.instrument_session(create_session())
+    for _ in range(2):
+        session.get(f"{collector.url}/flaky", timeout=10)
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hold", type=float, default=0, help="検証後に /metrics を開けておく秒数")
+    args = parser.parse_args()
+
+    collector = StubCollector()
+    metrics = build_sample_metrics(collector)
+    exporter = MetricsExporter(metrics, port=0, host="127.0.0.1", pushgateway_url=collector.url, instance="local")
+    exporter.start()
+    metrics_url = f"http://127.0.0.1:{exporter.server_port}/metrics"
+
+    problems = []
+    prometheus = requests.get(metrics_url, timeout=10)
+    openmetrics = requests.get(metrics_url, headers={"Accept": "application/openmetrics-text"}, timeout=10)
+    for response, is_openmetrics in ((prometheus, False), (openmetrics, True)):
+        label = "OpenMetrics" if is_openmetrics else "Prometheus テキスト形式"
+        found = validate_exposition(response.text, is_openmetrics)
+        print(f"/metrics（{label}, {response.headers.get('Content-Type')}）: {len(response.text.splitlines())}行, 問題 {len(found)}件")
+        problems.extend(found)
+
+    expected = [
+        f'{METRIC_PREFIX}_stage_duration_seconds_bucket{{scraper="check_metrics",stage="detail_fetch",le="+Inf"}} 5',
+        f'{METRIC_PREFIX}_stage_errors_total{{scraper="check_metrics",stage="epg_parse"}} 1',
+        f'{METRIC_PREFIX}_db_batch_rows_count{{scraper="check_metrics",writer="program_upsert"}} 3',
+        f'{METRIC_PREFIX}_http_requests_total{{scraper="check_metrics",status="200"}} 2',
+        f'{METRIC_PREFIX}_http_retries_total{{scraper="check_metrics",reason="503"}} 1',
+        f'{METRIC_PREFIX}_items_total{{scraper="check_metrics",kind="details"}} 490',
+        f'{METRIC_PREFIX}_queue_depth{{scraper="check_metrics",queue="json_upload"}} 7',
+    ]
+    for line in expected:
+        if line not in prometheus.text.splitlines():
+            problems.append(f"期待した行がありません: {line}")
+    if 'queue="broken"' in prometheus.text:
+        problems.append("評価に失敗したキューが出力されています")
+
+    if args.hold > 0:
+        print(f"{metrics_url} を {args.hold:.0f}秒間公開します")
+        time.sleep(args.hold)
+
+    exporter.close(success=True)
+    if len(collector.pushes) != 1:
+        problems.append(f"push の回数が 1 ではありません: {len(collector.pushes)}")
+    else:
+        method, path, content_type, body = collector.pushes[0]
+        print(f"push: {method} {path}（{content_type}）{len(body.splitlines())}行")
+        if (method, path) != ("PUT", "/metrics/job/check_metrics/instance/local"):
+            problems.append(f"push 先が想定と違います: {method} {path}")
+        if f'{METRIC_PREFIX}_run_success{{scraper="check_metrics"}} 1' not in body.splitlines():
+            problems.append("push に run_success がありません")
+        problems.extend(validate_exposition(body, False))
+    collector.close()
+
+    for problem in problems:
+        print(f"  ✗ {problem}")
+    print("OK" if not problems else f"問題 {len(problems)}件")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
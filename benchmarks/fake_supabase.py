@@ -0,0 +1,491 @@
+# benchmarks/fake_supabase.py
+# v1.0.0 (2026-10-17)
+# ベンチマーク用の Supabase（PostgREST / Storage）代替。テーブルをメモリ上に持ち、
+# 呼び出し回数・送受信バイト数を記録し、1リクエストごとに指定した遅延を入れる。
+#
+# run_benchmark.py が sys.modules['supabase'] に差し込んでからスクレイパを import する。
+# 対応しているのはスクレイパが使うクエリ（select / insert / upsert / update / delete、
+# eq / neq / gt / gte / lt / lte / in_、order / range / limit、count="exact"）のみ。
+# 複数行の insert / upsert はキーが揃っていないと PostgREST と同じく拒否する。
+# 埋め込みリソース（programs!inner(broadcast_date) など）は FOREIGN_KEYS の結合で解決し、
+# programs.broadcast_date のような条件もその行に適用する。
+# sql/ の RPC は SQL_RPC_HANDLERS が同じ結果をメモリ上で返す（未定義の RPC は 404 相当の例外）。
+import json
+import re
+import time
+import types
+import threading
+from collections import Counter
+
+
+# upsert の既定キーと自動採番列（tag_id）
+PRIMARY_KEYS = {
+    "programs_epg": "event_id",
+    "programs": "event_id",
+    "programs_epg_archive": "event_id",
+    "programs_archive": "event_id",
+    "talents": "talent_id",
+    "talent_profiles": "talent_id",
+    "talent_tags": "tag_id",
+    "talent_tag_relations": "talent_id,tag_id",
+    "program_talent_appearances": "program_event_id,talent_id",
+    "table_row_counts": "table_name",
+    "politician_program_hits": "event_id,politician_name",
+    "politician_tv_hits": "politician_name",
+    "politician_roster": "name,chamber,district",
+}
+
+# (テーブル, 埋め込むリソース) → (自分の列, 相手の列)。多対一の結合のみ
+FOREIGN_KEYS = {
+    ("program_talent_appearances", "programs"): ("program_event_id", "event_id"),
+    ("program_talent_appearances", "talents"): ("talent_id", "talent_id"),
+}
+
+_EMBED = re.compile(r"^(\w+)(!inner)?\((.*)\)$")
+
+
+def _split_columns(columns):
+    """select の列指定を、括弧の中のカンマでは区切らずに分ける"""
+    parts, depth, current = [], 0, ""
+    for char in columns:
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _payload_bytes(value):
+    if value is None:
+        return 0
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class FakeApiError(Exception):
+    """postgrest.APIError の代わり"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeResponse:
+    def __init__(self, data=None, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """PostgREST のクエリビルダを模したもの（execute() で FakeDatabase に問い合わせる）"""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.op = "select"
+        self.columns = "*"
+        self.payload = None
+        self.options = {}
+        self.filters = []
+        self.order_by = []
+        self.offset = 0
+        self.max_rows = None
+        self.count = None
+        self.head = False
+
+    # --- 操作 ---
+    def select(self, columns="*", count=None, head=False):
+        self.op, self.columns, self.count, self.head = "select", columns, count, head
+        return self
+
+    def insert(self, rows, **options):
+        self.op, self.payload, self.options = "insert", rows, options
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False, **options):
+        self.op, self.payload = "upsert", rows
+        self.options = dict(options, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates)
+        return self
+
+    def update(self, values, **options):
+        self.op, self.payload, self.options = "update", values, options
+        return self
+
+    def delete(self, **options):
+        self.op, self.options = "delete", options
+        return self
+
+    # --- 絞り込み ---
+    def _filter(self, column, predicate):
+        self.filters.append((column, predicate))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column, value):
+        return self._filter(column, lambda v: v != value)
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def in_(self, column, values):
+        values = set(values)
+        return self._filter(column, lambda v: v in values)
+
+    def order(self, column, desc=False, **_):
+        self.order_by.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.offset, self.max_rows = start, end - start + 1
+        return self
+
+    def limit(self, size):
+        self.max_rows = size
+        return self
+
+    def execute(self):
+        return self.db.execute(self)
+
+
+class FakeRpc:
+    def __init__(self, db, name, params):
+        self.db = db
+        self.name = name
+        self.params = params or {}
+
+    def execute(self):
+        return self.db.execute_rpc(self.name, self.params)
+
+
+class FakeBucket:
+    def __init__(self, db, bucket):
+        self.db = db
+        self.bucket = bucket
+
+    def upload(self, path, file, file_options=None):
+        self.db.record(("storage", "upload"), sent=len(file))
+        self.db.objects[(self.bucket, path)] = bytes(file)
+        self.db.object_options[(self.bucket, path)] = dict(file_options or {})
+        return FakeResponse({"Key": f"{self.bucket}/{path}"})
+
+
+class FakeStorage:
+    def __init__(self, db):
+        self.db = db
+
+    def from_(self, bucket):
+        return FakeBucket(self.db, bucket)
+
+
+class FakeDatabase:
+    """メモリ上のテーブルと呼び出し記録。primary_keys はテーブル名 → upsert の既定キー"""
+
+    def __init__(self, latency_ms=0.0, primary_keys=None, rpc_handlers=None, foreign_keys=None):
+        self.latency = latency_ms / 1000.0
+        self.primary_keys = PRIMARY_KEYS if primary_keys is None else primary_keys
+        self.rpc_handlers = dict(SQL_RPC_HANDLERS if rpc_handlers is None else rpc_handlers)
+        self.foreign_keys = FOREIGN_KEYS if foreign_keys is None else foreign_keys
+        self.tables = {}
+        self.objects = {}  # (バケット, パス) -> 保存した内容
+        self.object_options = {}  # (バケット, パス) -> file_options
+        self.calls = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._next_id = Counter()
+
+    def record(self, key, sent=0, received=0):
+        with self._lock:
+            self.calls[key] += 1
+            self.bytes_sent += sent
+            self.bytes_received += received
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def round_trips(self):
+        return sum(self.calls.values())
+
+    def seed(self, table, rows):
+        self.tables.setdefault(table, []).extend(dict(row) for row in rows)
+
+    # --- 実行 ---
+    def _matches(self, row, filters):
+        return all(predicate(row.get(column)) for column, predicate in filters if "." not in column)
+
+    def _embed(self, query, row):
+        """埋め込みリソースを結合した行を返す。!inner で相手がない・条件に合わない行は None"""
+        row = dict(row)
+        for part in _split_columns(query.columns):
+            match = _EMBED.match(part)
+            if not match:
+                continue
+            resource, inner, _ = match.groups()
+            local, remote = self.foreign_keys[(query.table, resource)]
+            filters = [(column.split(".", 1)[1], predicate) for column, predicate in query.filters
+                       if column.startswith(resource + ".")]
+            related = next(
+                (other for other in self.tables.get(resource, [])
+                 if other.get(remote) == row.get(local) and self._matches(other, filters)),
+                None,
+            )
+            if related is None and (inner or filters):
+                return None
+            row[resource] = related
+        return row
+
+    def _project(self, row, columns):
+        if columns.strip() == "*":
+            return {key: value for key, value in row.items() if not isinstance(value, dict)}
+        projected = {}
+        for column in _split_columns(columns):
+            match = _EMBED.match(column)
+            if match:
+                resource, _, sub_columns = match.groups()
+                related = row.get(resource)
+                projected[resource] = self._project(related, sub_columns) if related is not None else None
+                continue
+            projected[column] = row.get(column)
+        return projected
+
+    def execute(self, query):
+        if query.op in ("insert", "upsert") and isinstance(query.payload, list) and query.payload:
+            # 複数行の JSON 配列はすべてのオブジェクトのキーが一致しないと 400（PGRST102）になる
+            keys = set(query.payload[0])
+            if any(set(row) != keys for row in query.payload[1:]):
+                self.record((query.table, query.op), sent=_payload_bytes(query.payload))
+                raise FakeApiError("All object keys must match", code="PGRST102")
+        with self._lock:
+            result = getattr(self, f"_{query.op}")(query)
+        self.record((query.table, query.op), sent=_payload_bytes(query.payload), received=_payload_bytes(result.data))
+        return result
+
+    def execute_rpc(self, name, params):
+        handler = self.rpc_handlers.get(name)
+        if handler is None:
+            # PostgREST は未定義の関数に 404（PGRST202）を返す
+            self.record(("rpc", name), sent=_payload_bytes(params))
+            raise FakeApiError(f"Could not find the function public.{name} in the schema cache", code="PGRST202")
+        with self._lock:
+            data = handler(self, **params)
+        self.record(("rpc", name), sent=_payload_bytes(params), received=_payload_bytes(data))
+        return FakeResponse(data)
+
+    def _select(self, query):
+        rows = [row for row in self.tables.get(query.table, []) if self._matches(row, query.filters)]
+        if "(" in query.columns or any("." in column for column, _ in query.filters):
+            rows = [row for row in (self._embed(query, row) for row in rows) if row is not None]
+        for column, desc in reversed(query.order_by):
+            # NULL は末尾（PostgREST の既定 nullslast と同じ）
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column) if row.get(column) is not None else 0),
+                      reverse=desc)
+        count = len(rows) if query.count else None
+        if query.head:
+            return FakeResponse([], count)
+        rows = rows[query.offset:]
+        if query.max_rows is not None:
+            rows = rows[:query.max_rows]
+        return FakeResponse([self._project(row, query.columns) for row in rows], count)
+
+    def _key_columns(self, query):
+        on_conflict = query.options.get("on_conflict") or self.primary_keys.get(query.table)
+        return tuple(column.strip() for column in on_conflict.split(",")) if on_conflict else ()
+
+    def _insert(self, query):
+        rows = query.payload if isinstance(query.payload, list) else [query.payload]
+        table = self.tables.setdefault(query.table, [])
+        inserted = []
+        for row in rows:
+            row = dict(row)
+            # talent_tags.tag_id のような自動採番列
+            id_column = self.primary_keys.get(query.table)
+            if id_column and id_column not in row:
+                self._next_id[query.table] += 1
+                row[id_column] = self._next_id[query.table]
+            table.append(row)
+            inserted.append(dict(row))
+        return FakeResponse(inserted)
+
+    def _upsert(self, query):
+        rows = query.payload if isinstance(query.payload, list) else [query.payload]
+        keys = self._key_columns(query)
+        table = self.tables.setdefault(query.table, [])
+        index = {tuple(row.get(k) for k in keys): row for row in table} if keys else {}
+        for row in rows:
+            key = tuple(row.get(k) for k in keys)
+            if keys and key in index:
+                if not query.options.get("ignore_duplicates"):
+                    index[key].update(row)
+                continue
+            stored = dict(row)
+            table.append(stored)
+            if keys:
+                index[key] = stored
+        return FakeResponse([dict(row) for row in rows])
+
+    def _update(self, query):
+        updated = []
+        for row in self.tables.get(query.table, []):
+            if self._matches(row, query.filters):
+                row.update(query.payload)
+                updated.append(dict(row))
+        return FakeResponse(updated)
+
+    def _delete(self, query):
+        table = self.tables.get(query.table, [])
+        kept = [row for row in table if not self._matches(row, query.filters)]
+        deleted = len(table) - len(kept)
+        self.tables[query.table] = kept
+        return FakeResponse([{}] * deleted)
+
+
+class FakeClient:
+    def __init__(self, db):
+        self.db = db
+        self.storage = FakeStorage(db)
+
+    def table(self, name):
+        return FakeQuery(self.db, name)
+
+    def from_(self, name):
+        return FakeQuery(self.db, name)
+
+    def rpc(self, name, params=None):
+        return FakeRpc(self.db, name, params)
+
+
+def make_module(db):
+    """`from supabase import create_client, Client` に応えるモジュールを作る"""
+    module = types.ModuleType("supabase")
+    module.Client = FakeClient
+    module.create_client = lambda url=None, key=None, *args, **kwargs: FakeClient(db)
+    return module
+
+
+# --- sql/ の RPC と同じ結果を返すハンドラ（handler(db, **params)、db のロック内で呼ばれる） ---
+def rpc_pending_talents(db, p_after_talent_id=None, p_limit=200, p_offset=0):
+    """sql/pending_talents.sql"""
+    profiled = {row["talent_id"] for row in db.tables.get("talent_profiles", [])}
+    rows = sorted(
+        (row for row in db.tables.get("talents", []) if row["talent_id"] not in profiled),
+        key=lambda row: row["talent_id"],
+    )
+    if p_after_talent_id is not None:
+        rows = [row for row in rows if row["talent_id"] > p_after_talent_id]
+    rows = rows[max(p_offset, 0):][:min(max(p_limit, 1), 1000)]
+    return [{"talent_id": row["talent_id"], "name": row.get("name"), "link": row.get("link")} for row in rows]
+
+
+def rpc_archive_old_programs(db, p_table, p_cutoff, p_chunk_size=5000):
+    """sql/archive_old_programs.sql（p_cutoff より前の行を最大 p_chunk_size 件 *_archive へ移す）"""
+    if p_table not in ("programs_epg", "programs"):
+        raise FakeApiError(f"archive_old_programs: 対象外のテーブルです: {p_table}")
+    table = db.tables.get(p_table, [])
+    old = sorted(
+        (row for row in table if row.get("broadcast_date") is not None and row["broadcast_date"] < p_cutoff),
+        key=lambda row: (row["broadcast_date"], row["event_id"]),
+    )[:min(max(p_chunk_size, 1), 50000)]
+    moved_ids = {row["event_id"] for row in old}
+    archive = db.tables.setdefault(f"{p_table}_archive", [])
+    index = {row["event_id"]: row for row in archive}
+    for row in old:
+        if row["event_id"] in index:
+            index[row["event_id"]].update(row)
+        else:
+            archive.append(dict(row))
+    db.tables[p_table] = [row for row in table if row["event_id"] not in moved_ids]
+    return len(old)
+
+
+COUNTED_TABLES = ("programs_epg", "programs_epg_archive", "programs", "programs_archive", "talents")
+
+
+def rpc_reconcile_table_row_counts(db):
+    """sql/table_row_counts.sql の reconcile_table_row_counts()（実件数で合わせ直す）"""
+    reconciled_at = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+    counts = {row["table_name"]: row for row in db.tables.setdefault("table_row_counts", [])}
+    for name in COUNTED_TABLES:
+        if name not in db.tables:
+            continue
+        row = counts.setdefault(name, {"table_name": name})
+        row.update(row_count=len(db.tables[name]), reconciled_at=reconciled_at, updated_at=reconciled_at)
+    db.tables["table_row_counts"] = sorted(counts.values(), key=lambda row: row["table_name"])
+    return [dict(row) for row in db.tables["table_row_counts"]]
+
+
+def rpc_apply_politician_hits(db, p_event_ids, p_hits):
+    """sql/politician_hits.sql の apply_politician_hits（番組ごとの一致を置き換え、議員ごとの増減を返す）"""
+    event_ids = set(p_event_ids)
+    new = {(hit["event_id"], hit["politician_name"]) for hit in p_hits or []
+           if hit.get("event_id") in event_ids and hit.get("politician_name")}
+    hits = db.tables.setdefault("politician_program_hits", [])
+    old = {(row["event_id"], row["politician_name"]) for row in hits if row["event_id"] in event_ids}
+    deltas = {}
+    for _, name in old - new:
+        deltas[name] = deltas.get(name, 0) - 1
+    for _, name in new - old:
+        deltas[name] = deltas.get(name, 0) + 1
+    removed = old - new
+    db.tables["politician_program_hits"] = (
+        [row for row in hits if (row["event_id"], row["politician_name"]) not in removed]
+        + [{"event_id": event_id, "politician_name": name} for event_id, name in sorted(new - old)]
+    )
+    totals = {row["politician_name"]: row for row in db.tables.setdefault("politician_tv_hits", [])}
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        if name in totals:
+            totals[name]["tv_hits"] = max(totals[name]["tv_hits"] + delta, 0)
+        else:
+            row = {"politician_name": name, "tv_hits": max(delta, 0), "reconciled_at": None}
+            db.tables["politician_tv_hits"].append(row)
+            totals[name] = row
+    return [{"politician_name": name, "delta": delta} for name, delta in sorted(deltas.items()) if delta]
+
+
+def rpc_reconcile_politician_hits(db, p_roster=None):
+    """sql/politician_hits.sql の reconcile_politician_hits（名簿を置き換え、一致表から登場数を数え直す）"""
+    if p_roster is not None:
+        roster = {}
+        for row in p_roster:
+            if row.get("name"):
+                key = (row["name"], row.get("chamber") or "", row.get("district") or "")
+                roster.setdefault(key, {"name": key[0], "reading": row.get("reading"), "party": row.get("party"),
+                                        "chamber": key[1], "district": key[2]})
+        db.tables["politician_roster"] = list(roster.values())
+    existing = {row["event_id"] for name in ("programs", "programs_archive") for row in db.tables.get(name, [])}
+    hits = [row for row in db.tables.get("politician_program_hits", []) if row["event_id"] in existing]
+    db.tables["politician_program_hits"] = hits
+    counts = {}
+    for row in hits:
+        counts[row["politician_name"]] = counts.get(row["politician_name"], 0) + 1
+    reconciled_at = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+    totals = {row["politician_name"]: row for row in db.tables.setdefault("politician_tv_hits", [])}
+    for name in set(totals) | set(counts):
+        row = totals.setdefault(name, {"politician_name": name})
+        row.update(tv_hits=counts.get(name, 0), reconciled_at=reconciled_at)
+    db.tables["politician_tv_hits"] = list(totals.values())
+    return sum(1 for row in totals.values() if row["tv_hits"] > 0)
+
+
+SQL_RPC_HANDLERS = {
+    "pending_talents": rpc_pending_talents,
+    "archive_old_programs": rpc_archive_old_programs,
+    "reconcile_table_row_counts": rpc_reconcile_table_row_counts,
+    "apply_politician_hits": rpc_apply_politician_hits,
+    "reconcile_politician_hits": rpc_reconcile_politician_hits,
+}
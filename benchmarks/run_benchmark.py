@@ -0,0 +1,309 @@
+# benchmarks/run_benchmark.py
+# v1.0.0 (2026-10-17)
+# 両スクレイパをオフラインで端から端まで動かすスループットベンチマーク。
+# bangumi.org の代わりに benchmarks/fixtures/ のページを返し、Supabase の代わりに
+# fake_supabase（メモリ上のテーブル・呼び出し記録・遅延付き）を使う。
+#
+# 計測項目: 経過時間, ページ/秒, 解析 ms/ページ, DB 往復回数, DB 送信バイト, Storage 送信バイト, ピーク RSS
+#
+# 使い方:
+#   python benchmarks/run_benchmark.py                        # tv（2回: 初回 + 差分）と talent を計測
+#   python benchmarks/run_benchmark.py --scenario tv --days 3 --db-latency-ms 30
+#   python benchmarks/run_benchmark.py --scenario talent --talents 500 --workers 8
+#   python benchmarks/run_benchmark.py --output before.json   # 変更前後の比較用に保存
+#   python benchmarks/run_benchmark.py --compare before.json  # 保存済みの結果と並べて表示
+import os
+import re
+import sys
+import json
+import glob
+import time
+import hashlib
+import logging
+import argparse
+import resource
+import tempfile
+import threading
+import contextlib
+import subprocess
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+import requests  # noqa: E402
+
+from fake_supabase import FakeDatabase, make_module  # noqa: E402
+
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+SCENARIOS = ("tv", "talent")
+FIXTURE_DATE = "2026-10-17"
+
+class FixtureWeb:
+    """URL に対応するフィクスチャを返す HttpCache.get の代替（取得数・バイト数を記録）"""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        self.epg = {}
+        for path in glob.glob(os.path.join(FIXTURE_DIR, "epg", "*.html")):
+            kind = os.path.basename(path).split("_")[0]  # td / bs
+            with open(path, "rb") as f:
+                self.epg[kind] = f.read()
+        self.detail = self._load("detail")
+        self.talent = self._load("talent")
+        self.pages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load(kind):
+        pages = []
+        for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, kind, "*.html"))):
+            with open(path, "rb") as f:
+                pages.append(f.read())
+        return pages
+
+    def _pick(self, url):
+        epg_match = re.search(r"/epg/(td|bs)", url)
+        if epg_match:
+            return self.epg[epg_match.group(1)]
+        talent_match = re.search(r"/talents/(\d+)", url)
+        if talent_match:
+            return self.talent[int(talent_match.group(1)) % len(self.talent)]
+        digest = int(hashlib.sha1(url.encode("utf-8")).hexdigest(), 16)
+        return self.detail[digest % len(self.detail)]
+
+    def get(self, session, url, **kwargs):
+        body = self._pick(url)
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.pages += 1
+            self.bytes += len(body)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = "utf-8"
+        response._content = body
+        response.from_cache = False
+        return response
+
+
+class StageTimer:
+    """関数を包んで呼び出し回数と合計時間を記録する（スレッドセーフ）"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def wrap(self, func):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.calls += 1
+                    self.seconds += elapsed
+        return timed
+
+    @property
+    def ms_per_call(self):
+        return self.seconds * 1000 / self.calls if self.calls else 0.0
+
+
+def quiet(verbose):
+    """スクレイパの print を捨てる（--verbose 指定時はそのまま表示）"""
+    if verbose:
+        return contextlib.nullcontext()
+    return contextlib.redirect_stdout(open(os.devnull, "w"))
+
+
+def peak_rss_mb():
+    # Linux の ru_maxrss は KB、macOS はバイト
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Measurement:
+    """1回の実行区間の差分（ページ数・DB 往復・送信バイト）を取る"""
+
+    def __init__(self, db, web):
+        self.db, self.web = db, web
+        self.started = time.perf_counter()
+        self.pages, self.page_bytes = web.pages, web.bytes
+        self.round_trips, self.db_sent = db.round_trips, db.bytes_sent
+        self.calls = db.calls.copy()
+        self.storage_sent = self._storage_bytes()
+
+    def _storage_bytes(self):
+        return sum(len(body) for body in self.db.objects.values())
+
+    def result(self, name, parse_timers):
+        elapsed = time.perf_counter() - self.started
+        pages = self.web.pages - self.pages
+        calls = self.db.calls - self.calls
+        return {
+            "scenario": name,
+            "seconds": round(elapsed, 3),
+            "pages": pages,
+            "pages_per_second": round(pages / elapsed, 1) if elapsed else 0.0,
+            "html_bytes": self.web.bytes - self.page_bytes,
+            "parse_ms_per_page": {kind: round(timer.ms_per_call, 3) for kind, timer in parse_timers.items()},
+            "db_round_trips": self.db.round_trips - self.round_trips,
+            "db_calls": {f"{table}.{op}": count for (table, op), count in sorted(calls.items())},
+            "db_bytes_sent": self.db.bytes_sent - self.db_sent - (self._storage_bytes() - self.storage_sent),
+            "storage_bytes_uploaded": self._storage_bytes() - self.storage_sent,
+            "storage_objects": calls.get(("storage", "upload"), 0),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+
+def run_tv(args, db, web):
+    """tv_schedule_updater.main() を --passes 回実行する（2回目以降は差分スキップの計測）"""
+    import tv_schedule_updater as tv
+
+    tv.http_cache.get = web.get
+    timers = {"epg": StageTimer(), "detail": StageTimer()}
+    tv.parse_epg_page = timers["epg"].wrap(tv.parse_epg_page)
+    tv.parse_program_detail = timers["detail"].wrap(tv.parse_program_detail)
+
+    start = datetime.strptime(FIXTURE_DATE, "%Y-%m-%d")
+    end = start + timedelta(days=args.days - 1)
+    results = []
+    for pass_no in range(1, args.passes + 1):
+        for timer in timers.values():
+            timer.calls, timer.seconds = 0, 0.0
+        measurement = Measurement(db, web)
+        with quiet(args.verbose):
+            tv.main(
+                start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"),
+                workers=args.workers, requests_per_second=0,
+                json_format=args.json_format,
+            )
+        label = "tv" if pass_no == 1 else f"tv (差分 {pass_no}回目)"
+        results.append(measurement.result(label, timers))
+    return results
+
+
+def run_talent(args, db, web):
+    """TalentProfileScraperFixed.process_talents() を --talents 件で実行する"""
+    db.seed("talents", [
+        {"talent_id": str(100000 + i), "name": f"タレント{i}", "link": f"https://bangumi.org/talents/{100000 + i}"}
+        for i in range(args.talents)
+    ])
+    logging.disable(logging.CRITICAL if not args.verbose else logging.NOTSET)
+
+    import talent_profile_scraper as tp
+
+    timers = {"talent_soup": StageTimer(), "talent_extract": StageTimer()}
+    tp.make_soup = timers["talent_soup"].wrap(tp.make_soup)
+    tp.extract_profile_fields = timers["talent_extract"].wrap(tp.extract_profile_fields)
+
+    scraper = tp.TalentProfileScraperFixed()
+    scraper.http_cache.get = web.get
+    measurement = Measurement(db, web)
+    with quiet(args.verbose):
+        scraper.process_talents(offset=0, limit=args.talents, workers=args.workers, requests_per_second=0)
+    result = measurement.result("talent", timers)
+    result["profiles_saved"] = scraper.stats["success"]
+    return [result]
+
+
+def run_scenario(args):
+    """このプロセス内で1シナリオを実行し、結果を JSON で標準出力の最終行に書く"""
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    os.environ["HTTP_CACHE_DISABLED"] = "1"
+    os.environ["CHECKPOINT_DIR"] = os.path.join(workdir, ".checkpoints")
+    os.chdir(workdir)  # エラーログ等の出力先
+
+    db = FakeDatabase(latency_ms=args.db_latency_ms)
+    sys.modules["supabase"] = make_module(db)
+    web = FixtureWeb(latency_ms=args.http_latency_ms)
+
+    results = run_tv(args, db, web) if args.scenario == "tv" else run_talent(args, db, web)
+    print(json.dumps(results, ensure_ascii=False))
+
+
+def format_results(results, baseline=None):
+    baseline = {r["scenario"]: r for r in (baseline or [])}
+    lines = []
+    for r in results:
+        parse = ", ".join(f"{kind} {ms:.2f}" for kind, ms in r["parse_ms_per_page"].items())
+        lines.append(
+            f"[{r['scenario']}] {r['seconds']:.2f}s, {r['pages']}ページ ({r['pages_per_second']:.1f} pages/s)\n"
+            f"    解析 ms/ページ: {parse}\n"
+            f"    DB 往復 {r['db_round_trips']}回, DB 送信 {r['db_bytes_sent'] / 1024:.0f}KB, "
+            f"Storage {r['storage_objects']}オブジェクト / {r['storage_bytes_uploaded'] / 1024:.0f}KB, "
+            f"ピーク RSS {r['peak_rss_mb']:.0f}MB"
+        )
+        before = baseline.get(r["scenario"])
+        if before:
+            lines.append(
+                f"    比較: {before['seconds']:.2f}s → {r['seconds']:.2f}s, "
+                f"DB 往復 {before['db_round_trips']} → {r['db_round_trips']}, "
+                f"ピーク RSS {before['peak_rss_mb']:.0f} → {r['peak_rss_mb']:.0f}MB"
+            )
+        if r.get("db_calls"):
+            top = sorted(r["db_calls"].items(), key=lambda item: -item[1])[:6]
+            lines.append("    内訳: " + ", ".join(f"{name} {count}" for name, count in top))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スクレイパのオフライン・スループットベンチマーク")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--days", type=int, default=1, help="tv: 取得日数（各日とも同じフィクスチャ）")
+    parser.add_argument("--passes", type=int, default=2, help="tv: 実行回数（2回目以降は差分スキップの計測）")
+    parser.add_argument("--talents", type=int, default=200, help="talent: 処理するタレント数")
+    parser.add_argument("--workers", type=int, default=4, help="詳細・プロフィールの同時取得数")
+    parser.add_argument("--json-format", default="pretty", help="tv: JSON バックアップ形式")
+    parser.add_argument("--db-latency-ms", type=float, default=20.0, help="DB 1リクエストあたりの疑似遅延")
+    parser.add_argument("--http-latency-ms", type=float, default=0.0, help="HTTP 1リクエストあたりの疑似遅延")
+    parser.add_argument("--output", help="結果を JSON で保存するパス")
+    parser.add_argument("--compare", help="比較対象の結果 JSON")
+    parser.add_argument("--verbose", action="store_true", help="スクレイパの出力を表示する")
+    parser.add_argument("--in-process", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.in_process:
+        run_scenario(args)
+        return 0
+
+    # シナリオごとに別プロセスで実行する（ピーク RSS とモジュール状態を分けるため）
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    forwarded = [
+        "--days", str(args.days), "--passes", str(args.passes), "--talents", str(args.talents),
+        "--workers", str(args.workers), "--json-format", args.json_format,
+        "--db-latency-ms", str(args.db_latency_ms), "--http-latency-ms", str(args.http_latency_ms),
+    ] + (["--verbose"] if args.verbose else [])
+    results = []
+    for scenario in scenarios:
+        command = [sys.executable, os.path.abspath(__file__), *forwarded, "--scenario", scenario, "--in-process"]
+        completed = subprocess.run(command, stdout=subprocess.PIPE, text=True, cwd=REPO_ROOT)
+        if args.verbose:
+            print(completed.stdout)
+        if completed.returncode != 0:
+            print(f"[{scenario}] 失敗（終了コード {completed.returncode}）")
+            return completed.returncode
+        results.extend(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print(format_results(results, baseline))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"created_at": datetime.now().isoformat(), "args": vars(args), "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"保存: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# channel_resolver.py
+# v1.0.0 (2026-10-17)
+# 追加: チャンネル名 → チャンネルコード解決器（起動時に索引を構築し、番組ごとの判定を定数時間に）
+import re
+from collections import Counter
+from functools import lru_cache
+
+
+# 改良されたチャンネルマッピング（完全一致優先）
+CHANNEL_MAPPING = {
+    # 東京 地上波
+    "NHKG-TKY": ["NHK総合", "ＮＨＫ総合", "NHK総合 東京"],
+    "NHKE-TKY": ["NHKEテレ", "ＮＨＫＥテレ", "NHKEテレ 東京"], 
+    "NTV-TKY": ["日テレ", "日本テレビ"],
+    "TV-ASAHI-TKY": ["テレビ朝日", "テレ朝"],
+    "TBS-TKY": ["TBS", "ＴＢＳ"],
+    "TV-TOKYO-TKY": ["テレ東", "テレビ東京"],
+    "FUJI-TV-TKY": ["フジテレビ", "フジ"],
+    "TOKYO-MX": ["TOKYO MX", "ＴＯＫＹＯ　ＭＸ"],
+    
+    # 関東 広域
+    "TVS": ["テレ玉"],
+    "CTC": ["チバテレビ", "チバテレ"],
+    "TVK": ["tvk"],
+    
+    # BS無料
+    "NHK-BS": ["ＮＨＫ　ＢＳ", "NHK BS"],
+    "BS-NTV": ["BS日テレ", "ＢＳ日テレ"],
+    "BS-ASAHI": ["BS朝日", "ＢＳ朝日"],
+    "BS-TBS": ["BS-TBS", "ＢＳ－ＴＢＳ"],
+    "BS-TV-TOKYO": ["ＢＳテレ東", "BSテレ東"],
+    "BS-FUJI": ["BSフジ", "ＢＳフジ"],
+    "BS11": ["BS11", "ＢＳ１１"],
+    "BS12-TWELLV": ["BS12", "ＢＳ１２"],
+    "BS-YOSHIMOTO": ["ＢＳよしもと"],
+    "OUJ-TV-BS": ["放送大学"],
+    
+    # BS有料
+    "WOWOW-PRIME-BS": ["WOWOWプライム", "WOWOWプ"],
+    "WOWOW-LIVE-BS": ["WOWOWライブ"],
+    "WOWOW-CINEMA-BS": ["WOWOWシネマ"],
+    "WOWOW-PLUS-BS": ["WOWOWプラス"],
+    "STAR-CH-BS": ["スターｃｈ"],
+    "JSPORTS-1-BS": ["J SPORTS 1"],
+    "JSPORTS-2-BS": ["J SPORTS 2"],
+    "JSPORTS-3-BS": ["J SPORTS 3"],
+    "JSPORTS-4-BS": ["J SPORTS 4"],
+    "GREEN-CH-BS": ["グリーンチャンネル"],
+    "ANIMAX-BS": ["BSアニマックス"],
+    "TSURIVISION-BS": ["BS釣りビジョン"],
+    "DISNEY-CH-BS": ["ディズニーch"],
+    "NIHON-EIGA-BS": ["日本映画専門ch"],
+    
+    # その他
+    "JCOM-BS": ["J:COM"]
+}
+
+
+# 先頭のチャンネル番号（例: "7 ＢＳテレ東" の "7 "）
+LEADING_CHANNEL_NUMBER = re.compile(r'^\d+\s*')
+
+
+def is_bs_code(code):
+    return code.startswith('BS-') or 'BS' in code
+
+
+class ChannelResolver:
+    """CHANNEL_MAPPING から索引を一度だけ構築し、チャンネル名をコードへ解決する。
+
+    判定順は旧 find_channel_code と同じ（完全一致 → 番号除去後の完全一致 → 部分一致）で、
+    部分一致は「登録名がチャンネル名に含まれる」「チャンネル名が登録名に含まれる」の両方を
+    部分文字列の辞書引きで求める。解決結果は旧実装と名前ごとに同じ（tests/test_channel_resolver.py）。
+    結果は LRU でメモ化し、解決できなかった名前は unresolved に数える。
+    """
+
+    def __init__(self, mapping=CHANNEL_MAPPING, cache_size=1024):
+        # (登録順, コード, 登録名, BS系か)
+        self._entries = []
+        self._exact = {}
+        self._by_name = {}
+        self._by_substring = {}
+        for code, name_list in mapping.items():
+            for name in name_list:
+                ordinal = len(self._entries)
+                self._entries.append((ordinal, code, name, is_bs_code(code)))
+                self._exact.setdefault(name, code)
+                self._by_name.setdefault(name, []).append(ordinal)
+                # 登録名のすべての部分文字列（空文字を含む）→ 登録順
+                for start in range(len(name) + 1):
+                    for end in range(start, len(name) + 1):
+                        self._by_substring.setdefault(name[start:end], set()).add(ordinal)
+        self._max_name_length = max((len(name) for name in self._by_name), default=0)
+        self.unresolved = Counter()
+        self._resolve_cached = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def resolve(self, channel_name):
+        """チャンネル名からコードを返す（見つからなければ None）"""
+        if not channel_name:
+            return None
+        code = self._resolve_cached(channel_name)
+        if code is None:
+            self.unresolved[channel_name] += 1
+        return code
+
+    __call__ = resolve
+
+    def _resolve(self, channel_name):
+        clean_name = channel_name.strip()
+
+        # 1. 完全一致検索（最優先）
+        code = self._exact.get(clean_name)
+        if code:
+            return code
+
+        # 2. 番号付きチャンネル名の処理（例: "7 ＢＳテレ東"）
+        name_without_number = LEADING_CHANNEL_NUMBER.sub('', clean_name)
+        if name_without_number != clean_name:
+            code = self._exact.get(name_without_number)
+            if code:
+                return code
+
+        # 3. 部分一致検索（BS を含む名前は BS 系を優先し、最も長い登録名を採用）
+        return self._partial_match(clean_name)
+
+    def _partial_match(self, clean_name):
+        candidates = set(self._by_substring.get(clean_name, ()))
+        for start in range(len(clean_name)):
+            for end in range(start + 1, min(len(clean_name), start + self._max_name_length) + 1):
+                candidates.update(self._by_name.get(clean_name[start:end], ()))
+        if not candidates:
+            return None
+
+        bs_matches = []
+        terrestrial_matches = []
+        for ordinal in candidates:
+            entry = self._entries[ordinal]
+            (bs_matches if entry[3] else terrestrial_matches).append(entry)
+
+        # 最も長い登録名、同じ長さなら登録順で先のもの（旧実装の max() と同じ選び方）
+        def best(entries):
+            return min(entries, key=lambda e: (-len(e[2]), e[0]))[1]
+
+        if ('BS' in clean_name or 'ＢＳ' in clean_name) and bs_matches:
+            return best(bs_matches)
+        if terrestrial_matches:
+            return best(terrestrial_matches)
+        return best(bs_matches)
+
+    def report_unresolved(self, limit=10):
+        """解決できなかったチャンネル名を件数の多い順に表示する"""
+        if not self.unresolved:
+            return
+        print(f"⚠️ チャンネルコード未解決: {len(self.unresolved)}種類")
+        for name, count in self.unresolved.most_common(limit):
+            print(f"    '{name}': {count}件")
@@ -0,0 +1,156 @@
+# checkpoint.py
+# v1.0.0 (2026-10-17)
+# 追加: 中断した実行を再開するための追記型チェックポイントジャーナル（JSONL）
+# 追加: 記録をスレッド間で共有できるようにロックを追加（JSON アップロードのワーカーからの完了記録）
+# 追加: 古いジャーナルの削除（一定日数更新のないものは再開に使わず、ディレクトリからも消す）
+import os
+import json
+import threading
+import time
+from datetime import datetime
+
+
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR", ".checkpoints")
+# 最終更新からこの日数を過ぎたジャーナルは再開に使わず削除する（中断したまま再実行されなかったもの）
+CHECKPOINT_MAX_AGE_DAYS = float(os.environ.get("CHECKPOINT_MAX_AGE_DAYS", "3"))
+
+
+class CheckpointJournal:
+    """実行パラメータ・完了済みID・未 flush の書き込み行を JSONL に追記するジャーナル。
+
+    レコード種別:
+      run     : 実行パラメータ（先頭行）
+      done    : 完了したID（kind ごと。例: event_id, talent_id）
+      pending : バッファへ入った行（テーブルごとの連番 seq 付き）
+      flushed : DB への書き込みが成功した seq の一覧
+
+    resume=True かつ同じパラメータのジャーナルがあれば読み込み、完了済みIDのスキップと
+    未 flush 行の再投入に使う。正常終了時は finish() でファイルを削除する。
+    作成時に directory 内の max_age_days 日以上更新のないジャーナルを削除する。
+    """
+
+    def __init__(self, name, params, resume=False, directory=CHECKPOINT_DIR, max_age_days=CHECKPOINT_MAX_AGE_DAYS):
+        self.path = os.path.join(directory, f"{name}.jsonl")
+        self.params = params
+        self.done = {}
+        self.pending = {}
+        self.resumed = False
+        self._next_seq = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        prune_journals(directory, max_age_days)
+
+        if resume and os.path.exists(self.path):
+            self.resumed = self._load()
+        if not self.resumed:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(self._dump({'type': 'run', 'params': params, 'started_at': datetime.now().isoformat()}))
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _dump(record):
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+    def _load(self):
+        """既存ジャーナルを読み込む。パラメータが異なる場合は再開しない"""
+        with open(self.path, encoding='utf-8') as f:
+            lines = f.readlines()
+        records = []
+        valid_bytes = 0
+        for line in lines:
+            # 強制終了で途中まで書かれた最終行（改行なし・JSON として不完全）は無視する
+            if not line.endswith("\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            valid_bytes += len(line.encode('utf-8'))
+        if not records or records[0].get('type') != 'run' or records[0].get('params') != self.params:
+            print(f"⚠️ チェックポイントの実行条件が一致しないため、最初から実行します: {self.path}")
+            return False
+
+        # 途中まで書かれた行を切り詰め、以降の追記が壊れた行に連結されないようにする
+        if valid_bytes < sum(len(line.encode('utf-8')) for line in lines):
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_bytes)
+
+        for record in records[1:]:
+            record_type = record.get('type')
+            if record_type == 'done':
+                self.done.setdefault(record['kind'], set()).add(str(record['id']))
+            elif record_type == 'pending':
+                table = record['table']
+                self.pending.setdefault(table, {})[record['seq']] = record['row']
+                self._next_seq[table] = max(self._next_seq.get(table, 0), record['seq'] + 1)
+            elif record_type == 'flushed':
+                table_pending = self.pending.get(record['table'], {})
+                for seq in record['seqs']:
+                    table_pending.pop(seq, None)
+
+        done_summary = ", ".join(f"{kind} {len(ids)}件" for kind, ids in self.done.items()) or "なし"
+        pending_summary = ", ".join(f"{table} {len(rows)}件" for table, rows in self.pending.items() if rows) or "なし"
+        print(f"♻️ チェックポイントから再開: 完了済み {done_summary} / 未登録 {pending_summary}")
+        return True
+
+    def _append(self, record):
+        # 呼び出し側で self._lock を取ってから呼ぶ
+        self._file.write(self._dump(record))
+        self._file.flush()
+
+    def is_done(self, kind, key):
+        with self._lock:
+            return str(key) in self.done.get(kind, ())
+
+    def mark_done(self, kind, key):
+        with self._lock:
+            self.done.setdefault(kind, set()).add(str(key))
+            self._append({'type': 'done', 'kind': kind, 'id': str(key)})
+
+    def record_pending(self, table, row):
+        """バッファへ入った行を記録し、その seq を返す"""
+        with self._lock:
+            seq = self._next_seq.get(table, 0)
+            self._next_seq[table] = seq + 1
+            self._append({'type': 'pending', 'table': table, 'seq': seq, 'row': row})
+        return seq
+
+    def record_flushed(self, table, seqs):
+        if seqs:
+            with self._lock:
+                self._append({'type': 'flushed', 'table': table, 'seqs': list(seqs)})
+
+    def unflushed(self, table):
+        """前回の実行で書き込みが確定しなかった (seq, row) を seq 順に返す"""
+        rows = self.pending.get(table, {})
+        return sorted(rows.items())
+
+    def finish(self):
+        """正常終了したのでジャーナルを削除する"""
+        with self._lock:
+            self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def prune_journals(directory=CHECKPOINT_DIR, max_age_days=CHECKPOINT_MAX_AGE_DAYS):
+    """最終更新から max_age_days 日以上経ったジャーナルを削除し、削除したパスを返す"""
+    if max_age_days is None or max_age_days <= 0 or not os.path.isdir(directory):
+        return []
+    cutoff = time.time() - max_age_days * 86400
+    removed = []
+    for file_name in os.listdir(directory):
+        path = os.path.join(directory, file_name)
+        if not file_name.endswith('.jsonl') or not os.path.isfile(path):
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed.append(path)
+        except OSError:
+            continue
+    if removed:
+        print(f"🧹 {max_age_days:g}日以上更新のないチェックポイントを削除: {len(removed)}件")
+    return removed
@@ -0,0 +1,77 @@
+# db_reader.py
+# v1.0.0 (2026-10-17)
+# 追加: 両スクレイパ共通のキーセットページング読み出し（主キー順に key > 直前の値 で次ページを取得）
+#       列の絞り込み・次ページの先読み（バックグラウンドスレッド）付きのジェネレータ
+from concurrent.futures import ThreadPoolExecutor
+
+
+READ_PAGE_SIZE = 1000  # PostgREST の既定上限（max-rows）以下にする
+
+
+def _with_key(columns, key):
+    """ページングのキー列が選択列に含まれていなければ追加する"""
+    names = [column.strip() for column in columns.split(",")]
+    if columns.strip() == "*" or key in names:
+        return columns
+    return f"{key}, {columns}"
+
+
+def iter_pages(client, table_name, columns, key, page_size=READ_PAGE_SIZE, filters=None, prefetch=False):
+    """table_name を key の昇順に page_size 件ずつ読み、ページ（行のリスト）を順に返すジェネレータ。
+
+    range()（OFFSET）ではなく key > 直前の値 で次ページを取るため、読み進めても1ページの
+    コストは一定になる。key は一意な列（主キーなど）であること。
+    filters はクエリを受け取って条件を付けて返す関数（例: lambda q: q.gte("broadcast_date", d)）。
+    prefetch=True なら、呼び出し側が現在のページを処理している間に次のページを取得しておく。
+    """
+    columns = _with_key(columns, key)
+
+    def fetch(after):
+        query = client.table(table_name).select(columns)
+        if filters is not None:
+            query = filters(query)
+        if after is not None:
+            query = query.gt(key, after)
+        return query.order(key).limit(page_size).execute().data or []
+
+    if not prefetch:
+        after = None
+        while True:
+            rows = fetch(after)
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            after = rows[-1][key]
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"read-{table_name}") as executor:
+        pending = executor.submit(fetch, None)
+        try:
+            while True:
+                rows = pending.result()
+                pending = None
+                if len(rows) == page_size:
+                    pending = executor.submit(fetch, rows[-1][key])
+                if rows:
+                    yield rows
+                if pending is None:
+                    return
+        finally:
+            # 途中で読むのをやめた場合は先読み中のページを待たずに捨てる
+            if pending is not None:
+                pending.cancel()
+
+
+def iter_rows(client, table_name, columns, key, page_size=READ_PAGE_SIZE, filters=None, prefetch=False):
+    """iter_pages() の各ページを1行ずつ返すジェネレータ"""
+    for rows in iter_pages(client, table_name, columns, key, page_size, filters, prefetch):
+        yield from rows
+
+
+def fetch_column_values(client, table_name, column, page_size=READ_PAGE_SIZE, filters=None, prefetch=True):
+    """一意な列 column の値を全件読み、文字列の集合で返す（NULL は除く）"""
+    return {
+        str(row[column])
+        for row in iter_rows(client, table_name, column, column, page_size, filters, prefetch)
+        if row.get(column) is not None
+    }
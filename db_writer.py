@@ -0,0 +1,128 @@
+# db_writer.py
+# v1.0.0 (2026-10-17)
+# 追加: 件数・経過時間のしきい値で Supabase へ逐次 flush するバッファ付きライタ
+# 追加: チェックポイントジャーナルへの未 flush 行の記録と、再開時の再投入（replay）
+# 追加: キーによるバッファ内重複除去と、失敗時にバッチを二分して再試行する適応的 upsert
+# 追加: 書き込みに成功したバッチを受け取るコールバック（on_written）
+import time
+
+
+def upsert_rows(client, table_name, rows, on_conflict, label=None, ignore_duplicates=False):
+    """rows を1リクエストで upsert し、(成功件数, 失敗件数) を返す"""
+    try:
+        client.table(table_name).upsert(rows, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates).execute()
+        return len(rows), 0
+    except Exception as e:
+        print(f"  -> {label or table_name} 登録エラー: {e}")
+        return 0, len(rows)
+
+
+def upsert_rows_adaptive(client, table_name, rows, on_conflict, label=None, min_batch=25):
+    """大きなバッチで upsert し、失敗したら半分に分けて再試行する。
+
+    ペイロード過大やタイムアウトで落ちたバッチも、分割して通る分は登録し、
+    min_batch 件以下でも失敗する塊だけを失敗として数える。(成功件数, 失敗件数) を返す。
+    """
+    try:
+        client.table(table_name).upsert(rows, on_conflict=on_conflict).execute()
+        return len(rows), 0
+    except Exception as e:
+        if len(rows) <= min_batch:
+            print(f"  -> {label or table_name} 登録エラー（{len(rows)}件）: {e}")
+            return 0, len(rows)
+        print(f"  -> {label or table_name} {len(rows)}件の登録に失敗したため分割して再試行します: {e}")
+
+    middle = len(rows) // 2
+    first = upsert_rows_adaptive(client, table_name, rows[:middle], on_conflict, label, min_batch)
+    second = upsert_rows_adaptive(client, table_name, rows[middle:], on_conflict, label, min_batch)
+    return first[0] + second[0], first[1] + second[1]
+
+
+class BufferedWriter:
+    """行をバッファし、max_rows 件または max_seconds 秒ごとにまとめて書き込むライタ。
+
+    write_batch(rows) は (成功件数, 失敗件数) を返す関数。depends_on に渡したライタは
+    自分より先に flush される（FK の親テーブルを先に書くため）。
+    journal（CheckpointJournal）を渡すと、バッファに入った行と書き込み成功を journal_key の
+    テーブル名で記録し、中断後は replay() で未登録の行を戻せる。
+    key（行 → 一意キー）を渡すと、flush 前のバッファ内で同じキーの行を1件にまとめる。
+    on_written（バッチ → None）を渡すと、失敗なく書き込めたバッチごとに呼ぶ（一部でも失敗したバッチは呼ばない）。
+    """
+
+    def __init__(self, name, write_batch, max_rows=500, max_seconds=30.0, depends_on=(),
+                 journal=None, journal_key=None, key=None, on_written=None):
+        self.name = name
+        self.write_batch = write_batch
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.depends_on = list(depends_on)
+        self.journal = journal
+        self.journal_key = journal_key or name
+        self.key = key
+        self.on_written = on_written
+        self.buffer = []
+        self._seqs = []
+        self._buffered_keys = set()
+        self.batches = 0
+        self.success = 0
+        self.errors = 0
+        self._last_flush = time.monotonic()
+
+    def add(self, row):
+        self._append(row)
+        self._maybe_flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self._append(row)
+        self._maybe_flush()
+
+    def _append(self, row, seq=None):
+        if self.key is not None:
+            row_key = self.key(row)
+            if row_key in self._buffered_keys:
+                return
+            self._buffered_keys.add(row_key)
+        if self.journal is not None:
+            self._seqs.append(seq if seq is not None else self.journal.record_pending(self.journal_key, row))
+        self.buffer.append(row)
+
+    def replay(self):
+        """ジャーナルに残っている前回未登録の行をバッファへ戻し、その件数を返す"""
+        if self.journal is None:
+            return 0
+        entries = self.journal.unflushed(self.journal_key)
+        for seq, row in entries:
+            self._append(row, seq)
+        return len(entries)
+
+    def _maybe_flush(self):
+        if len(self.buffer) >= self.max_rows or time.monotonic() - self._last_flush >= self.max_seconds:
+            self.flush()
+
+    def flush(self):
+        """依存ライタを先に flush し、バッファの内容を max_rows 件ずつ書き込む"""
+        for parent in self.depends_on:
+            parent.flush()
+        self._last_flush = time.monotonic()
+        self._buffered_keys.clear()
+        while self.buffer:
+            batch = self.buffer[:self.max_rows]
+            del self.buffer[:self.max_rows]
+            batch_seqs = self._seqs[:self.max_rows]
+            del self._seqs[:self.max_rows]
+            self.batches += 1
+            success, errors = self.write_batch(batch)
+            self.success += success
+            self.errors += errors
+            if not errors:
+                if self.journal is not None:
+                    # 失敗したバッチは未登録のまま残し、再開時に再投入する
+                    self.journal.record_flushed(self.journal_key, batch_seqs)
+                if self.on_written is not None:
+                    self.on_written(batch)
+            print(f"  -> {self.name}バッチ {self.batches}: {success}件登録完了" + (f", 失敗 {errors}件" if errors else ""))
+
+    def close(self):
+        self.flush()
+        return self.success, self.errors
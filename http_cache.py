@@ -0,0 +1,186 @@
+# http_cache.py
+# v1.0.0 (2026-10-17)
+# 追加: 両スクレイパ共通のディスク HTTP キャッシュ（ETag / Last-Modified による条件付きリクエスト）
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+# キャッシュ設定（環境変数で上書き可能）
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", ".http_cache")
+HTTP_CACHE_TTL_SECONDS = int(os.environ.get("HTTP_CACHE_TTL_SECONDS", str(14 * 24 * 3600)))  # 14日
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # 512MB
+HTTP_CACHE_ENABLED = os.environ.get("HTTP_CACHE_DISABLED", "") not in ("1", "true", "yes")
+
+
+class HttpCache:
+    """URL をキーにした永続レスポンスキャッシュ。
+
+    保存済みの ETag / Last-Modified を使って If-None-Match / If-Modified-Since を送り、
+    304 が返れば保存済み本文からレスポンスを組み立てる。エントリは TTL と総容量で削除する。
+    1 エントリ 1 ファイル（先頭行がメタ情報 JSON、以降が本文）で、書き込みは原子的に行う。
+    """
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, ttl_seconds=HTTP_CACHE_TTL_SECONDS,
+                 max_bytes=HTTP_CACHE_MAX_BYTES, enabled=HTTP_CACHE_ENABLED):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".cache")
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def load(self, url):
+        """キャッシュエントリ (meta, body) を返す。無い・期限切れ・破損なら None"""
+        path = self._path(url)
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline().decode('utf-8'))
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+
+        if meta.get('url') != url or len(body) != meta.get('size'):
+            return None
+        if time.time() - meta.get('validated_at', 0) > self.ttl_seconds:
+            self._remove(path)
+            return None
+        return meta, body
+
+    def store(self, url, response):
+        """検証子（ETag / Last-Modified）を持つレスポンスだけを保存する"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return False
+
+        body = response.content
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'encoding': response.encoding,
+            'headers': {k: v for k, v in response.headers.items()
+                        if k.lower() in ('content-type', 'etag', 'last-modified')},
+            'size': len(body),
+            'validated_at': time.time(),
+        }
+        self._write(self._path(url), meta, body)
+        self._count('stored')
+        return True
+
+    def _touch(self, url, meta, body):
+        """304 で再検証できたエントリの TTL を延長する"""
+        meta = dict(meta, validated_at=time.time())
+        self._write(self._path(url), meta, body)
+
+    def _write(self, path, meta, body):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json.dumps(meta, ensure_ascii=False).encode('utf-8') + b"\n")
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def get(self, session, url, **kwargs):
+        """session.get の代わりに使う条件付き GET。304 時は保存済みの本文を 200 として返す"""
+        if not self.enabled:
+            return session.get(url, **kwargs)
+
+        cached = self.load(url)
+        headers = dict(kwargs.pop('headers', None) or {})
+        if cached:
+            meta, _ = cached
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = session.get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and cached:
+            meta, body = cached
+            self._touch(url, meta, body)
+            self._count('hits')
+            return self._build_response(url, meta, body, response)
+
+        self._count('misses')
+        if response.status_code == 200:
+            self.store(url, response)
+        return response
+
+    def _build_response(self, url, meta, body, not_modified):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        response.headers = CaseInsensitiveDict(meta.get('headers') or {})
+        response.encoding = meta.get('encoding')
+        response.url = url
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        response.from_cache = True
+        return response
+
+    def prune(self):
+        """期限切れエントリを削除し、総容量が上限を超えていれば古い順に削除する"""
+        if not self.enabled or not os.path.isdir(self.cache_dir):
+            return 0
+
+        entries = []
+        now = time.time()
+        removed = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith(".tmp") or now - stat.st_mtime > self.ttl_seconds:
+                    removed += self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+
+        self._count('evicted', removed)
+        return removed
+
+    def summary(self):
+        """ログ出力用の統計文字列"""
+        return (
+            f"HTTPキャッシュ: 304再利用 {self.stats['hits']}件, 取得 {self.stats['misses']}件, "
+            f"保存 {self.stats['stored']}件, 削除 {self.stats['evicted']}件"
+        )
@@ -0,0 +1,155 @@
+# http_client.py
+# v1.0.0 (2026-10-17)
+# 追加: 両スクレイパ共通の HTTP セッション（接続プール・指数バックオフ付きリトライ・Retry-After 対応）
+# 追加: ホストごとのトークンバケット型レートリミッタ（スレッド間で共有）
+# 追加: 送信ペースを制限しながらスレッドで並列取得し、完了順に返す fetch_concurrently
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# 接続プール / リトライ設定（環境変数で上書き可能）
+HTTP_POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", "4"))  # プールを保持するホスト数
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "10"))  # ホストごとの keep-alive 接続数
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "4"))
+HTTP_BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", "1.0"))  # 1, 2, 4, 8 秒…（ジッタ付き）
+HTTP_BACKOFF_MAX = float(os.environ.get("HTTP_BACKOFF_MAX", "60"))
+
+# リトライ対象のステータス（429 / 5xx）。Retry-After ヘッダがあればその秒数を優先する
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+logger = logging.getLogger(__name__)
+
+
+class JitteredRetry(Retry):
+    """指数バックオフに揺らぎ（equal jitter）を加え、リトライ発生をログに残す Retry"""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return random.uniform(backoff / 2, backoff)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(
+            method=method, url=url, response=response, error=error, _pool=_pool, _stacktrace=_stacktrace
+        )
+        reason = f"HTTP {response.status}" if response is not None and response.status else repr(error)
+        host = _pool.host if _pool is not None else ""
+        logger.warning(
+            f"HTTPリトライ {len(new_retry.history)}回目（残り {new_retry.total}回）: {host}{url or ''} ({reason})"
+        )
+        return new_retry
+
+
+def build_retry(max_retries=HTTP_MAX_RETRIES, backoff_factor=HTTP_BACKOFF_FACTOR, backoff_max=HTTP_BACKOFF_MAX):
+    """5xx / 429 / タイムアウト / 接続リセットを対象にしたリトライ設定を作る"""
+    params = dict(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # 最終的なステータスは呼び出し側の raise_for_status に任せる
+    )
+    try:
+        return JitteredRetry(backoff_max=backoff_max, **params)
+    except TypeError:
+        # urllib3 1.x には backoff_max 引数がない（クラス属性で上限を設定）
+        retry = JitteredRetry(**params)
+        retry.BACKOFF_MAX = backoff_max
+        return retry
+
+
+def mount_adapter(session, pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                  max_retries=HTTP_MAX_RETRIES):
+    """セッションに接続プールとリトライ付きのアダプタを取り付ける（並列度の変更時にも使う）"""
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=build_retry(max_retries),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def create_session(headers=None, pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                   max_retries=HTTP_MAX_RETRIES):
+    """keep-alive 接続を再利用する共有セッションを作る"""
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    return mount_adapter(session, pool_connections, pool_maxsize, max_retries)
+
+
+class HostRateLimiter:
+    """ホストごとのトークンバケット（毎秒 requests_per_second 件、最大 burst 件まで連続送信可）。
+
+    全ワーカースレッドで1つを共有し、送信前に acquire(url) を呼ぶ。requests_per_second が
+    0 以下なら制限しない。burst=1 なら固定間隔で送るのと同じになる。
+    """
+
+    def __init__(self, requests_per_second, burst=1):
+        self.rate = float(requests_per_second)
+        self.burst = max(1.0, float(burst))
+        self._lock = threading.Lock()
+        self._buckets = {}  # host -> [残りトークン, 最終補充時刻]
+
+    def acquire(self, url):
+        """url のホストの送信枠が空くまで待機し、待った秒数を返す"""
+        if self.rate <= 0:
+            return 0.0
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.setdefault(host, [self.burst, now])
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            # トークンが足りなければ先に借りておき（負になる）、補充されるまで待つ
+            bucket[0] -= 1.0
+            wait = -bucket[0] / self.rate if bucket[0] < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def fetch_concurrently(items, fetch_fn, workers, requests_per_second, url=lambda item: item['link'], on_wait=None):
+    """items を workers 本のスレッドで fetch_fn(item) に渡し、完了した順に (item, 結果, 例外) を返すジェネレータ。
+
+    送信ペースは url(item) のホストごとに requests_per_second で制限する（全スレッドで1つの
+    HostRateLimiter を共有）。on_wait を渡すと、送信枠を待った秒数で呼ぶ。解析や DB 登録は
+    呼び出し側のスレッドで行う。
+    """
+    limiter = HostRateLimiter(requests_per_second)
+
+    def _run(item):
+        waited = limiter.acquire(url(item))
+        if on_wait is not None:
+            on_wait(waited)
+        return fetch_fn(item)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(_run, item): item for item in items}
+        try:
+            for future in as_completed(futures):
+                try:
+                    result, error = future.result(), None
+                except Exception as e:
+                    result, error = None, e
+                yield futures[future], result, error
+        finally:
+            # 途中で中断された場合は未着手の取得を取り消す
+            for future in futures:
+                future.cancel()
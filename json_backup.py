@@ -0,0 +1,178 @@
+# json_backup.py
+# v1.0.0 (2026-10-17)
+# 追加: json-backups バケットへのバックアップを専用ワーカープールで非同期アップロード
+# 追加: 出力形式の選択（pretty: 従来の整形 JSON / compact: 空白なし JSON / bundle: 日付×局ごとの gzip NDJSON）
+# 追加: metrics（run_metrics.RunMetrics）を渡すと、1件ごとのアップロード時間を json_upload 段階として記録
+# 追加: アップロードが確定した番組を受け取るコールバック（on_uploaded。チェックポイントの完了記録に使う）
+import gzip
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+JSON_BACKUP_BUCKET = 'json-backups'
+JSON_FORMATS = ('pretty', 'compact', 'bundle')
+JSON_UPLOAD_WORKERS = 4
+JSON_UPLOAD_QUEUE_SIZE = 200  # 満杯になったら submit が待つ（メモリ上限）
+
+
+def validate_json_data(data):
+    """JSONデータの妥当性を検証（シリアライズ可否は生成時に確認する）"""
+    # 必須フィールドの存在確認
+    required_fields = ['event_id', 'broadcast_date', 'channel', 'program_title']
+    for field in required_fields:
+        if field not in data or data[field] is None or data[field] == "":
+            return False, f"必須フィールド '{field}' が不正です"
+
+    # データ型の確認
+    if not isinstance(data.get('performers', []), list):
+        return False, "performersフィールドがリスト型ではありません"
+
+    return True, "OK"
+
+
+class JsonBackupUploader:
+    """JSON バックアップをバウンデッドキュー＋ワーカースレッドでアップロードする。
+
+    スクレイピング側は submit() で積むだけで、Storage API の待ち時間やリトライの
+    バックオフはワーカー側で消化する。bundle 形式では submit() の内容を日付×局ごとに
+    まとめ、flush_bundles() で1ファイル（gzip 圧縮の NDJSON）として送る。
+    on_uploaded（番組データのリスト → None）を渡すと、アップロードに成功したファイルの番組で
+    ワーカースレッドから呼ぶ。
+    """
+
+    def __init__(self, client, bucket=JSON_BACKUP_BUCKET, json_format='pretty', workers=JSON_UPLOAD_WORKERS,
+                 queue_size=JSON_UPLOAD_QUEUE_SIZE, max_retries=3, metrics=None, on_uploaded=None):
+        if json_format not in JSON_FORMATS:
+            raise ValueError(f"未対応の JSON 形式です: {json_format}")
+        self.client = client
+        self.bucket = bucket
+        self.json_format = json_format
+        self.max_retries = max_retries
+        self.metrics = metrics
+        self.on_uploaded = on_uploaded
+        self.run_id = datetime.now().strftime('%Y%m%d%H%M%S')
+        self.stats = {'queued': 0, 'success': 0, 'failed': 0, 'invalid': 0, 'retries': 0, 'bytes': 0, 'objects': 0}
+        self._stats_lock = threading.Lock()
+        self._bundles = {}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"json-upload-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def submit(self, storage_path, data):
+        """1番組分のバックアップを登録する（検証に失敗したら False）"""
+        is_valid, validation_msg = validate_json_data(data)
+        if not is_valid:
+            print(f"❌ JSON検証失敗 ({storage_path}): {validation_msg}")
+            self._count('invalid')
+            return False
+
+        if self.json_format == 'bundle':
+            key = (data['broadcast_date'], data.get('channel_code') or 'UNKNOWN')
+            self._bundles.setdefault(key, []).append(data)
+            self._count('queued')
+            return True
+
+        self._queue.put(('document', storage_path, data))
+        self._count('queued')
+        return True
+
+    def pending(self):
+        """アップロード待ちのキュー長"""
+        return self._queue.qsize()
+
+    def flush_bundles(self):
+        """bundle 形式で溜めた分を日付×局ごとの gzip NDJSON としてキューへ送る"""
+        bundles, self._bundles = self._bundles, {}
+        for (date_str, channel_code), documents in bundles.items():
+            # 実行ごとに別ファイルにする（差分スキップで件数が減った実行が上書きしないように）
+            storage_path = f"{date_str}/{channel_code}/{date_str}_{channel_code}_{self.run_id}.ndjson.gz"
+            self._queue.put(('bundle', storage_path, documents))
+
+    def _encode(self, kind, data):
+        if kind == 'bundle':
+            lines = "".join(json.dumps(doc, ensure_ascii=False, separators=(',', ':')) + "\n" for doc in data)
+            # gzip ファイルそのものとして保存する（content-encoding を付けるとダウンロード時に展開されてしまう）
+            return gzip.compress(lines.encode('utf-8')), "application/gzip"
+        if self.json_format == 'compact':
+            json_string = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        else:
+            json_string = json.dumps(data, ensure_ascii=False, indent=2)
+        if len(json_string) < 50:  # 最小サイズチェック
+            raise ValueError(f"JSONデータが小さすぎます: {len(json_string)}文字")
+        return json_string.encode('utf-8'), "application/json;charset=utf-8"
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            kind, storage_path, data = item
+            documents = len(data) if kind == 'bundle' else 1
+            started = time.perf_counter()
+            try:
+                uploaded = self._upload(kind, storage_path, data)
+                if uploaded:
+                    self._count('success', documents)
+                    if self.on_uploaded is not None:
+                        self.on_uploaded(data if kind == 'bundle' else [data])
+                else:
+                    self._count('failed', documents)
+                    print(f"  -> JSON保存失敗: {storage_path}")
+                if self.metrics is not None:
+                    self.metrics.observe('json_upload', time.perf_counter() - started)
+                    if not uploaded:
+                        self.metrics.count_error('json_upload')
+            finally:
+                self._queue.task_done()
+
+    def _upload(self, kind, storage_path, data):
+        try:
+            body, content_type = self._encode(kind, data)
+        except Exception as e:
+            print(f"❌ JSON生成エラー ({storage_path}): {e}")
+            return False
+
+        file_options = {"content-type": content_type, "upsert": "true"}
+
+        # アップロード試行（リトライはワーカー内で行い、スクレイピングを止めない）
+        for attempt in range(self.max_retries):
+            try:
+                self.client.storage.from_(self.bucket).upload(path=storage_path, file=body, file_options=file_options)
+                self._count('bytes', len(body))
+                self._count('objects')
+                return True
+            except Exception as e:
+                print(f"⚠️ JSON保存試行 {attempt + 1}/{self.max_retries} 失敗 ({storage_path}): {e}")
+                if attempt < self.max_retries - 1:
+                    self._count('retries')
+                    time.sleep(2 ** attempt)  # 指数バックオフ
+        return False
+
+    def close(self):
+        """残りのバンドルを送り、キューが空になるまで待ってワーカーを止める"""
+        self.flush_bundles()
+        self._queue.join()
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        return self.stats
+
+    def summary(self):
+        return (
+            f"JSON保存: 成功 {self.stats['success']}件, 失敗 {self.stats['failed'] + self.stats['invalid']}件 "
+            f"（{self.json_format}, {self.stats['objects']}オブジェクト, {self.stats['bytes'] / 1024:.0f}KB, "
+            f"リトライ {self.stats['retries']}回）"
+        )
@@ -0,0 +1,243 @@
+# metrics_exporter.py
+# v1.0.0 (2026-10-17)
+# 追加: RunMetrics を Prometheus テキスト形式 / OpenMetrics で公開するオプションのエクスポータ
+#       （METRICS_PORT で /metrics を待ち受け、METRICS_PUSHGATEWAY_URL で終了時に Pushgateway へ送信）
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+import requests
+
+
+# 環境変数で有効化する（どちらも未設定なら何もしない）
+METRICS_PORT = os.environ.get("METRICS_PORT", "")
+METRICS_HOST = os.environ.get("METRICS_HOST", "0.0.0.0")
+METRICS_PUSHGATEWAY_URL = os.environ.get("METRICS_PUSHGATEWAY_URL", "")
+METRICS_INSTANCE = os.environ.get("METRICS_INSTANCE", "")  # Pushgateway のグループ（複数台で上書きし合わないように）
+
+METRIC_PREFIX = "scraper"
+# 段階の所要時間（秒）と DB バッチ行数のバケット
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_ROW_BUCKETS = (1, 10, 50, 100, 200, 500, 1000, 2000)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return f"{value:.1f}"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Family:
+    """1つのメトリクス（# HELP / # TYPE と複数のサンプル行）"""
+
+    def __init__(self, name, metric_type, help_text):
+        self.name = name
+        self.metric_type = metric_type
+        self.help_text = help_text
+        self.samples = []
+
+    def add(self, suffix, labels, value):
+        self.samples.append((self.name + suffix, labels, value))
+
+    def add_histogram(self, labels, values, buckets):
+        values = sorted(values)
+        index = 0
+        for bound in buckets:
+            while index < len(values) and values[index] <= bound:
+                index += 1
+            self.add("_bucket", dict(labels, le=_number(float(bound))), index)
+        self.add("_bucket", dict(labels, le="+Inf"), len(values))
+        self.add("_sum", labels, float(sum(values)))
+        self.add("_count", labels, len(values))
+
+    def render(self, openmetrics):
+        # OpenMetrics では counter のファミリー名に _total を付けない
+        family_name = self.name
+        if openmetrics and self.metric_type == "counter" and family_name.endswith("_total"):
+            family_name = family_name[:-len("_total")]
+        lines = [f"# HELP {family_name} {self.help_text}", f"# TYPE {family_name} {self.metric_type}"]
+        lines.extend(f"{name}{_labels(labels)} {_number(value)}" for name, labels, value in self.samples)
+        return lines
+
+
+def collect(metrics, success=None):
+    """RunMetrics の内容をメトリクスファミリーの一覧にする"""
+    data = metrics.samples()
+    base = {"scraper": metrics.job}
+
+    def family(name, metric_type, help_text):
+        return _Family(f"{METRIC_PREFIX}_{name}", metric_type, help_text)
+
+    stage_duration = family("stage_duration_seconds", "histogram", "Duration of each call of a pipeline stage.")
+    for stage, values in sorted(data["timings"].items()):
+        stage_duration.add_histogram(dict(base, stage=stage), values, DURATION_BUCKETS)
+
+    stage_errors = family("stage_errors_total", "counter", "Calls of a pipeline stage that raised an error.")
+    for stage in sorted(data["timings"]):
+        stage_errors.add("", dict(base, stage=stage), data["stage_errors"].get(stage, 0))
+
+    batch_rows = family("db_batch_rows", "histogram", "Rows per database write batch.")
+    for writer, values in sorted(data["batch_sizes"].items()):
+        batch_rows.add_histogram(dict(base, writer=writer), values, BATCH_ROW_BUCKETS)
+
+    counters = dict(data["counters"])
+    http_requests = family("http_requests_total", "counter", "HTTP responses received, by status code.")
+    for status, count in sorted(data["http_status"].items()):
+        http_requests.add("", dict(base, status=status), count)
+    http_retries = family("http_retries_total", "counter", "HTTP retries performed by urllib3, by reason.")
+    for key in sorted(counters):
+        if key.startswith("http_retry:"):
+            http_retries.add("", dict(base, reason=key.split(":", 1)[1]), counters.pop(key))
+    http_bytes = family("http_response_bytes_total", "counter", "HTTP response body bytes received.")
+    http_bytes.add("", base, counters.pop("http_bytes", 0))
+    counters.pop("http_requests", None)
+    counters.pop("http_retries", None)
+
+    items = family("items_total", "counter", "Items processed in this run, by kind.")
+    for kind, count in sorted(counters.items()):
+        items.add("", dict(base, kind=kind), count)
+
+    queue_depth = family("queue_depth", "gauge", "Current length of an internal queue or write buffer.")
+    for queue, depth in sorted(metrics.queue_depths().items()):
+        queue_depth.add("", dict(base, queue=queue), depth)
+
+    run_duration = family("run_duration_seconds", "gauge", "Seconds since the run started.")
+    run_duration.add("", base, round(data["elapsed_seconds"], 3))
+    run_start = family("run_start_time_seconds", "gauge", "Unix time the run started.")
+    run_start.add("", base, round(metrics.started_at.timestamp(), 3))
+
+    families = [
+        stage_duration, stage_errors, batch_rows, http_requests, http_retries, http_bytes,
+        items, queue_depth, run_duration, run_start,
+    ]
+    if success is not None:
+        run_success = family("run_success", "gauge", "1 if the run finished successfully, 0 if it failed.")
+        run_success.add("", base, 1 if success else 0)
+        finished = family("run_finish_time_seconds", "gauge", "Unix time the run finished.")
+        finished.add("", base, round(time.time(), 3))
+        families.extend([run_success, finished])
+    return families
+
+
+def render(metrics, openmetrics=False, success=None):
+    """テキスト形式（openmetrics=True なら OpenMetrics 1.0）の本文を返す"""
+    lines = []
+    for family in collect(metrics, success):
+        lines.extend(family.render(openmetrics))
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """RunMetrics を /metrics で公開し、終了時に Pushgateway へ送る。
+
+    port も pushgateway_url も指定しなければ無効（start / close は何もしない）。
+    /metrics は Accept ヘッダに application/openmetrics-text があれば OpenMetrics で返す。
+    """
+
+    def __init__(self, metrics, port=None, host=METRICS_HOST, pushgateway_url=None, instance=METRICS_INSTANCE,
+                 push_timeout=10):
+        self.metrics = metrics
+        self.port = int(port) if port not in (None, "") else None
+        self.host = host
+        self.pushgateway_url = (pushgateway_url or "").rstrip("/")
+        self.instance = instance
+        self.push_timeout = push_timeout
+        self.success = None
+        self._server = None
+
+    @classmethod
+    def from_env(cls, metrics):
+        return cls(metrics, port=METRICS_PORT, pushgateway_url=METRICS_PUSHGATEWAY_URL)
+
+    @property
+    def enabled(self):
+        return self.port is not None or bool(self.pushgateway_url)
+
+    @property
+    def server_port(self):
+        return self._server.server_address[1] if self._server else None
+
+    def start(self):
+        """/metrics の待ち受けをデーモンスレッドで始める（port 未指定なら何もしない）"""
+        if self.port is None or self._server is not None:
+            return self
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                openmetrics = "application/openmetrics-text" in (self.headers.get("Accept") or "")
+                body = render(exporter.metrics, openmetrics, exporter.success).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-exporter", daemon=True).start()
+        print(f"📈 メトリクス公開: http://{self.host}:{self.server_port}/metrics")
+        return self
+
+    def push_url(self):
+        url = f"{self.pushgateway_url}/metrics/job/{quote(self.metrics.job, safe='')}"
+        if self.instance:
+            url += f"/instance/{quote(self.instance, safe='')}"
+        return url
+
+    def push(self):
+        """Pushgateway へ現在の値を送る（同じグループの前回値は置き換わる）。成否を返す"""
+        if not self.pushgateway_url:
+            return False
+        try:
+            response = requests.put(
+                self.push_url(),
+                data=render(self.metrics, success=self.success).encode("utf-8"),
+                headers={"Content-Type": PROMETHEUS_CONTENT_TYPE},
+                timeout=self.push_timeout,
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Pushgateway への送信に失敗しました: {e}")
+            return False
+        print(f"📈 メトリクスを Pushgateway へ送信しました: {self.push_url()}")
+        return True
+
+    def close(self, success=None):
+        """実行結果を記録して Pushgateway へ送り、/metrics の待ち受けを止める"""
+        self.success = success
+        self.push()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def start_metrics_exporter(metrics):
+    """環境変数（METRICS_PORT / METRICS_PUSHGATEWAY_URL）に従ってエクスポータを作って開始する"""
+    return MetricsExporter.from_env(metrics).start()
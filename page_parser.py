@@ -0,0 +1,141 @@
+# page_parser.py
+# v1.0.0 (2026-10-17)
+# 追加: bangumi.org のページ解析層（lxml 優先のパーサ選択と SoupStrainer による部分木構築）
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+def _detect_parser():
+    """利用可能な最速のパーサを選ぶ（SCRAPER_HTML_PARSER で固定可能）"""
+    configured = os.environ.get("SCRAPER_HTML_PARSER")
+    if configured:
+        return configured
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+HTML_PARSER = _detect_parser()
+
+# 実際に参照する要素だけで木を作るためのストレイナ
+# EPG 一覧: li.js_channel（チャンネル名）と ul#program_line_*（番組枠）
+EPG_STRAINER = SoupStrainer(["li", "ul"])
+# 番組詳細: meta[name=description], p.letter_body, p.genre, ul.related_link a, a[href*='/talents/']
+DETAIL_STRAINER = SoupStrainer(["meta", "p", "ul", "a"])
+
+
+def make_soup(markup, parse_only=None, parser=None):
+    """BeautifulSoup を生成する。parse_only を渡すと該当要素の部分木だけを構築する"""
+    return BeautifulSoup(markup, parser or HTML_PARSER, parse_only=parse_only)
+
+
+def clean_text(text):
+    """テキストのクリーニング（Noneや空文字の処理）"""
+    if text is None:
+        return ""
+    return str(text).strip()
+
+
+def safe_extract_talent_info(link_element):
+    """安全なタレント情報抽出"""
+    try:
+        name = clean_text(link_element.get_text(strip=True))
+        href = link_element.get("href", "")
+
+        # 基本的な妥当性チェック
+        if not name or not href:
+            return None
+
+        if href.rstrip("/").endswith("talents"):
+            return None
+
+        # talent_idの抽出と検証
+        talent_id = href.rstrip("/").split("/")[-1].split("?")[0]
+        if not talent_id.isdigit():
+            return None
+
+        full_link = "https://bangumi.org" + href if href.startswith("/") else href
+
+        return {
+            "talent_id": talent_id,
+            "name": name,
+            "link": full_link
+        }
+    except Exception as e:
+        print(f"⚠️ タレント情報抽出エラー: {e}")
+        return None
+
+
+def parse_epg_page(html, parser=None, strained=True):
+    """EPG 一覧ページからチャンネル名リストと番組枠を抽出する。
+
+    戻り値: (channel_names, programs)。programs の各要素は channel_index（チャンネル列の位置）、
+    event_id, href, start_time, end_time, program_title, program_detail を持つ。
+    """
+    soup = make_soup(html, EPG_STRAINER if strained else None, parser)
+    channel_tags = soup.find_all("li", class_="js_channel topmost")
+    channel_names = [tag.text.strip() for tag in channel_tags]
+    program_lines = soup.find_all("ul", id=lambda x: x and x.startswith("program_line_"))
+
+    programs = []
+    for i, line in enumerate(program_lines):
+        for program_tag in line.find_all("li"):
+            a_tag = program_tag.find("a", class_="title_link")
+            if not a_tag:
+                continue
+
+            href = a_tag.get("href", "")
+            event_id = href.split("/")[-1].split("?")[0]
+            if not event_id:
+                continue
+
+            # 番組タイトルと詳細の安全な取得
+            title_elem = a_tag.find("p", class_="program_title")
+            detail_elem = a_tag.find("p", class_="program_detail")
+
+            programs.append({
+                "channel_index": i,
+                "event_id": event_id,
+                "href": href,
+                "start_time": clean_text(program_tag.get("s", "")),
+                "end_time": clean_text(program_tag.get("e", "")),
+                "program_title": clean_text(title_elem.text if title_elem else ""),
+                "program_detail": clean_text(detail_elem.text if detail_elem else ""),
+            })
+    return channel_names, programs
+
+
+def parse_program_detail(html, parser=None, strained=True):
+    """番組詳細ページから説明・ジャンル・公式サイト・出演者リンクを抽出する"""
+    soup = make_soup(html, DETAIL_STRAINER if strained else None, parser)
+
+    # メタ情報の安全な取得
+    meta_desc = soup.find("meta", {"name": "description"})
+    description = clean_text(meta_desc["content"] if meta_desc else "")
+
+    letter_body = soup.find("p", class_="letter_body")
+    description_detail = clean_text(letter_body.get_text(strip=True) if letter_body else "")
+
+    genre_tag = soup.find("p", class_="genre nomal")
+    genre = clean_text(genre_tag.get_text(strip=True).replace("\u3000", " ") if genre_tag else "")
+
+    site_tag = soup.select_one("ul.related_link a")
+    official_website = clean_text(site_tag.get("href") if site_tag else "")
+
+    # 出演者リンク抽出（堅牢化）: 名前 → リンク
+    performer_links = {}
+    for link_elem in soup.select("a[href*='/talents/']"):
+        talent_info = safe_extract_talent_info(link_elem)
+        if talent_info:
+            performer_links[talent_info["name"]] = talent_info["link"]
+
+    return {
+        "description": description,
+        "description_detail": description_detail,
+        "genre": genre,
+        "official_website": official_website,
+        "performer_links": performer_links,
+    }
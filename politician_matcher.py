@@ -0,0 +1,241 @@
+# politician_matcher.py
+# v1.0.0 (2026-10-17)
+# 追加: 国会議員名簿（reference/politicians_gazetteer.csv）の氏名・読みを Aho–Corasick で番組テキストと照合し、
+#       今回登録・変更した番組の分だけ議員ごとの登場数の増減を反映する（全件の照合は週1回の照合ジョブ）
+import csv
+import os
+from collections import deque
+from datetime import datetime
+
+from db_reader import iter_pages
+from time_utils import parse_timestamp
+
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reference', 'politicians_gazetteer.csv')
+# 政治文脈の語（webapp の POLITICAL_KEYWORDS と同じ語）。氏名と同じ番組テキストに1語以上あれば登場とみなす
+POLITICAL_CONTEXT = (
+    '政治', '国会', '選挙', '内閣', '首相', '総理', '与党', '野党', '政権',
+    '自民', '立憲', '維新', '国民民主', '公明', '共産', 'れいわ', '参政',
+    '議員', '大臣', '官房長官', '解散', '法案', '予算', '外交', '防衛',
+)
+READING_MIN_LENGTH = 5  # 短い読み（ひらがな）は一般語と衝突しやすいので照合に使わない
+PROGRAM_TEXT_COLUMNS = ('program_title', 'description', 'description_detail')
+ROSTER_COLUMNS = ('name', 'reading', 'party', 'chamber', 'district')  # politician_roster の列
+PROGRAM_TABLES = ('programs', 'programs_archive')
+HITS_TABLE = 'politician_tv_hits'
+
+POLITICIAN_HITS_MODES = ('incremental', 'full', 'rpc')
+# Web アプリの app_politicians を politician_tv_hits に切り替えるまでは従来の rpc（sql/politician_hits.sql の手順）
+POLITICIAN_HITS_MODE = os.environ.get("POLITICIAN_HITS_MODE", "rpc")
+# incremental: 前回の全件照合からこの日数が経っていたら警告する（全件照合は --politician-mode full）
+POLITICIAN_RECONCILE_DAYS = float(os.environ.get("POLITICIAN_RECONCILE_DAYS", "7"))
+APPLY_CHUNK_SIZE = 500  # RPC apply_politician_hits の1回あたりの番組数
+
+
+class AhoCorasick:
+    """複数パターンの同時照合（テキスト長＋一致数に比例する時間で全パターンを探す）"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._built = False
+
+    def add(self, pattern, value):
+        if not pattern:
+            return
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(value)
+        self._built = False
+
+    def build(self):
+        """失敗遷移を幅優先で張る（add の後、照合の前に1回呼ぶ）"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+        self._built = True
+        return self
+
+    def iter_values(self, text):
+        """text に現れたパターンの value を出現順に返す（重複あり）"""
+        if not self._built:
+            self.build()
+        node = 0
+        for char in text:
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            yield from self._output[node]
+
+
+def load_gazetteer(path=GAZETTEER_PATH):
+    """名簿 CSV（name, reading, party, chamber, district）を読み込む"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return [row for row in csv.DictReader(f) if row.get('name')]
+
+
+class PoliticianMatcher:
+    """番組テキストに氏名（または読み）と政治文脈の語が両方あれば、その議員の登場とみなす"""
+
+    def __init__(self, gazetteer=None, context_words=POLITICAL_CONTEXT, reading_min_length=READING_MIN_LENGTH):
+        self.names = set()
+        self._automaton = AhoCorasick()
+        for politician in gazetteer if gazetteer is not None else load_gazetteer():
+            name = politician['name'].strip()
+            self.names.add(name)
+            for pattern in {name, name.replace(' ', '').replace('　', '')}:
+                self._automaton.add(pattern, ('name', name))
+            reading = (politician.get('reading') or '').strip()
+            if len(reading) >= reading_min_length:
+                self._automaton.add(reading, ('name', name))
+        for word in context_words:
+            self._automaton.add(word, ('context', word))
+        self._automaton.build()
+
+    def match(self, text):
+        """text に登場する議員名の集合（政治文脈の語がなければ空）"""
+        if not text:
+            return set()
+        names = set()
+        has_context = False
+        for kind, value in self._automaton.iter_values(text):
+            if kind == 'name':
+                names.add(value)
+            else:
+                has_context = True
+        return names if has_context else set()
+
+    def match_program(self, row):
+        return self.match(' '.join(row.get(column) or '' for column in PROGRAM_TEXT_COLUMNS))
+
+
+class PoliticianHits:
+    """議員ごとのテレビ登場数を更新する（sql/politician_hits.sql を使用）。
+
+    incremental は今回登録・変更した event_id の番組だけを照合し、番組ごとの一致を
+    RPC apply_politician_hits で置き換える（議員ごとの増減は DB 内で計算して登場数に加算）。
+    full は稼働テーブルとアーカイブの全番組を照合し直し、reconcile_politician_hits で名簿と登場数を
+    置き換える（週1回の照合ジョブ）。rpc は従来の refresh_politician_hits（DB 内で全件照合）を呼ぶ。
+    incremental は差分しか数えないので、full で一度も照合していなければ実行を拒否する。
+    """
+
+    def __init__(self, client, matcher=None, mode=POLITICIAN_HITS_MODE, reconcile_days=POLITICIAN_RECONCILE_DAYS,
+                 chunk_size=APPLY_CHUNK_SIZE, gazetteer=None):
+        if mode not in POLITICIAN_HITS_MODES:
+            raise ValueError(f"未対応の政治家登場数の更新方法です: {mode}")
+        self.client = client
+        self._matcher = matcher
+        self._gazetteer = gazetteer
+        self.mode = mode
+        self.reconcile_days = reconcile_days
+        self.chunk_size = chunk_size
+
+    @property
+    def gazetteer(self):
+        if self._gazetteer is None:
+            self._gazetteer = load_gazetteer()
+        return self._gazetteer
+
+    @property
+    def matcher(self):
+        if self._matcher is None:
+            self._matcher = PoliticianMatcher(self.gazetteer)
+        return self._matcher
+
+    def refresh(self, event_ids=()):
+        """登場数を更新し、テレビ登場のある議員数を返す"""
+        if self.mode == 'rpc':
+            return self._refresh_rpc()
+        if self.mode == 'full':
+            return self._refresh_full()
+        try:
+            reconciled_at = self._last_reconciled_at()
+        except Exception as e:
+            print(f"⚠️ {HITS_TABLE} が使えないため、従来の RPC で更新します: {e}")
+            return self._refresh_rpc()
+        if reconciled_at is None:
+            # 差分だけでは過去の番組が数えられず、登場数が実際より少なくなる
+            raise RuntimeError(f"{HITS_TABLE} が未照合です。先に --politician-mode full で全件照合してください")
+        if (datetime.now() - reconciled_at).total_seconds() >= self.reconcile_days * 86400:
+            print(f"⚠️ 政治家登場数の全件照合から{self.reconcile_days:g}日以上経っています（--politician-mode full）")
+        return self._refresh_incremental(sorted({str(event_id) for event_id in event_ids if event_id}))
+
+    def _last_reconciled_at(self):
+        res = self.client.table(HITS_TABLE).select('reconciled_at').order('reconciled_at', desc=True).limit(1).execute()
+        return parse_timestamp((res.data or [{}])[0].get('reconciled_at'))
+
+    def _apply(self, rows):
+        """番組の行を照合し、RPC で番組ごとの一致を置き換える。戻り値は議員ごとの増減"""
+        deltas = {}
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            hits = [
+                {'event_id': str(row['event_id']), 'politician_name': name}
+                for row in chunk
+                for name in sorted(self.matcher.match_program(row))
+            ]
+            res = self.client.rpc('apply_politician_hits', {
+                'p_event_ids': [str(row['event_id']) for row in chunk],
+                'p_hits': hits,
+            }).execute()
+            for row in res.data or []:
+                deltas[row['politician_name']] = deltas.get(row['politician_name'], 0) + int(row['delta'])
+        return deltas
+
+    def _refresh_incremental(self, event_ids):
+        deltas = {}
+        matched = 0
+        for start in range(0, len(event_ids), self.chunk_size):
+            res = self.client.table('programs').select('event_id, ' + ', '.join(PROGRAM_TEXT_COLUMNS)).in_(
+                'event_id', event_ids[start:start + self.chunk_size]
+            ).execute()
+            rows = res.data or []
+            matched += len(rows)
+            for name, delta in self._apply(rows).items():
+                deltas[name] = deltas.get(name, 0) + delta
+        changed = sorted((name, delta) for name, delta in deltas.items() if delta)
+        detail = f"（{', '.join(f'{name} {delta:+d}' for name, delta in changed[:10])}）" if changed else ""
+        print(f"🏛️ 政治家登場数を差分更新: 照合 {matched}番組, 増減 {len(changed)}名{detail}")
+        return self._count_politicians()
+
+    def _refresh_full(self):
+        matched = 0
+        columns = ', '.join(PROGRAM_TEXT_COLUMNS)
+        for table_name in PROGRAM_TABLES:
+            for rows in iter_pages(self.client, table_name, columns, 'event_id', prefetch=True):
+                self._apply(rows)
+                matched += len(rows)
+        roster = [
+            {column: (politician.get(column) or '').strip() for column in ROSTER_COLUMNS}
+            for politician in self.gazetteer
+        ]
+        self.client.rpc('reconcile_politician_hits', {'p_roster': roster}).execute()
+        print(f"🏛️ 政治家登場数を全件照合: {matched}番組, 名簿 {len(roster)}名")
+        return self._count_politicians()
+
+    def _refresh_rpc(self):
+        data = self.client.rpc('refresh_politician_hits').execute().data
+        # スカラー返り（テレビ登場のある議員数）を頑健に取り出す
+        if isinstance(data, list):
+            data = data[0] if data else None
+        return int(data) if data is not None else None
+
+    def _count_politicians(self):
+        res = self.client.table(HITS_TABLE).select('politician_name', count='exact', head=True).gt('tv_hits', 0).execute()
+        return res.count or 0
@@ -0,0 +1,132 @@
+# post_run.py
+# v1.0.0 (2026-10-17)
+# 追加: 実行後の後処理（アーカイブ・RPC・累積件数・通知など）を依存関係に沿って並行実行する小さなタスクグラフ
+#       （ステップごとのタイムアウト・所要時間・スキップの記録）
+import queue
+import threading
+import time
+
+
+STATUS_LABELS = {
+    'ok': '完了',
+    'failed': '失敗',
+    'timeout': 'タイムアウト',
+    'skipped': 'スキップ',
+}
+
+
+class TaskResult:
+    def __init__(self, status, value=None, error=None, seconds=0.0):
+        self.status = status
+        self.value = value
+        self.error = error
+        self.seconds = seconds
+
+
+class TaskGraph:
+    """依存関係のあるステップを、依存先が終わりしだい別スレッドで並行に実行する。
+
+    after は順序だけの依存（依存先の成否に関係なく実行）、requires は成功が必要な依存
+    （依存先が失敗・タイムアウト・スキップなら自分もスキップ）。timeout 秒を過ぎたステップは
+    タイムアウトとして扱い、後続を待たせない（スレッドは止められないのでデーモンとして放置する）。
+    metrics（run_metrics.RunMetrics）を渡すと、ステップ名の段階として所要時間を記録する。
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self.results = {}
+        self._tasks = {}
+
+    def add(self, name, fn, after=(), requires=(), timeout=None):
+        for dependency in list(after) + list(requires):
+            if dependency not in self._tasks:
+                raise ValueError(f"未登録のステップに依存しています: {name} → {dependency}")
+        self._tasks[name] = {'fn': fn, 'after': list(after), 'requires': list(requires), 'timeout': timeout}
+        return self
+
+    def value(self, name, default=None):
+        """成功したステップの戻り値（失敗・タイムアウト・スキップなら default）"""
+        result = self.results.get(name)
+        return result.value if result is not None and result.status == 'ok' else default
+
+    def _finish(self, name, result):
+        self.results[name] = result
+        label = STATUS_LABELS[result.status]
+        detail = f": {result.error}" if result.error else ""
+        print(f"⏱️ 後処理 {name}: {label}（{result.seconds:.1f}秒）{detail}")
+        if self.metrics is not None:
+            if result.status != 'skipped':
+                self.metrics.observe(name, result.seconds)
+            if result.status in ('failed', 'timeout'):
+                self.metrics.count_error(name)
+            if result.status != 'ok':
+                self.metrics.count(f"post_run_{result.status}")
+
+    def _start(self, name, task, done):
+        def target():
+            started = time.perf_counter()
+            try:
+                value = task['fn']()
+            except Exception as e:
+                done.put((name, TaskResult('failed', error=str(e), seconds=time.perf_counter() - started)))
+                return
+            done.put((name, TaskResult('ok', value=value, seconds=time.perf_counter() - started)))
+
+        threading.Thread(target=target, name=f"post-run-{name}", daemon=True).start()
+
+    def run(self):
+        """全ステップが終わる（またはタイムアウトする）まで実行し、名前 → TaskResult を返す"""
+        pending = dict(self._tasks)
+        running = {}  # 名前 -> (開始時刻, 期限)
+        done = queue.Queue()
+
+        while pending or running:
+            # 依存先が全て終わったステップを開始する（スキップが連鎖するので変化がなくなるまで繰り返す）
+            started_any = True
+            while started_any:
+                started_any = False
+                for name, task in list(pending.items()):
+                    if any(dep not in self.results for dep in task['after'] + task['requires']):
+                        continue
+                    del pending[name]
+                    started_any = True
+                    unmet = [dep for dep in task['requires'] if self.results[dep].status != 'ok']
+                    if unmet:
+                        self._finish(name, TaskResult('skipped', error=f"{', '.join(unmet)} が完了しなかったため"))
+                        continue
+                    now = time.monotonic()
+                    running[name] = (now, now + task['timeout'] if task['timeout'] else None)
+                    self._start(name, task, done)
+
+            if not running:
+                continue
+
+            deadlines = [deadline for _, deadline in running.values() if deadline is not None]
+            wait = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            try:
+                name, result = done.get(timeout=wait)
+                if name in running:  # タイムアウト済みのステップの遅れた完了は無視する
+                    del running[name]
+                    self._finish(name, result)
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            for name, (started, deadline) in list(running.items()):
+                if deadline is not None and now >= deadline:
+                    del running[name]
+                    self._finish(name, TaskResult(
+                        'timeout', error=f"{self._tasks[name]['timeout']}秒以内に終わりませんでした", seconds=now - started
+                    ))
+        return self.results
+
+    def summary(self):
+        """実行レポート用: 名前 → {status, seconds, error}"""
+        return {
+            name: {'status': result.status, 'seconds': round(result.seconds, 3), 'error': result.error}
+            for name, result in self.results.items()
+        }
+
+    def problems(self):
+        """完了しなかったステップの (名前, 状態の表示名) の一覧"""
+        return [(name, STATUS_LABELS[result.status]) for name, result in self.results.items() if result.status != 'ok']
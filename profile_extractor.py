@@ -0,0 +1,186 @@
+# profile_extractor.py
+# v1.0.0 (2026-10-17)
+# 追加: タレントプロフィールの項目抽出（正規表現はインポート時に一度だけコンパイルし、要素探索は1回の走査で行う）
+# 追加: 抽出結果の内容指紋（変更のないプロフィールの書き込みを省くため）
+import re
+import json
+import hashlib
+
+
+# 項目ラベル（li / span の文字列に含まれるもの）
+NAME_LABEL = re.compile(r'名前：')
+INFO_LABEL = re.compile(r'情報：')
+
+# 名前：山之内 すず（ヤマノウチ スズ） / 名前：山之内 すず
+NAME_WITH_READING = re.compile(r'名前[：:]\s*(.+?)（(.+?)）')
+NAME_ONLY = re.compile(r'名前[：:]\s*(.+)')
+
+# 情報：2001年9月7日 おとめ座 O型 157cm 兵庫県出身
+BIRTH_DATE = re.compile(r'(\d{4})年(\d{1,2})月(\d{1,2})日')
+ZODIAC = re.compile(r'(おひつじ座|おうし座|ふたご座|かに座|しし座|おとめ座|てんびん座|さそり座|いて座|やぎ座|みずがめ座|うお座)')
+BLOOD_TYPE = re.compile(r'([ABO]B?)型')
+HEIGHT = re.compile(r'(\d+)cm')
+BIRTHPLACE = re.compile(r'([^0-9]+?)出身')
+
+# 出身地のクリーニング
+BIRTHPLACE_UNIT_BREAK = re.compile(r'(cm|kg)\s*\n\s*')
+WHITESPACE = re.compile(r'\s+')
+LEADING_WEEKDAY = re.compile(r'^[日月火水木金土]+\s*')
+WEEKDAYS = ('日', '月', '火', '水', '木', '金', '土')
+
+# ジャンル・特技・趣味の区切り
+DETAIL_SEPARATOR = re.compile(r'[\s　\n]+')
+DETAIL_IGNORED_ITEMS = ('、', '，', '・')
+
+# p#ジャンル など、または「ジャンル：」の span 直後の p
+DETAIL_FIELDS = {
+    'ジャンル': 'genres',
+    '特技': 'skills',
+    '趣味': 'hobbies',
+    '芸歴': 'career_history',
+}
+DETAIL_LABELS = {key: re.compile(f'{key}[：:]') for key in DETAIL_FIELDS}
+
+# 1回の走査で見る要素
+SCANNED_TAGS = ['li', 'span', 'p', 'img']
+
+
+def clean_birthplace(raw_text):
+    """出身地データのクリーニング"""
+    cleaned = BIRTHPLACE_UNIT_BREAK.sub('', raw_text)
+    cleaned = WHITESPACE.sub('', cleaned)  # 余分な空白除去
+    cleaned = LEADING_WEEKDAY.sub('', cleaned)  # 曜日文字除去
+
+    # 空文字や意味のない文字列をフィルタ
+    if len(cleaned) < 2 or cleaned in WEEKDAYS:
+        return ''
+    return cleaned.strip()
+
+
+def split_detail_items(text):
+    """詳細項目の分割処理"""
+    items = (item.strip() for item in DETAIL_SEPARATOR.split(text.replace('　', ' ')))
+    # 空文字や短すぎる項目を除去
+    return [item for item in items if len(item) > 1 and item not in DETAIL_IGNORED_ITEMS]
+
+
+def parse_name_text(name_text, profile_data):
+    """「名前：」ブロックのテキストから full_name / reading を取り出す"""
+    name_match = NAME_WITH_READING.search(name_text)
+    if name_match:
+        profile_data['full_name'] = name_match.group(1).strip()
+        profile_data['reading'] = name_match.group(2).strip()
+        return
+    simple_match = NAME_ONLY.search(name_text)
+    if simple_match:
+        name_only = simple_match.group(1).strip()
+        # 読み方が含まれていない場合
+        if '（' not in name_only:
+            profile_data['full_name'] = name_only
+
+
+def parse_info_text(info_text, profile_data):
+    """「情報：」ブロックのテキストから生年月日・星座・血液型・身長・出身地を取り出す"""
+    birth_match = BIRTH_DATE.search(info_text)
+    if birth_match:
+        year, month, day = birth_match.groups()
+        profile_data['birth_date'] = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+
+    zodiac_match = ZODIAC.search(info_text)
+    if zodiac_match:
+        profile_data['zodiac_sign'] = zodiac_match.group(1)
+
+    blood_match = BLOOD_TYPE.search(info_text)
+    if blood_match:
+        profile_data['blood_type'] = blood_match.group(1) + '型'
+
+    height_match = HEIGHT.search(info_text)
+    if height_match:
+        profile_data['height_cm'] = int(height_match.group(1))
+
+    birthplace_match = BIRTHPLACE.search(info_text)
+    if birthplace_match:
+        cleaned_birthplace = clean_birthplace(birthplace_match.group(1).strip())
+        if cleaned_birthplace:
+            profile_data['birthplace'] = cleaned_birthplace
+
+
+def _locate_blocks(soup):
+    """必要な要素を文書順の1回の走査で集める。
+
+    旧実装の探索順（li を span より、p#キー を「キー：」span より優先）を保つため、
+    候補ごとに最初に見つかった要素だけを覚えておき、走査後に優先順で選ぶ。
+    """
+    found = {}
+    for element in soup.find_all(SCANNED_TAGS):
+        tag = element.name
+        if tag == 'img':
+            if 'img' not in found and 'talent_img' in (element.get('class') or ()):
+                found['img'] = element
+            continue
+        if tag == 'p':
+            element_id = element.get('id')
+            if element_id in DETAIL_FIELDS:
+                found.setdefault(('p', element_id), element)
+            continue
+
+        string = element.string
+        if string is None:
+            continue
+        if NAME_LABEL.search(string):
+            found.setdefault((tag, 'name'), element)
+        if INFO_LABEL.search(string):
+            found.setdefault((tag, 'info'), element)
+        if tag == 'span':
+            for key, label in DETAIL_LABELS.items():
+                if label.search(string):
+                    found.setdefault(('span', key), element)
+    return found
+
+
+def extract_profile_fields(soup, profile_data):
+    """プロフィールページの soup から各項目を抽出して profile_data に追加する"""
+    found = _locate_blocks(soup)
+
+    for block, parse in (('name', parse_name_text), ('info', parse_info_text)):
+        element = found.get(('li', block))
+        if element is None and ('span', block) in found:
+            element = found[('span', block)].parent
+        if element is not None:
+            parse(element.get_text(), profile_data)
+
+    if 'img' in found and found['img'].get('src'):
+        profile_data['profile_image_url'] = found['img']['src']
+
+    for japanese_key, english_key in DETAIL_FIELDS.items():
+        element = found.get(('p', japanese_key))
+        if element is None and ('span', japanese_key) in found:
+            element = found[('span', japanese_key)].find_next('p')
+        if element is None:
+            continue
+        text = element.get_text().strip()
+        if english_key == 'career_history':
+            profile_data[english_key] = text
+        else:
+            items = split_detail_items(text)
+            if items:
+                profile_data[english_key] = items
+    return profile_data
+
+
+# 内容指紋の対象（抽出した項目と取得元 URL。scraped_at など取得ごとに変わる値は含めない）
+FINGERPRINT_FIELDS = (
+    'source_url', 'full_name', 'reading', 'birth_date', 'zodiac_sign', 'blood_type', 'height_cm',
+    'birthplace', 'profile_image_url', 'genres', 'skills', 'hobbies', 'career_history',
+)
+
+
+def profile_fingerprint(profile_data):
+    """抽出結果の内容指紋（SHA-1）。ページが変わっていなければ前回と同じ値になる"""
+    payload = json.dumps(
+        {field: profile_data[field] for field in FINGERPRINT_FIELDS if profile_data.get(field) not in (None, '', [])},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
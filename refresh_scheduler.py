@@ -0,0 +1,83 @@
+# refresh_scheduler.py
+# v1.0.0 (2026-10-17)
+# 追加: 直近の出演数・プロフィールの古さ・完成度からタレントの取得優先度を決めるスケジューラ
+import heapq
+import math
+from datetime import datetime
+
+from time_utils import parse_timestamp
+
+
+# 出演数を数える期間（今日を基準に過去・未来の日数）
+APPEARANCE_PAST_DAYS = 7
+APPEARANCE_FUTURE_DAYS = 7
+# プロフィールの古さ: MIN 日未満は再取得しない / MAX 日以上で古さの点数が満点
+PROFILE_MIN_AGE_DAYS = 7
+PROFILE_MAX_AGE_DAYS = 90
+# 各要素の重み（出演数は log で頭打ちにする）
+PRIORITY_WEIGHTS = {
+    'appearances': 3.0,
+    'age': 1.0,
+    'incomplete': 1.5,
+}
+
+
+def score_talent(appearances, profile, now, weights=PRIORITY_WEIGHTS,
+                 min_age_days=PROFILE_MIN_AGE_DAYS, max_age_days=PROFILE_MAX_AGE_DAYS):
+    """取得優先度を返す。再取得不要（取得直後・価値なし）なら None。
+
+    profile は talent_profiles の行（last_checked_at / scraped_at, profile_completeness）。
+    古さは最終確認日時があればそれで測る。未取得なら None で、古さ・未完成度とも満点として扱う。
+    """
+    if profile is None:
+        age_score, incomplete_score = 1.0, 1.0
+    else:
+        checked_at = parse_timestamp(profile.get('last_checked_at') or profile.get('scraped_at'))
+        age_days = (now - checked_at).total_seconds() / 86400 if checked_at else max_age_days
+        if age_days < min_age_days:
+            return None
+        age_score = min(1.0, age_days / max_age_days)
+        incomplete_score = 1.0 - min(1.0, max(0.0, float(profile.get('profile_completeness') or 0.0)))
+
+    score = (
+        weights['appearances'] * math.log1p(appearances)
+        + weights['age'] * age_score
+        + weights['incomplete'] * incomplete_score
+    )
+    return score if score > 0 else None
+
+
+class RefreshScheduler:
+    """候補タレントを優先度付きキュー（heapq）に積み、予算の件数だけ高い順に取り出す"""
+
+    def __init__(self, now=None, weights=PRIORITY_WEIGHTS):
+        self.now = now or datetime.now()
+        self.weights = weights
+        self._heap = []
+        self._queued = set()
+        self.skipped = 0
+
+    def add(self, talent, appearances=0, profile=None):
+        """候補を追加する（同じ talent_id は最初の1回のみ）。積んだら True"""
+        talent_id = str(talent['talent_id'])
+        if talent_id in self._queued:
+            return False
+        score = score_talent(appearances, profile, self.now, self.weights)
+        if score is None:
+            self.skipped += 1
+            return False
+        self._queued.add(talent_id)
+        # 同点は出演数の多い順、さらに talent_id 順（実行ごとに同じ順序にする）
+        heapq.heappush(self._heap, (-score, -appearances, talent_id, talent))
+        return True
+
+    def __len__(self):
+        return len(self._heap)
+
+    def take(self, budget):
+        """優先度の高い順に最大 budget 件の (talent, score, appearances) を取り出す"""
+        selected = []
+        while self._heap and len(selected) < budget:
+            negative_score, negative_appearances, _, talent = heapq.heappop(self._heap)
+            selected.append((talent, -negative_score, -negative_appearances))
+        return selected
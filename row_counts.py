@@ -0,0 +1,96 @@
+# row_counts.py
+# v1.0.0 (2026-10-17)
+# 追加: テーブル件数の取得方法を選べるカウンタ（counter: 集計表 table_row_counts / estimated: 統計の推定値 /
+#       exact: COUNT(*)）。集計表の照合（全件走査）は DB の定期ジョブに任せ、件数の個別取得は並列に行う
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from time_utils import parse_timestamp
+
+
+COUNT_MODES = ('counter', 'estimated', 'exact')
+COUNT_MODE = os.environ.get("COUNT_MODE", "counter")
+# estimated: 推定値がこの件数未満なら COUNT(*) で正確に数える（小さい表は全件走査しても安い）
+COUNT_EXACT_BELOW = int(os.environ.get("COUNT_EXACT_BELOW", "100000"))
+# counter: 前回の照合からこの日数を過ぎた集計表の件数は推定値として扱う（照合は pg_cron の週1回のジョブ）
+COUNTER_RECONCILE_DAYS = float(os.environ.get("COUNTER_RECONCILE_DAYS", "8"))
+COUNTS_TABLE = 'table_row_counts'
+
+
+class RowCounter:
+    """テーブルの件数を mode に応じた方法で取得する。
+
+    counter は sql/table_row_counts.sql の集計表を1回の問い合わせで読むだけで、照合
+    （reconcile_table_row_counts）は呼ばない。照合から reconcile_days 日を過ぎた表は approximate
+    に入れ、集計表にない表は estimated で数える（未適用なら全て estimated）。estimated は PostgREST の count="planned"（統計の推定値）を使い、exact_below
+    未満の表だけ count="exact" で数え直す。推定値のまま返した表は approximate に入る。
+    """
+
+    def __init__(self, client, mode=COUNT_MODE, exact_below=COUNT_EXACT_BELOW,
+                 reconcile_days=COUNTER_RECONCILE_DAYS, workers=4):
+        if mode not in COUNT_MODES:
+            raise ValueError(f"未対応の件数取得方法です: {mode}")
+        self.client = client
+        self.mode = mode
+        self.exact_below = exact_below
+        self.reconcile_days = reconcile_days
+        self.workers = workers
+        self.approximate = set()
+
+    def counts(self, table_names):
+        """テーブル名 → 件数（取得失敗は None）"""
+        if self.mode == 'counter':
+            try:
+                return self._from_counter_table(table_names)
+            except Exception as e:
+                print(f"⚠️ 集計表 {COUNTS_TABLE} が使えないため、推定件数で取得します: {e}")
+        mode = 'exact' if self.mode == 'exact' else 'estimated'
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(table_names)))) as executor:
+            results = executor.map(lambda name: self._count_table(name, mode), table_names)
+            return dict(zip(table_names, results))
+
+    def _from_counter_table(self, table_names):
+        res = self.client.table(COUNTS_TABLE).select('table_name, row_count, reconciled_at').in_(
+            'table_name', list(table_names)
+        ).execute()
+        rows = {
+            row['table_name']: row for row in (res.data or []) if row.get('row_count') is not None
+        }
+        if not rows:
+            raise ValueError("集計表に対象テーブルの件数がありません")
+
+        # 照合が止まっている表は件数がずれている可能性があるので推定値として扱う
+        now = datetime.now()
+        stale = []
+        for name, row in rows.items():
+            reconciled_at = parse_timestamp(row.get('reconciled_at'))
+            if reconciled_at is None or (now - reconciled_at).total_seconds() >= self.reconcile_days * 86400:
+                stale.append(name)
+        if stale:
+            print(f"⚠️ 件数の集計表が{self.reconcile_days:g}日以上照合されていません（対象: {', '.join(sorted(stale))}）。"
+                  f"定期ジョブ reconcile_table_row_counts を確認してください")
+            self.approximate.update(stale)
+
+        # 集計表にない表（トリガ未設定）だけ個別に数える
+        return {
+            name: int(rows[name]['row_count']) if name in rows else self._count_table(name, 'estimated')
+            for name in table_names
+        }
+
+    def _count_table(self, table_name, mode):
+        try:
+            if mode == 'estimated':
+                planned = self._select_count(table_name, 'planned')
+                if planned is not None and planned >= self.exact_below:
+                    self.approximate.add(table_name)
+                    return planned
+            return self._select_count(table_name, 'exact')
+        except Exception as e:
+            print(f"⚠️ {table_name}の件数取得をスキップ: {e}")
+            return None
+
+    def _select_count(self, table_name, count):
+        # head=True で行データを転送せず件数のみ取得
+        response = self.client.table(table_name).select('*', count=count, head=True).execute()
+        return response.count or 0
@@ -0,0 +1,224 @@
+# run_metrics.py
+# v1.0.0 (2026-10-17)
+# 追加: 実行計測（段階ごとの所要時間ヒストグラム、HTTP ステータス・リトライ・転送量のカウンタ）
+# 追加: 実行終了時の JSON レポート出力と Discord 通知用の短い要約
+# 追加: DB バッチの行数、キュー長（取得時に評価する関数）の記録と、エクスポータ向けの生データ取得 samples()
+import os
+import json
+import math
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# JSON レポートの出力先（環境変数で上書き可能）
+RUN_REPORT_DIR = os.environ.get("RUN_REPORT_DIR", "run_reports")
+
+
+def percentile(sorted_values, q):
+    """昇順に並んだ値の q パーセンタイル（最近傍順位法）。空なら None"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+class RunMetrics:
+    """1回の実行の計測値を集める。ワーカースレッドからも記録できる。
+
+    段階（EPG 取得・詳細解析・upsert など）は stage() / timed() で1回ごとの所要時間を記録し、
+    終了時に回数・合計・p50 / p95 / max を出す。HTTP は instrument_session() で取り付けた
+    レスポンスフックがステータス・リトライ・受信バイト数を数える。
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.timings = {}  # 段階名 -> 所要秒数のリスト
+        self.batch_sizes = {}  # 段階名 -> 1バッチの行数のリスト
+        self.queues = {}  # キュー名 -> 現在の長さを返す関数
+        self.stage_errors = Counter()
+        self.counters = Counter()
+        self.http_status = Counter()
+
+    # --- 段階の所要時間 ---
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.timings.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """with ブロックの所要時間を段階 name に記録する（例外も失敗回数として数える）"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.count_error(name)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name, fn):
+        """fn を呼ぶたびに所要時間を段階 name に記録する関数を返す（ライタの書き込み関数用）"""
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def timed_batch(self, name, fn):
+        """timed() と同じく所要時間を記録し、あわせて第1引数（行のリスト）の件数をバッチ行数として記録する"""
+        timed_fn = self.timed(name, fn)
+
+        def wrapper(rows, *args, **kwargs):
+            with self._lock:
+                self.batch_sizes.setdefault(name, []).append(len(rows))
+            return timed_fn(rows, *args, **kwargs)
+        return wrapper
+
+    def track_queue(self, name, length_fn):
+        """キュー・バッファの長さを返す関数を登録する（値はエクスポータが読み出すたびに評価する）"""
+        with self._lock:
+            self.queues[name] = length_fn
+
+    def queue_depths(self):
+        with self._lock:
+            queues = dict(self.queues)
+        depths = {}
+        for name, length_fn in queues.items():
+            try:
+                depths[name] = length_fn()
+            except Exception:
+                continue
+        return depths
+
+    def count_error(self, stage, n=1):
+        with self._lock:
+            self.stage_errors[stage] += n
+
+    # --- カウンタ ---
+    def count(self, key, n=1):
+        with self._lock:
+            self.counters[key] += n
+
+    # --- HTTP ---
+    def instrument_session(self, session):
+        """requests.Session にレスポンスフックを取り付ける（キャッシュ再検証の 304 も実際の通信として数える）"""
+        session.hooks.setdefault("response", []).append(self._on_response)
+        return session
+
+    def _on_response(self, response, *args, **kwargs):
+        retries = getattr(getattr(response, "raw", None), "retries", None)
+        history = getattr(retries, "history", None) or ()
+        body_bytes = len(response.content) if not kwargs.get("stream") else 0
+        with self._lock:
+            self.http_status[str(response.status_code)] += 1
+            self.counters["http_requests"] += 1
+            self.counters["http_bytes"] += body_bytes
+            # urllib3 のリトライ履歴（最終的に返ったレスポンス以前の試行）
+            self.counters["http_retries"] += len(history)
+            for attempt in history:
+                reason = attempt.status or type(attempt.error).__name__
+                self.counters[f"http_retry:{reason}"] += 1
+
+    # --- 集計・出力 ---
+    def samples(self):
+        """記録した生データのコピー（エクスポータがヒストグラムを組み立てるのに使う）"""
+        with self._lock:
+            return {
+                "timings": {name: list(values) for name, values in self.timings.items()},
+                "batch_sizes": {name: list(values) for name, values in self.batch_sizes.items()},
+                "stage_errors": dict(self.stage_errors),
+                "counters": dict(self.counters),
+                "http_status": dict(self.http_status),
+                "elapsed_seconds": time.perf_counter() - self._started,
+            }
+
+    def stage_summary(self):
+        """段階名 -> {count, total, p50, p95, max, errors}（秒）"""
+        with self._lock:
+            timings = {name: sorted(values) for name, values in self.timings.items()}
+            errors = dict(self.stage_errors)
+        summary = {}
+        for name, values in timings.items():
+            summary[name] = {
+                "count": len(values),
+                "total": round(sum(values), 4),
+                "p50": round(percentile(values, 50), 4),
+                "p95": round(percentile(values, 95), 4),
+                "max": round(values[-1], 4),
+                "errors": errors.get(name, 0),
+            }
+        return summary
+
+    def report(self, **extra):
+        """JSON レポートの内容。extra には実行結果（件数など）を渡す"""
+        with self._lock:
+            counters = dict(self.counters)
+            http_status = dict(self.http_status)
+            batch_sizes = {name: sorted(values) for name, values in self.batch_sizes.items()}
+        return {
+            "job": self.job,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now().isoformat(),
+            "elapsed_seconds": round(time.perf_counter() - self._started, 3),
+            "stages": self.stage_summary(),
+            "http": {
+                "status": http_status,
+                "requests": counters.pop("http_requests", 0),
+                "retries": counters.pop("http_retries", 0),
+                "bytes": counters.pop("http_bytes", 0),
+                "retry_reasons": {
+                    key.split(":", 1)[1]: counters.pop(key) for key in sorted(counters) if key.startswith("http_retry:")
+                },
+            },
+            "batches": {
+                name: {"count": len(rows), "rows": sum(rows), "p50": percentile(rows, 50), "max": rows[-1]}
+                for name, rows in batch_sizes.items()
+            },
+            "counters": counters,
+            **extra,
+        }
+
+    def write_report(self, report_dir=RUN_REPORT_DIR, **extra):
+        """レポートを {report_dir}/{job}_{開始日時}.json に書き出し、パスを返す（失敗時は None）"""
+        path = os.path.join(report_dir, f"{self.job}_{self.started_at.strftime('%Y%m%d_%H%M%S')}.json")
+        try:
+            os.makedirs(report_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.report(**extra), f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"⚠️ 実行レポートの保存に失敗しました: {e}")
+            return None
+        return path
+
+    def discord_summary(self, top=4):
+        """Discord 通知に添える数行の要約（所要時間の大きい段階と HTTP の概況）"""
+        report = self.report()
+        stages = sorted(report["stages"].items(), key=lambda item: item[1]["total"], reverse=True)
+        lines = [f"**⏱️ 処理時間**: {report['elapsed_seconds']:.0f}秒"]
+        for name, s in stages[:top]:
+            errors = f", 失敗 {s['errors']}" if s["errors"] else ""
+            lines.append(
+                f"  • {name}: 延べ {s['total']:.1f}秒（{s['count']}回, p50 {s['p50']:.2f}s / p95 {s['p95']:.2f}s / "
+                f"max {s['max']:.2f}s{errors}）"
+            )
+        http = report["http"]
+        if http["requests"]:
+            status = ", ".join(f"{code}×{n}" for code, n in sorted(http["status"].items()))
+            lines.append(
+                f"**🌐 HTTP**: {http['requests']}件（{status}）, リトライ {http['retries']}回, "
+                f"受信 {_format_bytes(http['bytes'])}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,86 @@
+-- sql/archive_old_programs.sql
+-- v1.0.0 (2026-10-17)
+-- 古い番組を *_archive へ移す RPC（tv_schedule_updater.py の archive_old_db_records が使用）。
+-- 退避（INSERT … SELECT … ON CONFLICT）と削除（DELETE … RETURNING）を1文でデータベース内で行い、
+-- 行データをクライアントへ転送しない。1回の呼び出しで最大 p_chunk_size 件を移し、移した件数を返す。
+-- 戻り値が p_chunk_size 未満になるまで呼び出し側が繰り返す（1文あたりのロック・実行時間を抑える）。
+--
+-- 呼び出し例:
+--   select archive_old_programs('programs_epg', '2026-06-19', 5000);
+--   select archive_old_programs('programs', '2026-06-19', 5000);
+
+create or replace function public.archive_old_programs(
+    p_table text,
+    p_cutoff text,
+    p_chunk_size integer default 5000
+)
+returns integer
+language plpgsql
+volatile
+security definer
+set search_path = public
+as $$
+declare
+    v_archive text := p_table || '_archive';
+    v_columns text;
+    v_updates text;
+    v_moved integer;
+begin
+    if p_table not in ('programs_epg', 'programs') then
+        raise exception 'archive_old_programs: 対象外のテーブルです: %', p_table;
+    end if;
+
+    -- 稼働テーブルとアーカイブに共通する列（列順や追加列の違いに依存しない）
+    select string_agg(quote_ident(c.column_name), ', ' order by c.ordinal_position),
+           string_agg(
+               format('%1$I = excluded.%1$I', c.column_name), ', ' order by c.ordinal_position
+           ) filter (where c.column_name <> 'event_id')
+      into v_columns, v_updates
+      from information_schema.columns c
+     where c.table_schema = 'public'
+       and c.table_name = p_table
+       and exists (
+           select 1 from information_schema.columns a
+            where a.table_schema = 'public'
+              and a.table_name = v_archive
+              and a.column_name = c.column_name
+       );
+
+    if v_columns is null then
+        raise exception 'archive_old_programs: % がありません', v_archive;
+    end if;
+
+    -- broadcast_date は 'YYYY-MM-DD' の text なので文字列比較で期間を判定できる。
+    -- 削除と退避は同じ文なので、退避に失敗すれば削除も取り消される。
+    execute format(
+        'with moved as (
+             delete from %1$I
+              where event_id in (
+                  select event_id from %1$I
+                   where broadcast_date < $1
+                   order by broadcast_date, event_id
+                   limit $2
+                   for update skip locked
+              )
+          returning %3$s
+         )
+         insert into %2$I (%3$s)
+         select %3$s from moved
+         on conflict (event_id) do update set %4$s',
+        p_table, v_archive, v_columns, v_updates
+    )
+    using p_cutoff, least(greatest(p_chunk_size, 1), 50000);
+
+    get diagnostics v_moved = row_count;
+    return v_moved;
+end;
+$$;
+
+-- security definer で稼働テーブルからの削除と *_archive への書き込みを行うため、anon / authenticated から
+-- 呼ばれると誰でも番組を退避させられる。実行はアーカイブを行う tv_schedule_updater.py（service_role）に限る。
+revoke execute on function public.archive_old_programs(text, text, integer) from public, anon, authenticated;
+grant execute on function public.archive_old_programs(text, text, integer) to service_role;
+
+-- 古い行の抽出は broadcast_date の索引を使う（未作成なら作成する）。
+create index if not exists idx_programs_epg_broadcast_date on public.programs_epg (broadcast_date);
+create index if not exists idx_programs_broadcast_date on public.programs (broadcast_date);
@@ -0,0 +1,39 @@
+-- sql/pending_talents.sql
+-- v1.0.0 (2026-10-17)
+-- プロフィール未取得のタレントを返す RPC（talent_profile_scraper.py の get_talents_to_process が使用）。
+-- talents と talent_profiles の反結合をサーバ側で行い、talent_id のキーセットでページングする。
+-- 既存プロフィールが増えても、1回の呼び出しで転送されるのは返す行だけになる。
+--
+-- 呼び出し例:
+--   select * from pending_talents(null, 200, 0);          -- 先頭ページ（p_offset 件読み飛ばし）
+--   select * from pending_talents('12345', 200, 0);       -- talent_id > '12345' の次ページ
+
+create or replace function public.pending_talents(
+    p_after_talent_id text default null,
+    p_limit integer default 200,
+    p_offset integer default 0
+)
+returns table (talent_id text, name text, link text)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select t.talent_id, t.name, t.link
+    from talents t
+    where (p_after_talent_id is null or t.talent_id > p_after_talent_id)
+      and not exists (
+          select 1 from talent_profiles tp where tp.talent_id = t.talent_id
+      )
+    order by t.talent_id
+    offset greatest(p_offset, 0)
+    limit least(greatest(p_limit, 1), 1000);
+$$;
+
+-- 読み取りのみだが security definer で RLS を越えて talents と talent_profiles を突き合わせるため、
+-- プロフィール取得の進み具合を公開キーから列挙させない。talent_profile_scraper.py（service_role）だけが呼ぶ。
+revoke execute on function public.pending_talents(text, integer, integer) from public, anon, authenticated;
+grant execute on function public.pending_talents(text, integer, integer) to service_role;
+
+-- 反結合は talent_profiles.talent_id の一意制約（upsert の on_conflict 先）、
+-- キーセットは talents の主キーでそれぞれ索引を使う。
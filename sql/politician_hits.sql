@@ -0,0 +1,186 @@
+-- sql/politician_hits.sql
+-- v1.0.0 (2026-10-17)
+-- 政治家のテレビ登場数を差分で更新するための表と RPC（politician_matcher.py の PoliticianHits が使用）。
+-- スクレイパが今回登録・変更した番組だけを名簿（reference/politicians_gazetteer.csv）と照合し、
+-- apply_politician_hits で番組ごとの一致を置き換えると、議員ごとの増減が politician_tv_hits に加算される。
+-- 全件の照合（--politician-mode full、週1回）は全番組を同じ RPC に流した後、reconcile_politician_hits()
+-- で名簿 politician_roster を置き換え、消えた番組の一致を削除し、登場数を一致表から数え直す。
+--
+-- Web アプリ（webapp/）の app_politicians は従来の refresh_politician_hits の結果を読んでいるため、
+-- 次の順で切り替える（それまでスクリプトの既定 POLITICIAN_HITS_MODE=rpc のままにする）:
+--   1. このファイルを適用する（表と RPC を作る。app_politicians はまだ置き換えない）
+--   2. python tv_schedule_updater.py --politician-mode full を1回実行する（名簿と登場数が入る）
+--   3. このファイルをもう一度適用する（照合済みなら末尾で app_politicians を politician_tv_hits に切り替える）
+--   4. リポジトリ変数 POLITICIAN_HITS_MODE を incremental にする（ワークフローは日曜に full を実行する）
+--
+-- 呼び出し例:
+--   select * from apply_politician_hits(array['123'], '[{"event_id": "123", "politician_name": "石破茂"}]');
+--   select reconcile_politician_hits('[{"name": "石破茂", "reading": "いしばしげる", "party": "自由民主党・無所属の会", "chamber": "衆", "district": "鳥取1"}]');
+--   select * from app_politicians(1);
+
+create table if not exists public.politician_program_hits (
+    event_id text not null,
+    politician_name text not null,
+    created_at timestamptz not null default now(),
+    primary key (event_id, politician_name)
+);
+
+create index if not exists idx_politician_program_hits_name on public.politician_program_hits (politician_name);
+
+create table if not exists public.politician_tv_hits (
+    politician_name text primary key,
+    tv_hits bigint not null default 0,
+    updated_at timestamptz not null default now(),
+    reconciled_at timestamptz
+);
+
+-- 名簿（reference/politicians_gazetteer.csv）。同姓同名の議員がいるため議院・選挙区までを主キーにする
+create table if not exists public.politician_roster (
+    name text not null,
+    reading text,
+    party text,
+    chamber text not null default '',
+    district text not null default '',
+    updated_at timestamptz not null default now(),
+    primary key (name, chamber, district)
+);
+
+alter table public.politician_program_hits enable row level security;
+alter table public.politician_tv_hits enable row level security;
+alter table public.politician_roster enable row level security;
+
+-- p_event_ids の番組の一致を p_hits（[{event_id, politician_name}, ...]）で置き換え、
+-- 議員ごとの増減を登場数に加算して返す（増減 0 の議員は返さない）
+create or replace function public.apply_politician_hits(p_event_ids text[], p_hits jsonb)
+returns table (politician_name text, delta integer)
+language plpgsql
+volatile
+security definer
+set search_path = public
+as $$
+#variable_conflict use_column
+begin
+    return query
+    with new_hits as (
+        select distinct h->>'event_id' as event_id, h->>'politician_name' as politician_name
+          from jsonb_array_elements(coalesce(p_hits, '[]'::jsonb)) as h
+         where h->>'event_id' = any(p_event_ids)
+           and coalesce(h->>'politician_name', '') <> ''
+    ),
+    removed as (
+        delete from politician_program_hits p
+         where p.event_id = any(p_event_ids)
+           and not exists (
+               select 1 from new_hits n
+                where n.event_id = p.event_id and n.politician_name = p.politician_name
+           )
+        returning p.politician_name
+    ),
+    added as (
+        insert into politician_program_hits (event_id, politician_name)
+        select event_id, politician_name from new_hits
+        on conflict (event_id, politician_name) do nothing
+        returning politician_name
+    ),
+    deltas as (
+        select changes.politician_name, sum(changes.delta)::integer as delta
+          from (
+              select r.politician_name, -1 as delta from removed r
+              union all
+              select a.politician_name, 1 as delta from added a
+          ) as changes
+         group by changes.politician_name
+        having sum(changes.delta) <> 0
+    ),
+    applied as (
+        insert into politician_tv_hits as t (politician_name, tv_hits, updated_at)
+        select d.politician_name, greatest(d.delta, 0), now() from deltas d
+        on conflict (politician_name) do update
+           set tv_hits = greatest(
+                   t.tv_hits + (select d2.delta from deltas d2 where d2.politician_name = excluded.politician_name), 0
+               ),
+               updated_at = now()
+        returning t.politician_name
+    )
+    select d.politician_name, d.delta from deltas d;
+end;
+$$;
+
+-- 一致表から登場数を数え直す（稼働テーブルにもアーカイブにもない番組の一致は削除する）。
+-- p_roster（[{name, reading, party, chamber, district}, ...]）を渡すと名簿も同じトランザクションで置き換える
+drop function if exists public.reconcile_politician_hits();
+create or replace function public.reconcile_politician_hits(p_roster jsonb default null)
+returns integer
+language plpgsql
+volatile
+security definer
+set search_path = public
+as $$
+begin
+    if p_roster is not null then
+        delete from politician_roster;
+        insert into politician_roster (name, reading, party, chamber, district)
+        select distinct on (r->>'name', coalesce(r->>'chamber', ''), coalesce(r->>'district', ''))
+               r->>'name', r->>'reading', r->>'party', coalesce(r->>'chamber', ''), coalesce(r->>'district', '')
+          from jsonb_array_elements(p_roster) as r
+         where coalesce(r->>'name', '') <> '';
+    end if;
+
+    delete from politician_program_hits h
+     where not exists (select 1 from programs p where p.event_id = h.event_id)
+       and not exists (select 1 from programs_archive a where a.event_id = h.event_id);
+
+    insert into politician_tv_hits (politician_name, tv_hits, updated_at, reconciled_at)
+    select politician_name, count(*), now(), now()
+      from politician_program_hits
+     group by politician_name
+    on conflict (politician_name) do update
+       set tv_hits = excluded.tv_hits, updated_at = now(), reconciled_at = now();
+
+    update politician_tv_hits t
+       set tv_hits = 0, updated_at = now(), reconciled_at = now()
+     where not exists (select 1 from politician_program_hits h where h.politician_name = t.politician_name);
+
+    return (select count(*) from politician_tv_hits where tv_hits > 0);
+end;
+$$;
+
+-- apply_politician_hits は任意の番組の一致を書き換えられる（Web アプリの登場数が変わる）ため、
+-- 照合を行う tv_schedule_updater.py（service_role）だけが呼ぶ。
+revoke execute on function public.apply_politician_hits(text[], jsonb) from public, anon, authenticated;
+grant execute on function public.apply_politician_hits(text[], jsonb) to service_role;
+-- reconcile_politician_hits は一致表を全件集計し、名簿と消えた番組の一致を置き換える。週1回の全件照合からのみ呼ぶ。
+revoke execute on function public.reconcile_politician_hits(jsonb) from public, anon, authenticated;
+grant execute on function public.reconcile_politician_hits(jsonb) to service_role;
+
+-- Web アプリの app_politicians を名簿 × politician_tv_hits に切り替える。全件照合が一度も済んでいない
+-- （登場数が空の）うちに切り替えると議員一覧が消えるので、照合済みのときだけ置き換える（手順 3）。
+do $migrate$
+begin
+    if not exists (select 1 from politician_tv_hits where reconciled_at is not null)
+       or not exists (select 1 from politician_roster) then
+        raise notice 'politician_tv_hits が未照合のため app_politicians は切り替えませんでした（--politician-mode full の後に再適用）';
+        return;
+    end if;
+
+    drop function if exists public.app_politicians(integer);
+    execute $def$
+        create function public.app_politicians(p_min_hits integer default 1)
+        returns table (name text, reading text, party text, chamber text, district text, tv_hits bigint)
+        language sql
+        stable
+        security definer
+        set search_path = public
+        as $body$
+            select r.name, r.reading, r.party, r.chamber, r.district, coalesce(h.tv_hits, 0) as tv_hits
+              from politician_roster r
+              left join politician_tv_hits h on h.politician_name = r.name
+             where coalesce(h.tv_hits, 0) >= coalesce(p_min_hits, 0)
+             order by coalesce(h.tv_hits, 0) desc, r.reading, r.name
+        $body$
+    $def$;
+    -- Web アプリはサーバ用キーで呼ぶ（webapp/server.js の SUPABASE_SECRET_KEY）
+    revoke execute on function public.app_politicians(integer) from public, anon, authenticated;
+    grant execute on function public.app_politicians(integer) to service_role;
+end;
+$migrate$;
@@ -0,0 +1,145 @@
+-- sql/table_row_counts.sql
+-- v1.0.0 (2026-10-17)
+-- 累積件数の集計表（tv_schedule_updater.py の get_cumulative_counts が row_counts.RowCounter 経由で使用）。
+-- 対象テーブルへの INSERT / DELETE / TRUNCATE を文単位のトリガで table_row_counts に反映するため、
+-- スクレイパの upsert もアーカイブ RPC（archive_old_programs）による移動も自動的に数えられる。
+-- 実行のたびに COUNT(*)（全件走査）をしなくてよくなる。ずれは reconcile_table_row_counts()
+-- で実件数に合わせ直す。照合は全件走査なのでスクレイパの実行中には呼ばず、pg_cron の週1回のジョブ
+-- （下の cron.schedule）で行う。スクリプトは集計表を読むだけで、reconciled_at から COUNTER_RECONCILE_DAYS
+-- 日を過ぎた表は推定値（通知では「約」）として扱う。
+--
+-- 呼び出し例:
+--   select * from table_row_counts;
+--   select * from reconcile_table_row_counts();   -- 実件数で合わせ直す（全件走査）
+--   select * from cron.job where jobname = 'reconcile-table-row-counts';
+
+create table if not exists public.table_row_counts (
+    table_name text primary key,
+    row_count bigint not null default 0,
+    reconciled_at timestamptz,
+    updated_at timestamptz not null default now()
+);
+
+alter table public.table_row_counts enable row level security;
+
+-- INSERT（ON CONFLICT で更新になった行は含まれない）と DELETE の件数を1文ごとに加減する
+create or replace function public.table_row_counts_on_insert()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    update table_row_counts
+       set row_count = row_count + (select count(*) from new_rows), updated_at = now()
+     where table_name = tg_table_name;
+    return null;
+end;
+$$;
+
+create or replace function public.table_row_counts_on_delete()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    update table_row_counts
+       set row_count = row_count - (select count(*) from old_rows), updated_at = now()
+     where table_name = tg_table_name;
+    return null;
+end;
+$$;
+
+create or replace function public.table_row_counts_on_truncate()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    update table_row_counts set row_count = 0, updated_at = now() where table_name = tg_table_name;
+    return null;
+end;
+$$;
+
+-- 実件数で合わせ直す（対象テーブルを全件走査するので週1回程度にする）
+create or replace function public.reconcile_table_row_counts()
+returns setof public.table_row_counts
+language plpgsql
+volatile
+security definer
+set search_path = public
+as $$
+declare
+    v_table text;
+begin
+    foreach v_table in array array['programs_epg', 'programs_epg_archive', 'programs', 'programs_archive', 'talents'] loop
+        if to_regclass('public.' || v_table) is null then
+            continue;
+        end if;
+        execute format(
+            'insert into table_row_counts (table_name, row_count, reconciled_at, updated_at)
+             select %L, count(*), now(), now() from %I
+             on conflict (table_name) do update
+                set row_count = excluded.row_count, reconciled_at = now(), updated_at = now()',
+            v_table, v_table
+        );
+    end loop;
+    return query select * from table_row_counts order by table_name;
+end;
+$$;
+
+-- 対象テーブルにトリガを付ける（存在しないテーブルは飛ばす）
+do $$
+declare
+    v_table text;
+begin
+    foreach v_table in array array['programs_epg', 'programs_epg_archive', 'programs', 'programs_archive', 'talents'] loop
+        if to_regclass('public.' || v_table) is null then
+            continue;
+        end if;
+        execute format('drop trigger if exists %I on public.%I', v_table || '_row_count_insert', v_table);
+        execute format(
+            'create trigger %I after insert on public.%I referencing new table as new_rows
+             for each statement execute function public.table_row_counts_on_insert()',
+            v_table || '_row_count_insert', v_table
+        );
+        execute format('drop trigger if exists %I on public.%I', v_table || '_row_count_delete', v_table);
+        execute format(
+            'create trigger %I after delete on public.%I referencing old table as old_rows
+             for each statement execute function public.table_row_counts_on_delete()',
+            v_table || '_row_count_delete', v_table
+        );
+        execute format('drop trigger if exists %I on public.%I', v_table || '_row_count_truncate', v_table);
+        execute format(
+            'create trigger %I after truncate on public.%I
+             for each statement execute function public.table_row_counts_on_truncate()',
+            v_table || '_row_count_truncate', v_table
+        );
+    end loop;
+end;
+$$;
+
+-- 初期値（トリガ作成後に実件数を入れる）
+select * from public.reconcile_table_row_counts();
+
+-- 週1回（日曜 3:30 JST = 土曜 18:30 UTC、毎日 4:00 JST のスクレイパより前）に照合する。
+-- pg_cron が有効でない場合は Dashboard の Database → Extensions で有効にしてから再実行するか、
+-- 上の reconcile_table_row_counts() を SQL Editor から定期的に実行する。
+do $$
+begin
+    if exists (select 1 from pg_extension where extname = 'pg_cron') then
+        perform cron.schedule(
+            'reconcile-table-row-counts', '30 18 * * 6', 'select public.reconcile_table_row_counts()'
+        );
+    else
+        raise notice 'pg_cron が無効のため reconcile_table_row_counts の定期実行を登録しませんでした';
+    end if;
+end;
+$$;
+
+-- 対象テーブルを全件走査するので、公開キーから繰り返し呼ばれると DB の負荷になる。照合は pg_cron の
+-- ジョブ（postgres 権限で動く）と、手動で照合したいときの service_role からのみ行う。
+revoke execute on function public.reconcile_table_row_counts() from public, anon, authenticated;
+grant execute on function public.reconcile_table_row_counts() to service_role;
@@ -0,0 +1,14 @@
+-- sql/talent_profile_fingerprint.sql
+-- v1.0.0 (2026-10-17)
+-- talent_profiles に内容指紋と最終確認日時を追加する。
+-- talent_profile_scraper.py は再取得したページの指紋が前回と同じなら行を書き換えず、
+-- last_checked_at だけを更新する（未適用の環境では従来どおり毎回全列を upsert する）。
+
+alter table public.talent_profiles
+    add column if not exists content_fingerprint text,
+    add column if not exists last_checked_at timestamptz;
+
+-- 既存行は最終確認日時を取得日時で埋めておく
+update public.talent_profiles
+set last_checked_at = scraped_at::timestamptz
+where last_checked_at is null and scraped_at is not null;
@@ -1,35 +1,99 @@
 # talent_profile_scraper.py
+# v1.2.0 (2026-10-17)
+# 追加: プロフィールページ取得をディスク HTTP キャッシュ（条件付きリクエスト）経由に変更
+# 追加: セッションを共有 HTTP クライアント（接続プール・リトライ/バックオフ付き）に置き換え
+# 追加: HTML 解析を page_parser.make_soup（lxml が使えれば lxml）に変更
+# 追加: チェックポイントジャーナルと --resume（保存済みタレントを飛ばして再開）
+# 追加: 処理対象の抽出を RPC pending_talents（サーバ側反結合＋キーセット）に変更し、未適用なら従来方式へフォールバック
+# 追加: タグ名→tag_id のプロセス内キャッシュと、talent_tag_relations のバッファ付き一括 upsert
+# 追加: talent_profiles を1件ずつではなくバッファ付きで一括 upsert（失敗時は1件ずつ再試行して個別に失敗計上）
+# 追加: --workers による並列取得・解析（ホスト別トークンバケットで送信ペースを制限、固定 sleep を廃止）
+# 追加: 項目抽出を profile_extractor（事前コンパイル済み正規表現・1回の走査）へ移行
+# 追加: --strategy priority（直近の出演数・プロフィールの古さ・完成度で優先度を付け、件数予算の範囲で高い順に取得）
+# 追加: 内容指紋（content_fingerprint）が前回と同じプロフィールは書き換えず、last_checked_at のみ更新
+# 追加: run_metrics による段階別の所要時間・HTTP カウンタの計測、JSON 実行レポートと Discord 通知への要約
+# 追加: METRICS_PORT / METRICS_PUSHGATEWAY_URL 指定時に metrics_exporter で Prometheus 形式のメトリクスを公開
+# 追加: ID・出演数の全件読み込みを db_reader のキーセットページング（OFFSET なし・次ページ先読み）に変更
 # v1.1.0 (2026-08-17)
 # 追加: talent_tag_relations を on_conflict upsert し、既存タグの HTTP 409 を解消
 # 追加: 既存プロフィール ID をページング取得し、再処理による重複エラーを防止
 # 優先度高の修正を適用したバージョン
 
 import requests
-import time
-import re
 import os
 import json
-from bs4 import BeautifulSoup
 from supabase import create_client, Client
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import Counter
+from itertools import islice
 from typing import Dict, List, Optional
 import logging
+import threading
+
+from http_cache import HttpCache
+from http_client import create_session, fetch_concurrently, mount_adapter, HTTP_POOL_MAXSIZE
+from page_parser import make_soup
+from profile_extractor import extract_profile_fields, profile_fingerprint
+from refresh_scheduler import RefreshScheduler, APPEARANCE_PAST_DAYS, APPEARANCE_FUTURE_DAYS
+from checkpoint import CheckpointJournal
+from db_writer import BufferedWriter, upsert_rows
+from db_reader import fetch_column_values, iter_rows
+from run_metrics import RunMetrics
+from metrics_exporter import start_metrics_exporter
 
 # 環境変数から設定を取得
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY") 
 DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL")
 
+# 並列取得の既定値（送信ペースは従来の 1.5 秒間隔と同じ）
+TALENT_FETCH_WORKERS = 1
+TALENT_REQUESTS_PER_SECOND = 1 / 1.5
+
+# 処理対象の選び方（pending: プロフィール未取得のみ / priority: 優先度順に未取得・再取得を混ぜる）
+STRATEGIES = ('pending', 'priority')
+APPEARANCES_TABLE = 'program_talent_appearances'
+
 # Supabase接続
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 class TalentProfileScraperFixed:
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = create_session({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
-        
+        self.http_cache = HttpCache()
+        # 実行計測（段階ごとの所要時間・HTTP カウンタ。終了時に run_reports/ へ JSON で出力）
+        self.metrics = RunMetrics('talent_profiles')
+        self.metrics.instrument_session(self.session)
+        
+        # タグ名 → tag_id（talent_tags は十数件なので初回に全件読み込み、新規作成分を追記する）
+        self.tag_ids = None
+        self.tag_relation_writer = BufferedWriter(
+            "タグ関連",
+            self.metrics.timed_batch('tag_relation_upsert', lambda rows: upsert_rows(
+                supabase, 'talent_tag_relations', rows, 'talent_id,tag_id', "タグ関連バッチ", ignore_duplicates=True
+            )),
+            max_rows=500,
+            journal_key='talent_tag_relations',
+            key=lambda row: (row['talent_id'], row['tag_id']),
+        )
+        # プロフィールは件数・経過時間でまとめて保存する（成否の計上は _write_profiles で行う）
+        self.profile_writer = BufferedWriter(
+            "プロフィール", self.metrics.timed_batch('profile_upsert', self._write_profiles), max_rows=50, max_seconds=60.0,
+            key=lambda row: row['talent_id'],
+        )
+        # last_checked_at だけを更新する talent_id（内容指紋が前回と同じもの）
+        self.checked_writer = BufferedWriter(
+            "確認日時", self.metrics.timed_batch('checked_update', self._touch_profiles), max_rows=200, max_seconds=60.0
+        )
+        for queue_name, writer in (('talent_profiles', self.profile_writer), ('last_checked_at', self.checked_writer),
+                                   ('talent_tag_relations', self.tag_relation_writer)):
+            self.metrics.track_queue(f"writer:{queue_name}", lambda writer=writer: len(writer.buffer))
+        self.known_fingerprints = {}  # talent_id -> 前回の content_fingerprint（列がなければ None）
+        self._journal = None
+        
+        self._lock = threading.Lock()  # errors / stats はワーカースレッドからも更新する
         self.errors = []
         self.stats = {
             'total': 0,
@@ -42,93 +106,172 @@ class TalentProfileScraperFixed:
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
     
-    def _fetch_all_ids(self, table_name: str, column: str, page_size: int = 1000) -> set:
-        """PostgREST の既定 1000 件上限を越えて ID を全件取得する。"""
-        ids = set()
-        start = 0
-        while True:
-            res = (
-                supabase.table(table_name)
-                .select(column)
-                .range(start, start + page_size - 1)
-                .execute()
-            )
-            rows = res.data or []
-            ids.update(str(row[column]) for row in rows if row.get(column) is not None)
-            if len(rows) < page_size:
-                break
-            start += page_size
-        return ids
+    def _fetch_all_ids(self, table_name: str, column: str) -> set:
+        """一意な列 column の値を全件取得する（キーセットページングで PostgREST の上限を越える）"""
+        return fetch_column_values(supabase, table_name, column)
 
     def get_talents_to_process(self, offset: int = 0, limit: int = 50):
-        """処理対象のタレントを取得（既存プロフィールを除外）"""
+        """処理対象のタレントを取得（既存プロフィールを除外）。
+
+        offset はプロフィール未取得のタレントを talent_id 順に並べたときに先頭から読み飛ばす件数で、
+        RPC pending_talents でも従来方式でも同じ意味になる。
+        """
         
         try:
-            existing_ids = self._fetch_all_ids('talent_profiles', 'talent_id')
-            collected = []
-            start = offset
-            page_size = 200
-            while len(collected) < limit:
-                res = (
-                    supabase.table('talents')
-                    .select('talent_id, name, link')
-                    .range(start, start + page_size - 1)
-                    .execute()
-                )
-                rows = res.data or []
-                if not rows:
-                    break
-                for talent in rows:
-                    talent_id = str(talent.get('talent_id', ''))
-                    if talent_id and talent_id not in existing_ids:
-                        collected.append(talent)
-                        if len(collected) >= limit:
-                            break
-                start += page_size
-            
-            self.logger.info(
-                f"処理対象: {len(collected)}件 (オフセット: {offset}, 既存除外: {len(existing_ids)}件)"
-            )
+            collected = self._fetch_pending_talents(offset, limit)
+            self.logger.info(f"処理対象: {len(collected)}件 (オフセット: {offset}, RPC pending_talents)")
             return collected
-            
+        except Exception as e:
+            self.logger.warning(f"RPC pending_talents が使えないため、従来方式で取得します: {str(e)}")
+
+        try:
+            return self._get_talents_to_process_client_side(offset, limit)
         except Exception as e:
             self.logger.error(f"タレントデータ取得エラー: {str(e)}")
             return []
+
+    def _fetch_pending_talents(self, offset: int, limit: int, page_size: int = 200) -> List[Dict]:
+        """sql/pending_talents.sql の RPC で未処理タレントを talent_id 順に取得する。
+
+        offset は未処理タレントの先頭から読み飛ばす件数。2ページ目以降は直前の
+        talent_id を起点にしたキーセットで取得するため、既存プロフィール数に依存しない。
+        """
+        collected = []
+        after_id = None
+        while len(collected) < limit:
+            request_size = min(page_size, limit - len(collected))
+            res = supabase.rpc('pending_talents', {
+                'p_after_talent_id': after_id,
+                'p_limit': request_size,
+                'p_offset': offset if after_id is None else 0,
+            }).execute()
+            rows = res.data or []
+            collected.extend(rows)
+            if len(rows) < request_size:
+                break
+            after_id = rows[-1]['talent_id']
+        return collected
+
+    def _get_talents_to_process_client_side(self, offset: int, limit: int) -> List[Dict]:
+        """既存プロフィール ID を全件取得し、talents を talent_id 順に読みながら除外する（RPC 未適用時）"""
+        existing_ids = self._fetch_all_ids('talent_profiles', 'talent_id')
+        pending = (
+            talent for talent in iter_rows(supabase, 'talents', 'talent_id, name, link', 'talent_id', page_size=200)
+            if str(talent.get('talent_id') or '') and str(talent['talent_id']) not in existing_ids
+        )
+        # offset は既存プロフィールを除いた後に読み飛ばす（RPC の p_offset と同じ）
+        collected = list(islice(pending, offset, offset + limit))
+        
+        self.logger.info(
+            f"処理対象: {len(collected)}件 (オフセット: {offset}, 既存除外: {len(existing_ids)}件)"
+        )
+        return collected
     
+    def _fetch_rows_by_ids(self, table_name: str, columns: str, ids, chunk_size: int = 200) -> List[Dict]:
+        """talent_id の一覧で行を取得する（URL 長を抑えるため in_ を分割）"""
+        ids = sorted(ids)
+        rows = []
+        for i in range(0, len(ids), chunk_size):
+            res = supabase.table(table_name).select(columns).in_('talent_id', ids[i:i + chunk_size]).execute()
+            rows.extend(res.data or [])
+        return rows
+
+    def _count_recent_appearances(self) -> Counter:
+        """前後 APPEARANCE_*_DAYS 日に放送される番組への出演数を talent_id ごとに数える"""
+        today = datetime.now().date()
+        date_from = (today - timedelta(days=APPEARANCE_PAST_DAYS)).isoformat()
+        date_to = (today + timedelta(days=APPEARANCE_FUTURE_DAYS)).isoformat()
+        rows = iter_rows(
+            supabase, APPEARANCES_TABLE, 'talent_id, programs!inner(broadcast_date)', 'id',
+            filters=lambda query: query.gte('programs.broadcast_date', date_from).lte('programs.broadcast_date', date_to),
+            prefetch=True,
+        )
+        return Counter(str(row['talent_id']) for row in rows if row.get('talent_id') is not None)
+
+    def get_talents_by_priority(self, budget: int = 50) -> List[Dict]:
+        """未取得・再取得の候補に優先度を付け、高い順に budget 件を返す。
+
+        候補は 直近に出演したタレント / プロフィール未取得のタレント / scraped_at の古い順・
+        完成度の低い順の既存プロフィール（各 budget 件）。
+        """
+        try:
+            appearances = self._count_recent_appearances()
+        except Exception as e:
+            self.logger.warning(f"出演数の集計に失敗したため、古さと完成度のみで優先度を付けます: {str(e)}")
+            appearances = Counter()
+
+        # 古さは最終確認日時（sql/talent_profile_fingerprint.sql 適用後）、なければ取得日時で測る
+        profile_columns = 'talent_id, scraped_at, last_checked_at, profile_completeness'
+        age_column = 'last_checked_at'
+        try:
+            supabase.table('talent_profiles').select('last_checked_at').limit(1).execute()
+        except Exception:
+            profile_columns = 'talent_id, scraped_at, profile_completeness'
+            age_column = 'scraped_at'
+
+        profiles = {}
+        try:
+            for order_column in (age_column, 'profile_completeness'):
+                res = supabase.table('talent_profiles').select(profile_columns).order(order_column).limit(budget).execute()
+                profiles.update({str(row['talent_id']): row for row in (res.data or [])})
+            appearing_ids = set(appearances) - set(profiles)
+            profiles.update({
+                str(row['talent_id']): row
+                for row in self._fetch_rows_by_ids('talent_profiles', profile_columns, appearing_ids)
+            })
+            talents = {
+                str(row['talent_id']): row
+                for row in self._fetch_rows_by_ids('talents', 'talent_id, name, link', set(appearances) | set(profiles))
+            }
+        except Exception as e:
+            self.logger.error(f"優先度付けの候補取得エラー: {str(e)}")
+            return []
+        for talent in self.get_talents_to_process(0, budget):
+            talents.setdefault(str(talent['talent_id']), talent)
+
+        scheduler = RefreshScheduler()
+        for talent_id, talent in sorted(talents.items()):
+            if talent.get('link'):
+                scheduler.add(talent, appearances.get(talent_id, 0), profiles.get(talent_id))
+        selected = scheduler.take(budget)
+
+        refreshed = sum(1 for talent, _, _ in selected if str(talent['talent_id']) in profiles)
+        on_air = sum(1 for _, _, count in selected if count)
+        self.logger.info(
+            f"優先度順の処理対象: {len(selected)}件 / 候補 {len(talents)}件 "
+            f"(未取得 {len(selected) - refreshed}件, 再取得 {refreshed}件, 直近出演あり {on_air}件, "
+            f"取得直後のため除外 {scheduler.skipped}件)"
+        )
+        for talent, score, count in selected[:5]:
+            self.logger.info(f"  優先度 {score:.2f}: {talent['name']} (ID: {talent['talent_id']}, 出演 {count}件)")
+        return [talent for talent, _, _ in selected]
+
     def scrape_talent_profile(self, talent_id: str, talent_link: str, talent_name: str) -> Optional[Dict]:
         """個別タレントのプロフィール取得（修正版）"""
         
         try:
             self.logger.info(f"取得中: {talent_name} (ID: {talent_id})")
             
-            response = self.session.get(talent_link, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # 基本データ構造
-            profile_data = {
-                'talent_id': talent_id,
-                'source_url': talent_link,
-                'scraped_at': datetime.now().isoformat()
-            }
-            
-            # 名前と読み方を抽出（修正版）
-            self._extract_name_info_fixed(soup, profile_data)
-            
-            # 基本情報を抽出（修正版）
-            self._extract_basic_info_fixed(soup, profile_data)
-            
-            # プロフィール画像
-            img_element = soup.find('img', class_='talent_img')
-            if img_element and img_element.get('src'):
-                profile_data['profile_image_url'] = img_element['src']
+            with self.metrics.stage('profile_fetch'):
+                response = self.http_cache.get(self.session, talent_link, timeout=15)
+                response.raise_for_status()
             
-            # ジャンル、特技、趣味、芸歴を抽出（修正版）
-            self._extract_profile_details_fixed(soup, profile_data)
-            
-            # 完成度スコアを計算
-            profile_data['profile_completeness'] = self._calculate_completeness(profile_data)
+            with self.metrics.stage('profile_parse'):
+                # 名前：/情報： ブロックは親要素を辿るため部分木に絞らず、パーサのみ高速化する
+                soup = make_soup(response.content)
+                
+                # 基本データ構造
+                profile_data = {
+                    'talent_id': talent_id,
+                    'source_url': talent_link,
+                    'scraped_at': datetime.now().isoformat()
+                }
+                
+                # 名前・基本情報・画像・ジャンル/特技/趣味/芸歴を1回の走査で抽出
+                extract_profile_fields(soup, profile_data)
+                
+                # 完成度スコアを計算
+                profile_data['profile_completeness'] = self._calculate_completeness(profile_data)
             
             return profile_data
             
@@ -139,144 +282,11 @@ class TalentProfileScraperFixed:
                 'error': str(e),
                 'timestamp': datetime.now().isoformat()
             }
-            self.errors.append(error_info)
+            with self._lock:
+                self.errors.append(error_info)
             self.logger.error(f"エラー - {talent_name}: {str(e)}")
             return None
     
-    def _extract_name_info_fixed(self, soup, profile_data):
-        """名前情報を抽出（修正版）"""
-        
-        # 修正1: string引数を使用（text引数は非推奨）
-        name_element = soup.find('li', string=re.compile(r'名前：'))
-        
-        # 修正2: 見つからない場合はspan検索
-        if not name_element:
-            name_spans = soup.find_all('span', string=re.compile(r'名前：'))
-            if name_spans:
-                name_element = name_spans[0].parent
-        
-        # 修正3: より柔軟な名前パターンマッチング
-        if name_element:
-            name_text = name_element.get_text()
-            
-            # パターン1: 名前：山之内 すず（ヤマノウチ スズ）
-            name_match = re.search(r'名前[：:]\s*(.+?)（(.+?)）', name_text)
-            if name_match:
-                profile_data['full_name'] = name_match.group(1).strip()
-                profile_data['reading'] = name_match.group(2).strip()
-            else:
-                # パターン2: 名前のみの場合
-                simple_match = re.search(r'名前[：:]\s*(.+)', name_text)
-                if simple_match:
-                    name_only = simple_match.group(1).strip()
-                    # 読み方が含まれていない場合
-                    if not '（' in name_only:
-                        profile_data['full_name'] = name_only
-    
-    def _extract_basic_info_fixed(self, soup, profile_data):
-        """基本情報を抽出（修正版）"""
-        
-        # 修正: string引数を使用
-        info_element = soup.find('li', string=re.compile(r'情報：'))
-        if not info_element:
-            info_spans = soup.find_all('span', string=re.compile(r'情報：'))
-            if info_spans:
-                info_element = info_spans[0].parent
-        
-        if info_element:
-            info_text = info_element.get_text()
-            
-            # 生年月日
-            birth_match = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', info_text)
-            if birth_match:
-                year, month, day = birth_match.groups()
-                profile_data['birth_date'] = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-            
-            # 星座
-            zodiac_match = re.search(r'(おひつじ座|おうし座|ふたご座|かに座|しし座|おとめ座|てんびん座|さそり座|いて座|やぎ座|みずがめ座|うお座)', info_text)
-            if zodiac_match:
-                profile_data['zodiac_sign'] = zodiac_match.group(1)
-            
-            # 血液型
-            blood_match = re.search(r'([ABO]B?)型', info_text)
-            if blood_match:
-                profile_data['blood_type'] = blood_match.group(1) + '型'
-            
-            # 身長
-            height_match = re.search(r'(\d+)cm', info_text)
-            if height_match:
-                profile_data['height_cm'] = int(height_match.group(1))
-            
-            # 出身地（修正版：データクリーニング）
-            birthplace_match = re.search(r'([^0-9]+?)出身', info_text)
-            if birthplace_match:
-                raw_birthplace = birthplace_match.group(1).strip()
-                # 修正: 不要な文字列を除去
-                cleaned_birthplace = self._clean_birthplace(raw_birthplace)
-                if cleaned_birthplace:
-                    profile_data['birthplace'] = cleaned_birthplace
-    
-    def _clean_birthplace(self, raw_text: str) -> str:
-        """出身地データのクリーニング"""
-        
-        # 不要な文字列を除去
-        cleaned = re.sub(r'(cm|kg)\s*\n\s*', '', raw_text)
-        cleaned = re.sub(r'\s+', '', cleaned)  # 余分な空白除去
-        cleaned = re.sub(r'^[日月火水木金土]+\s*', '', cleaned)  # 曜日文字除去
-        
-        # 空文字や意味のない文字列をフィルタ
-        if len(cleaned) < 2 or cleaned in ['日', '月', '火', '水', '木', '金', '土']:
-            return ''
-        
-        return cleaned.strip()
-    
-    def _extract_profile_details_fixed(self, soup, profile_data):
-        """ジャンル、特技、趣味、芸歴を抽出（修正版）"""
-        
-        # 修正: string引数を使用
-        detail_fields = {
-            'ジャンル': 'genres',
-            '特技': 'skills', 
-            '趣味': 'hobbies',
-            '芸歴': 'career_history'
-        }
-        
-        for japanese_key, english_key in detail_fields.items():
-            # id属性で検索
-            element = soup.find('p', id=japanese_key)
-            
-            # id属性がない場合はspan検索（修正版）
-            if not element:
-                spans = soup.find_all('span', string=re.compile(f'{japanese_key}[：:]'))
-                if spans:
-                    element = spans[0].find_next('p')
-            
-            if element:
-                text = element.get_text().strip()
-                
-                if english_key == 'career_history':
-                    profile_data[english_key] = text
-                else:
-                    # リスト形式で保存（修正版：より正確な分割）
-                    items = self._split_detail_items(text)
-                    if items:
-                        profile_data[english_key] = items
-    
-    def _split_detail_items(self, text: str) -> List[str]:
-        """詳細項目の分割処理"""
-        
-        # 複数の区切り文字に対応
-        items = re.split(r'[\s\u3000\n]+', text.replace('　', ' '))
-        
-        # 空文字や短すぎる項目を除去
-        filtered_items = []
-        for item in items:
-            item = item.strip()
-            if len(item) > 1 and item not in ['、', '，', '・']:
-                filtered_items.append(item)
-        
-        return filtered_items
-    
     def _calculate_completeness(self, profile_data: Dict) -> float:
         """プロフィール完成度を計算"""
         score = 0.0
@@ -301,18 +311,104 @@ class TalentProfileScraperFixed:
             supabase.table('talent_profiles').upsert(
                 profile_data, on_conflict='talent_id'
             ).execute()
-            
-            # 修正: タグ生成と保存を追加
-            tags = self._generate_tags(profile_data)
-            if tags:
-                self._save_tags_to_db(tags)
-            
-            self.logger.info(f"保存成功: ID {profile_data['talent_id']} (完成度: {profile_data.get('profile_completeness', 0):.2f})")
+            self._after_profile_saved(profile_data)
             return True
             
         except Exception as e:
             self.logger.error(f"保存エラー: ID {profile_data['talent_id']} - {str(e)}")
+            with self._lock:
+                self.errors.append({
+                    'talent_id': str(profile_data['talent_id']),
+                    'talent_name': profile_data.get('full_name'),
+                    'error': f"保存エラー: {str(e)}",
+                    'timestamp': datetime.now().isoformat()
+                })
             return False
+
+    def _after_profile_saved(self, profile_data: Dict):
+        """保存できたプロフィールのタグ登録・完了記録"""
+        # 修正: タグ生成と保存を追加
+        tags = self._generate_tags(profile_data)
+        if tags:
+            self._save_tags_to_db(tags)
+        if self._journal is not None:
+            self._journal.mark_done('talent', profile_data['talent_id'])
+        
+        self.logger.info(f"保存成功: ID {profile_data['talent_id']} (完成度: {profile_data.get('profile_completeness', 0):.2f})")
+
+    def _write_profiles(self, rows: List[Dict]):
+        """profile_writer の書き込み関数。列の組み合わせごとにまとめて upsert し、失敗したら1件ずつ保存し直す。
+
+        抽出できた項目だけを持つ行なので、PostgREST の一括 upsert（全オブジェクトのキー一致が必要）に
+        合わせて同じキー集合の行どうしで送る。取れなかった項目を NULL で上書きしない点は1件ずつの保存と同じ。
+        """
+        groups = {}
+        for profile_data in rows:
+            groups.setdefault(frozenset(profile_data), []).append(profile_data)
+        
+        success = 0
+        for group in groups.values():
+            try:
+                supabase.table('talent_profiles').upsert(group, on_conflict='talent_id').execute()
+                for profile_data in group:
+                    self._after_profile_saved(profile_data)
+                success += len(group)
+            except Exception as e:
+                self.logger.warning(f"プロフィール一括保存エラー（{len(group)}件、1件ずつ再試行します）: {str(e)}")
+                success += sum(1 for profile_data in group if self.save_profile(profile_data))
+        failed = len(rows) - success
+        
+        self._count('success', success)
+        self._count('failed', failed)
+        return success, failed
+
+    def _touch_profiles(self, talent_ids: List[str]):
+        """checked_writer の書き込み関数。内容に変更のないプロフィールの last_checked_at を更新する"""
+        try:
+            supabase.table('talent_profiles').update(
+                {'last_checked_at': datetime.now().isoformat()}
+            ).in_('talent_id', talent_ids).execute()
+        except Exception as e:
+            # 確認日時は優先度付けの参考値なので、失敗してもプロフィールの失敗とはしない
+            self.logger.warning(f"確認日時の更新エラー（{len(talent_ids)}件）: {str(e)}")
+            return 0, len(talent_ids)
+        for talent_id in talent_ids:
+            if self._journal is not None:
+                self._journal.mark_done('talent', talent_id)
+        return len(talent_ids), 0
+
+    def _load_fingerprints(self, talents: List[Dict]):
+        """処理対象の既存プロフィールの内容指紋を読み込む。列が未追加なら指紋は使わない"""
+        try:
+            rows = self._fetch_rows_by_ids(
+                'talent_profiles', 'talent_id, content_fingerprint', {str(t['talent_id']) for t in talents}
+            )
+        except Exception as e:
+            self.known_fingerprints = None
+            self.logger.warning(f"content_fingerprint 列が使えないため、変更検知なしで保存します: {str(e)}")
+            return
+        self.known_fingerprints = {
+            str(row['talent_id']): row['content_fingerprint'] for row in rows if row.get('content_fingerprint')
+        }
+
+    def _queue_profile(self, profile_data: Dict):
+        """内容が前回と同じなら確認日時だけ、変わっていればプロフィール全体を書き込みキューへ積む"""
+        if self.known_fingerprints is None:
+            self.profile_writer.add(profile_data)
+            return
+        talent_id = str(profile_data['talent_id'])
+        fingerprint = profile_fingerprint(profile_data)
+        if self.known_fingerprints.get(talent_id) == fingerprint:
+            self.checked_writer.add(talent_id)
+            self._count('skipped')
+            return
+        profile_data['content_fingerprint'] = fingerprint
+        profile_data['last_checked_at'] = profile_data['scraped_at']
+        self.profile_writer.add(profile_data)
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
     
     def _generate_tags(self, profile_data: Dict) -> List[Dict]:
         """プロフィールからタグを生成（強化版）"""
@@ -360,39 +456,43 @@ class TalentProfileScraperFixed:
         
         return mapping.get(genre)
     
+    def _load_tag_ids(self):
+        """talent_tags の tag_name → tag_id を全件読み込む"""
+        res = supabase.table('talent_tags').select('tag_id, tag_name').execute()
+        self.tag_ids = {row['tag_name']: row['tag_id'] for row in (res.data or [])}
+        self.logger.info(f"タグマスター読み込み: {len(self.tag_ids)}件")
+
+    def _get_tag_id(self, tag_name: str, tag_category: str):
+        """キャッシュから tag_id を返し、未登録のタグだけマスターに登録する"""
+        if self.tag_ids is None:
+            self._load_tag_ids()
+        if tag_name not in self.tag_ids:
+            # 並行実行で先に作られていることもあるので、登録前に確認する
+            existing_tag = supabase.table('talent_tags').select('tag_id').eq('tag_name', tag_name).execute()
+            if existing_tag.data:
+                self.tag_ids[tag_name] = existing_tag.data[0]['tag_id']
+            else:
+                new_tag = supabase.table('talent_tags').insert({
+                    'tag_name': tag_name,
+                    'tag_category': tag_category
+                }).execute()
+                self.tag_ids[tag_name] = new_tag.data[0]['tag_id']
+        return self.tag_ids[tag_name]
+
     def _save_tags_to_db(self, tags: List[Dict]):
-        """タグをデータベースに保存（新規実装）"""
+        """タグ関連をバッファへ積む（書き込みは tag_relation_writer がまとめて行う）"""
         
         for tag_data in tags:
             try:
-                tag_name = tag_data['tag_name']
-                tag_category = tag_data['tag_category']
-                
-                # タグマスターに登録（存在しない場合のみ）
-                existing_tag = supabase.table('talent_tags').select('tag_id').eq('tag_name', tag_name).execute()
-                
-                if not existing_tag.data:
-                    new_tag = supabase.table('talent_tags').insert({
-                        'tag_name': tag_name,
-                        'tag_category': tag_category
-                    }).execute()
-                    tag_id = new_tag.data[0]['tag_id']
-                else:
-                    tag_id = existing_tag.data[0]['tag_id']
+                tag_id = self._get_tag_id(tag_data['tag_name'], tag_data['tag_category'])
                 
                 # タレント-タグ関連を保存
-                relation_data = {
+                self.tag_relation_writer.add({
                     'talent_id': tag_data['talent_id'],
                     'tag_id': tag_id,
                     'confidence_score': tag_data['confidence_score'],
                     'extraction_method': tag_data['extraction_method']
-                }
-                
-                supabase.table('talent_tag_relations').upsert(
-                    relation_data,
-                    on_conflict='talent_id,tag_id',
-                    ignore_duplicates=True,
-                ).execute()
+                })
                 
             except Exception as e:
                 self.logger.error(f"タグ保存エラー: {tag_data} - {str(e)}")
@@ -408,8 +508,9 @@ class TalentProfileScraperFixed:
                 "title": "🎭 Talent Profile Scraper Completed",
                 "color": 0x00ff00 if self.stats['failed'] == 0 else 0xff9900,
                 "fields": [
-                    {"name": "📊 Results", "value": f"```Success: {self.stats['success']}\nFailed: {self.stats['failed']}\nTotal: {self.stats['total']}```"},
-                    {"name": "📈 Success Rate", "value": f"{(self.stats['success'] / max(1, self.stats['total'])) * 100:.1f}%"}
+                    {"name": "📊 Results", "value": f"```Success: {self.stats['success']}\nUnchanged: {self.stats['skipped']}\nFailed: {self.stats['failed']}\nTotal: {self.stats['total']}```"},
+                    {"name": "📈 Success Rate", "value": f"{((self.stats['success'] + self.stats['skipped']) / max(1, self.stats['total'])) * 100:.1f}%"},
+                    {"name": "⏱️ Metrics", "value": self.metrics.discord_summary()[:1024]}
                 ],
                 "timestamp": datetime.now().isoformat()
             }
@@ -440,48 +541,103 @@ class TalentProfileScraperFixed:
         
         self.logger.info(f"エラーログ保存: {filename}")
     
-    def process_talents(self, offset: int = 0, limit: int = 50):
+    def _fetch_profiles(self, talents: List[Dict], workers: int, requests_per_second: float):
+        """プロフィールを並列に取得・解析し、完了した順に (talent, profile_data) を返すジェネレータ。
+
+        送信ペースは bangumi.org 全体で requests_per_second に制限する。DB への保存は
+        呼び出し側（メインスレッド）で行う。
+        """
+        def _scrape(entry):
+            i, talent = entry
+            self.logger.info(f"[{i + 1}/{len(talents)}] 処理中: {talent['name']}")
+            return self.scrape_talent_profile(talent['talent_id'], talent['link'], talent['name'])
+        
+        for (_, talent), profile_data, error in fetch_concurrently(
+            list(enumerate(talents)), _scrape, workers, requests_per_second,
+            url=lambda entry: entry[1]['link'],
+            on_wait=lambda waited: self.metrics.observe('profile_rate_wait', waited),
+        ):
+            if error is not None:
+                raise error
+            yield talent, profile_data
+
+    def process_talents(self, offset: int = 0, limit: int = 50, resume: bool = False,
+                        workers: int = TALENT_FETCH_WORKERS, requests_per_second: float = TALENT_REQUESTS_PER_SECOND,
+                        strategy: str = 'pending'):
         """メイン処理"""
         
         start_time = datetime.now()
         self.logger.info(f"タレントプロフィール取得開始 (オフセット: {offset}, 件数: {limit})")
-        
-        # 処理対象を取得
-        talents = self.get_talents_to_process(offset, limit)
+        self.logger.info(f"並列取得: {workers}ワーカー, 上限 {requests_per_second:.2f}件/秒")
+        if workers > HTTP_POOL_MAXSIZE:
+            # ワーカー数に合わせて keep-alive 接続プールを広げる
+            mount_adapter(self.session, pool_maxsize=workers)
+        
+        # チェックポイント（保存まで完了した talent_id を記録）
+        if strategy == 'priority':
+            journal = CheckpointJournal(
+                f"talent_profiles_priority_{limit}", {'strategy': strategy, 'limit': limit}, resume=resume
+            )
+        else:
+            journal = CheckpointJournal(
+                f"talent_profiles_{offset}_{limit}", {'offset': offset, 'limit': limit}, resume=resume
+            )
+        self._journal = journal
+        # バッファ中のタグ関連もジャーナルに記録し、中断後の再開時に再投入する
+        self.tag_relation_writer.journal = journal
+        self.tag_relation_writer.replay()
+        
+        # 処理対象を取得（priority は offset を使わず、優先度の高い順に limit 件）
+        with self.metrics.stage('select_targets'):
+            if strategy == 'priority':
+                talents = self.get_talents_by_priority(limit)
+            else:
+                talents = self.get_talents_to_process(offset, limit)
+        if journal.resumed:
+            remaining = [t for t in talents if not journal.is_done('talent', t['talent_id'])]
+            self.logger.info(f"チェックポイント済み {len(talents) - len(remaining)}件をスキップ")
+            talents = remaining
         self.stats['total'] = len(talents)
+        with self.metrics.stage('fingerprint_load'):
+            self._load_fingerprints(talents)
         
-        # 各タレントを処理
-        for i, talent in enumerate(talents):
-            talent_id = talent['talent_id']
-            talent_name = talent['name']
-            talent_link = talent['link']
-            
-            self.logger.info(f"[{i + 1}/{len(talents)}] 処理中: {talent_name}")
-            
-            # プロフィール取得
-            profile_data = self.scrape_talent_profile(talent_id, talent_link, talent_name)
-            
+        # 各タレントを処理（取得・解析はワーカー、保存はこのスレッド）
+        for talent, profile_data in self._fetch_profiles(talents, workers, requests_per_second):
             if profile_data:
-                # データベース保存
-                if self.save_profile(profile_data):
-                    self.stats['success'] += 1
-                else:
-                    self.stats['failed'] += 1
+                # データベース保存（バッファへ積み、まとめて書き込む。変更がなければ確認日時のみ）
+                self._queue_profile(profile_data)
             else:
-                self.stats['failed'] += 1
-            
-            # レート制限
-            time.sleep(1.5)
+                self._count('failed')
+        
+        # 完了処理（バッファに残ったプロフィールとタグ関連を書き込む）
+        self.profile_writer.close()
+        self.checked_writer.close()
+        relation_success, relation_errors = self.tag_relation_writer.close()
+        self.logger.info(f"タグ関連登録: 成功 {relation_success}件, 失敗 {relation_errors}件")
+        
+        # エラーログは完了順ではなく処理対象の順に並べる（並列実行でも毎回同じ順序になる）
+        order = {str(talent['talent_id']): i for i, talent in enumerate(talents)}
+        self.errors.sort(key=lambda error: order.get(error['talent_id'], len(order)))
         
-        # 完了処理
         end_time = datetime.now()
         execution_time = (end_time - start_time).total_seconds() / 60
         
         self.logger.info(f"処理完了: {execution_time:.1f}分")
-        self.logger.info(f"結果: 成功 {self.stats['success']}件, 失敗 {self.stats['failed']}件")
+        self.logger.info(
+            f"結果: 成功 {self.stats['success']}件, 変更なし {self.stats['skipped']}件, 失敗 {self.stats['failed']}件"
+        )
+
+        self.http_cache.prune()
+        self.logger.info(self.http_cache.summary())
+        journal.finish()
         
-        # エラーログ保存
+        # エラーログ・実行レポート保存
         self.save_error_log()
+        for key, value in self.stats.items():
+            self.metrics.count(key, value)
+        report_path = self.metrics.write_report(status='success', strategy=strategy, offset=offset, limit=limit)
+        if report_path:
+            self.logger.info(f"実行レポート: {report_path}")
         
         # Discord通知
         self.send_discord_notification()
@@ -496,6 +652,14 @@ def main():
                        help='実行モード')
     parser.add_argument('--offset', type=int, default=0,
                        help='処理開始オフセット')
+    parser.add_argument('--strategy', choices=STRATEGIES, default='pending',
+                       help='処理対象の選び方（pending: 未取得のみ / priority: 出演・古さ・完成度の優先度順に再取得も含める）')
+    parser.add_argument('--workers', type=int, default=TALENT_FETCH_WORKERS,
+                       help='プロフィールの同時取得数')
+    parser.add_argument('--requests-per-second', type=float, default=TALENT_REQUESTS_PER_SECOND,
+                       help='bangumi.org への毎秒リクエスト上限（全ワーカー合計）')
+    parser.add_argument('--resume', action='store_true',
+                       help='同じ条件のチェックポイントがあれば、保存済みのタレントを飛ばして再開')
     
     args = parser.parse_args()
     
@@ -509,7 +673,16 @@ def main():
     
     # 処理実行
     scraper = TalentProfileScraperFixed()
-    scraper.process_talents(offset=args.offset, limit=limit)
+    metrics_exporter = start_metrics_exporter(scraper.metrics)
+    try:
+        scraper.process_talents(
+            offset=args.offset, limit=limit, resume=args.resume,
+            workers=args.workers, requests_per_second=args.requests_per_second, strategy=args.strategy,
+        )
+    except Exception:
+        metrics_exporter.close(success=False)
+        raise
+    metrics_exporter.close(success=True)
 
 if __name__ == "__main__":
     main()
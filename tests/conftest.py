@@ -0,0 +1,34 @@
+# tests/conftest.py
+# v1.0.0 (2026-10-17)
+# テスト共通設定: リポジトリ直下のモジュールと benchmarks/fake_supabase を import できるようにする
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import pytest
+
+from fake_supabase import FakeDatabase, SQL_RPC_HANDLERS, make_module
+
+_FAKE_DB = None
+
+
+@pytest.fixture
+def fake_db():
+    """スクレイパが使う Supabase クライアントの代わり（プロセス内で共有し、テストごとに空にする）。
+
+    スクレイパはモジュール読み込み時に create_client するため、このフィクスチャを受け取ってから import する。
+    """
+    global _FAKE_DB
+    if _FAKE_DB is None:
+        _FAKE_DB = FakeDatabase()
+        sys.modules['supabase'] = make_module(_FAKE_DB)
+    _FAKE_DB.rpc_handlers = dict(SQL_RPC_HANDLERS)
+    _FAKE_DB.tables.clear()
+    _FAKE_DB.objects.clear()
+    _FAKE_DB.object_options.clear()
+    _FAKE_DB.calls.clear()
+    return _FAKE_DB
@@ -0,0 +1,42 @@
+# tests/test_archive.py
+# v1.0.0 (2026-10-17)
+# archive_old_db_records: RPC archive_old_programs とクライアント経由のフォールバックで同じ結果になること
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def _seed(fake_db, rotation_days):
+    today = datetime.now().date()
+    dates = [(today - timedelta(days=rotation_days + offset)).isoformat() for offset in (30, 5, 1, 0, -1, -10)]
+    for table_name in ('programs_epg', 'programs'):
+        fake_db.seed(table_name, [
+            {'event_id': f"{table_name}-{i}", 'broadcast_date': date, 'program_title': f"番組{i}"}
+            for i, date in enumerate(dates)
+        ])
+    # 以前の実行で退避済みの行（同じ event_id は上書きされる）
+    fake_db.seed('programs_archive', [{'event_id': 'programs-0', 'broadcast_date': dates[0], 'program_title': '古い'}])
+
+
+def _state(fake_db):
+    return {
+        name: sorted((row['event_id'], row['program_title']) for row in fake_db.tables.get(name, []))
+        for name in ('programs_epg', 'programs_epg_archive', 'programs', 'programs_archive')
+    }
+
+
+@pytest.mark.parametrize('use_rpc', [True, False])
+def test_archive_moves_rows_older_than_rotation(fake_db, use_rpc):
+    import tv_schedule_updater as tv
+    if not use_rpc:
+        del fake_db.rpc_handlers['archive_old_programs']
+    _seed(fake_db, tv.ROTATION_DAYS)
+
+    tv.archive_old_db_records(page_size=2, chunk_size=2)
+
+    state = _state(fake_db)
+    for table_name in ('programs_epg', 'programs'):
+        assert [event_id for event_id, _ in state[table_name]] == [f"{table_name}-{i}" for i in (3, 4, 5)]
+        assert [event_id for event_id, _ in state[f"{table_name}_archive"]] == [f"{table_name}-{i}" for i in (0, 1, 2)]
+    assert ('programs-0', '番組0') in state['programs_archive']
+    assert fake_db.calls[('rpc', 'archive_old_programs')] == (4 if use_rpc else 1)
@@ -0,0 +1,111 @@
+# tests/test_channel_resolver.py
+# v1.0.0 (2026-10-17)
+# ChannelResolver が旧 find_channel_code（線形走査版）と全チャンネル名で同じ結果（未解決の None を含む）を返すこと
+import glob
+import os
+import re
+
+from channel_resolver import CHANNEL_MAPPING, ChannelResolver
+from page_parser import parse_epg_page
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+
+def legacy_find_channel_code(channel_name):
+    """v1.1.0 の find_channel_code（比較用にそのまま残した旧実装）"""
+    if not channel_name:
+        return None
+
+    clean_name = channel_name.strip()
+
+    for code, name_list in CHANNEL_MAPPING.items():
+        for name in name_list:
+            if clean_name == name:
+                return code
+
+    name_without_number = re.sub(r'^\d+\s*', '', clean_name)
+    if name_without_number != clean_name:
+        for code, name_list in CHANNEL_MAPPING.items():
+            for name in name_list:
+                if name_without_number == name:
+                    return code
+
+    bs_matches = []
+    terrestrial_matches = []
+
+    for code, name_list in CHANNEL_MAPPING.items():
+        for name in name_list:
+            if name in clean_name or clean_name in name:
+                if code.startswith('BS-') or 'BS' in code:
+                    bs_matches.append((code, name))
+                else:
+                    terrestrial_matches.append((code, name))
+
+    if 'BS' in clean_name or 'ＢＳ' in clean_name:
+        if bs_matches:
+            best_match = max(bs_matches, key=lambda x: len(x[1]))
+            return best_match[0]
+
+    if terrestrial_matches:
+        best_match = max(terrestrial_matches, key=lambda x: len(x[1]))
+        return best_match[0]
+
+    if bs_matches:
+        best_match = max(bs_matches, key=lambda x: len(x[1]))
+        return best_match[0]
+
+    return None
+
+
+def build_corpus():
+    """登録名・番号付き・表記ゆれ・部分一致・未登録名とフィクスチャのチャンネル名を集める"""
+    names = {"", " ", "　", "不明", "ＢＳ", "BS", "テレ", "NHK", "ch", "1", "123 ", "ＱＶＣ", "ショップチャンネル"}
+    for code, name_list in CHANNEL_MAPPING.items():
+        names.add(code)
+        for name in name_list:
+            names.update({
+                name, f" {name} ", f"1 {name}", f"7 {name}", f"１２　{name}", f"{name}1", f"{name}・東京",
+                f"BS{name}", f"ＢＳ{name}", name[:-1], name[1:], name.replace(" ", "　"), name.lower(),
+            })
+    for path in glob.glob(os.path.join(FIXTURE_DIR, "epg", "*.html")):
+        with open(path, encoding="utf-8") as f:
+            channel_names, _ = parse_epg_page(f.read())
+        names.update(channel_names)
+    return sorted(names)
+
+
+CORPUS = build_corpus()
+
+
+def test_corpus_includes_fixture_and_unresolvable_names():
+    fixture_names = set()
+    for path in glob.glob(os.path.join(FIXTURE_DIR, "epg", "*.html")):
+        with open(path, encoding="utf-8") as f:
+            fixture_names.update(parse_epg_page(f.read())[0])
+    assert fixture_names and fixture_names <= set(CORPUS)
+    assert any(legacy_find_channel_code(name) is None for name in CORPUS)
+
+
+def test_resolver_matches_legacy_for_every_name():
+    resolver = ChannelResolver(CHANNEL_MAPPING)
+    mismatches = [
+        (name, legacy_find_channel_code(name), resolver.resolve(name))
+        for name in CORPUS
+        if resolver.resolve(name) != legacy_find_channel_code(name)
+    ]
+    assert mismatches == []
+
+
+def test_cached_results_match_legacy_and_unresolved_are_counted():
+    resolver = ChannelResolver(CHANNEL_MAPPING, cache_size=16)
+    for _ in range(2):  # 2周目はメモ化された結果
+        assert [resolver.resolve(name) for name in CORPUS] == [legacy_find_channel_code(name) for name in CORPUS]
+    unresolved = {name for name in CORPUS if name and legacy_find_channel_code(name) is None}
+    assert set(resolver.unresolved) == unresolved
+    assert all(resolver.unresolved[name] == 2 for name in unresolved)
+
+
+def test_full_width_variant_unknown_to_legacy_stays_unresolved():
+    # NFKC で畳めば「NHK BS」に当たる表記でも、旧実装と同じく解決しない
+    assert legacy_find_channel_code("ＮＨＫ ＢＳ") is None
+    assert ChannelResolver(CHANNEL_MAPPING).resolve("ＮＨＫ ＢＳ") is None
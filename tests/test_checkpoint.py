@@ -0,0 +1,135 @@
+# tests/test_checkpoint.py
+# v1.0.0 (2026-10-17)
+# CheckpointJournal と BufferedWriter.replay による --resume の動作確認
+import json
+import os
+import time
+
+from checkpoint import CheckpointJournal, prune_journals
+from db_writer import BufferedWriter
+
+
+PARAMS = {'start_date': '2026-10-17', 'end_date': '2026-10-18'}
+
+
+def _writer(journal, written, fail=False):
+    def write_batch(rows):
+        if fail:
+            return 0, len(rows)
+        written.extend(rows)
+        return len(rows), 0
+    return BufferedWriter("テスト", write_batch, max_rows=10, max_seconds=3600, journal=journal, journal_key='programs')
+
+
+def test_resume_skips_done_ids_and_replays_unflushed_rows(tmp_path):
+    journal = CheckpointJournal('run', PARAMS, resume=True, directory=str(tmp_path))
+    assert not journal.resumed
+    writer = _writer(journal, [])
+    writer.extend([{'event_id': '1'}, {'event_id': '2'}])
+    writer.flush()
+    journal.mark_done('event', '1')
+    journal.mark_done('event', '2')
+    writer.add({'event_id': '3'})  # flush 前に中断した行
+
+    resumed = CheckpointJournal('run', PARAMS, resume=True, directory=str(tmp_path))
+    assert resumed.resumed
+    assert resumed.is_done('event', '1') and resumed.is_done('event', 2)
+    assert not resumed.is_done('event', '3')
+
+    written = []
+    replay_writer = _writer(resumed, written)
+    assert replay_writer.replay() == 1
+    replay_writer.flush()
+    assert written == [{'event_id': '3'}]
+
+    # 再投入した行の書き込み成功も記録され、次の再開では残らない
+    again = CheckpointJournal('run', PARAMS, resume=True, directory=str(tmp_path))
+    assert again.unflushed('programs') == []
+
+
+def test_failed_batch_stays_pending(tmp_path):
+    journal = CheckpointJournal('run', PARAMS, directory=str(tmp_path))
+    writer = _writer(journal, [], fail=True)
+    writer.extend([{'event_id': '1'}, {'event_id': '2'}])
+    writer.flush()
+
+    resumed = CheckpointJournal('run', PARAMS, resume=True, directory=str(tmp_path))
+    assert [row for _, row in resumed.unflushed('programs')] == [{'event_id': '1'}, {'event_id': '2'}]
+    # 新しく記録する行の seq は前回の続きから振られる
+    assert resumed.record_pending('programs', {'event_id': '3'}) == 2
+
+
+def test_parameter_mismatch_starts_over(tmp_path, capsys):
+    journal = CheckpointJournal('run', PARAMS, directory=str(tmp_path))
+    journal.mark_done('event', '1')
+
+    other = CheckpointJournal('run', dict(PARAMS, end_date='2026-10-19'), resume=True, directory=str(tmp_path))
+    assert not other.resumed
+    assert not other.is_done('event', '1')
+    assert '実行条件が一致しない' in capsys.readouterr().out
+    with open(other.path, encoding='utf-8') as f:
+        first = json.loads(f.readline())
+    assert first['type'] == 'run' and first['params']['end_date'] == '2026-10-19'
+
+
+def test_without_resume_existing_journal_is_discarded(tmp_path):
+    journal = CheckpointJournal('run', PARAMS, directory=str(tmp_path))
+    journal.mark_done('event', '1')
+
+    fresh = CheckpointJournal('run', PARAMS, resume=False, directory=str(tmp_path))
+    assert not fresh.resumed and not fresh.is_done('event', '1')
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    journal = CheckpointJournal('run', PARAMS, directory=str(tmp_path))
+    journal.mark_done('event', '1')
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"type":"done","kind":"event","id":"2"')  # 強制終了で途中まで書かれた行
+
+    resumed = CheckpointJournal('run', PARAMS, resume=True, directory=str(tmp_path))
+    assert resumed.resumed
+    assert resumed.is_done('event', '1') and not resumed.is_done('event', '2')
+
+    # 再開後の追記は壊れた行に連結されず、次の再開でも読める
+    resumed.mark_done('event', '3')
+    again = CheckpointJournal('run', PARAMS, resume=True, directory=str(tmp_path))
+    assert again.is_done('event', '1') and again.is_done('event', '3')
+
+
+def test_finish_deletes_journal(tmp_path):
+    journal = CheckpointJournal('run', PARAMS, directory=str(tmp_path))
+    journal.mark_done('event', '1')
+    assert os.path.exists(journal.path)
+    journal.finish()
+    assert not os.path.exists(journal.path)
+
+    resumed = CheckpointJournal('run', PARAMS, resume=True, directory=str(tmp_path))
+    assert not resumed.resumed
+
+
+def _age(path, days):
+    stamp = time.time() - days * 86400
+    os.utime(path, (stamp, stamp))
+
+
+def test_stale_journals_are_pruned_and_not_resumed(tmp_path):
+    journal = CheckpointJournal('run', PARAMS, directory=str(tmp_path))
+    journal.mark_done('event', '1')
+    other = CheckpointJournal('tv_schedule_2026-10-01_2026-10-03', PARAMS, directory=str(tmp_path))
+    recent = CheckpointJournal('recent', PARAMS, directory=str(tmp_path))
+    (tmp_path / 'notes.txt').write_text('keep')
+    _age(journal.path, 5)
+    _age(other.path, 10)
+    _age(recent.path, 1)
+
+    resumed = CheckpointJournal('run', PARAMS, resume=True, directory=str(tmp_path), max_age_days=3)
+    assert not resumed.resumed and not resumed.is_done('event', '1')
+    assert not os.path.exists(other.path)
+    assert os.path.exists(recent.path) and (tmp_path / 'notes.txt').exists()
+
+
+def test_prune_disabled_with_zero_days(tmp_path):
+    journal = CheckpointJournal('run', PARAMS, directory=str(tmp_path))
+    _age(journal.path, 30)
+    assert prune_journals(str(tmp_path), 0) == []
+    assert prune_journals(str(tmp_path), 7) == [journal.path]
@@ -0,0 +1,36 @@
+# tests/test_db_writer.py
+# v1.0.0 (2026-10-17)
+# BufferedWriter: on_written は失敗なく書き込めたバッチだけを受け取る（政治家登場数の差分照合の対象）
+from db_writer import BufferedWriter
+
+
+def test_on_written_receives_only_confirmed_batches():
+    failing = {'2'}
+    confirmed = set()
+
+    def write_batch(rows):
+        if failing & {row['event_id'] for row in rows}:
+            return 0, len(rows)
+        return len(rows), 0
+
+    writer = BufferedWriter(
+        "テスト", write_batch, max_rows=2, max_seconds=3600,
+        on_written=lambda rows: confirmed.update(row['event_id'] for row in rows),
+    )
+    writer.extend([{'event_id': str(i)} for i in range(1, 6)])
+    writer.close()
+
+    # 1,2 のバッチは失敗、3,4 と 5 は成功
+    assert confirmed == {'3', '4', '5'}
+    assert (writer.success, writer.errors) == (3, 2)
+
+
+def test_partial_failure_is_not_confirmed():
+    confirmed = []
+    writer = BufferedWriter(
+        "テスト", lambda rows: (len(rows) - 1, 1), max_rows=10, max_seconds=3600, on_written=confirmed.append,
+    )
+    writer.extend([{'event_id': '1'}, {'event_id': '2'}])
+    writer.close()
+
+    assert confirmed == []
@@ -0,0 +1,45 @@
+# tests/test_fake_supabase.py
+# v1.0.0 (2026-10-17)
+# テスト・ベンチマーク用の Supabase 代替が PostgREST と同じように振る舞うこと（埋め込みリソースの条件など）
+import pytest
+
+from fake_supabase import FakeApiError, FakeDatabase, make_module
+
+
+@pytest.fixture
+def client():
+    db = FakeDatabase()
+    db.seed('programs', [
+        {'event_id': '1', 'broadcast_date': '2026-10-01'},
+        {'event_id': '2', 'broadcast_date': '2026-10-15'},
+    ])
+    db.seed('program_talent_appearances', [
+        {'id': 1, 'program_event_id': '1', 'talent_id': 'a'},
+        {'id': 2, 'program_event_id': '2', 'talent_id': 'a'},
+        {'id': 3, 'program_event_id': '2', 'talent_id': 'b'},
+        {'id': 4, 'program_event_id': '9', 'talent_id': 'c'},  # 番組が退避済み
+    ])
+    return make_module(db).create_client()
+
+
+def test_embedded_inner_filter_restricts_parent_rows(client):
+    rows = (
+        client.table('program_talent_appearances').select('talent_id, programs!inner(broadcast_date)')
+        .gte('programs.broadcast_date', '2026-10-10').order('id').execute().data
+    )
+    assert rows == [
+        {'talent_id': 'a', 'programs': {'broadcast_date': '2026-10-15'}},
+        {'talent_id': 'b', 'programs': {'broadcast_date': '2026-10-15'}},
+    ]
+
+
+def test_embedded_inner_drops_rows_without_parent(client):
+    rows = client.table('program_talent_appearances').select('id, programs!inner(event_id)').order('id').execute().data
+    assert [row['id'] for row in rows] == [1, 2, 3]
+
+
+def test_unknown_rpc_and_mismatched_bulk_keys_raise(client):
+    with pytest.raises(FakeApiError):
+        client.rpc('no_such_function', {}).execute()
+    with pytest.raises(FakeApiError):
+        client.table('programs').upsert([{'event_id': '3'}, {'event_id': '4', 'broadcast_date': 'x'}]).execute()
@@ -0,0 +1,31 @@
+# tests/test_http_client.py
+# v1.0.0 (2026-10-17)
+# fetch_concurrently: 全件を完了順に返し、例外は呼び出し側へ (item, None, 例外) で渡す
+from http_client import fetch_concurrently
+
+
+def test_fetch_concurrently_returns_results_and_errors():
+    items = [{'link': f"https://example.com/{i}", 'n': i} for i in range(6)]
+    waits = []
+
+    def fetch(item):
+        if item['n'] == 3:
+            raise ValueError("取得失敗")
+        return item['n'] * 10
+
+    results = {item['n']: (result, error) for item, result, error in
+               fetch_concurrently(items, fetch, workers=3, requests_per_second=0, on_wait=waits.append)}
+
+    assert sorted(results) == list(range(6))
+    assert isinstance(results[3][1], ValueError) and results[3][0] is None
+    assert all(results[n] == (n * 10, None) for n in (0, 1, 2, 4, 5))
+    assert waits == [0.0] * 6
+
+
+def test_fetch_concurrently_stops_early_without_running_everything():
+    calls = []
+    items = [{'link': "https://example.com/", 'n': i} for i in range(50)]
+    generator = fetch_concurrently(items, lambda item: calls.append(item['n']), workers=1, requests_per_second=0)
+    next(generator)
+    generator.close()  # 未着手の取得は取り消される
+    assert len(calls) < 50
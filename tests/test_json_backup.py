@@ -0,0 +1,106 @@
+# tests/test_json_backup.py
+# v1.0.0 (2026-10-17)
+# JsonBackupUploader: アップロードが確定した番組だけを on_uploaded で通知すること、保存形式の往復
+import gzip
+import json
+import threading
+
+import pytest
+
+from fake_supabase import FakeClient
+from json_backup import JsonBackupUploader
+
+
+class _Bucket:
+    def __init__(self, storage):
+        self.storage = storage
+
+    def upload(self, path, file, file_options=None):
+        if any(part in path for part in self.storage.failing):
+            raise RuntimeError("503 Service Unavailable")
+        with self.storage.lock:
+            self.storage.objects[path] = (file, dict(file_options or {}))
+
+
+class _Storage:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def from_(self, bucket):
+        return _Bucket(self)
+
+
+class _Client:
+    def __init__(self, failing=()):
+        self.storage = _Storage(failing)
+
+
+def _document(event_id, channel_code='NHK'):
+    return {
+        'event_id': event_id, 'broadcast_date': '2026-10-17', 'channel': 'NHK総合', 'channel_code': channel_code,
+        'program_title': f"番組{event_id}", 'performers': [],
+    }
+
+
+def _uploader(client, json_format, uploaded):
+    lock = threading.Lock()
+
+    def on_uploaded(documents):
+        with lock:
+            uploaded.extend(doc['event_id'] for doc in documents)
+    return JsonBackupUploader(client, json_format=json_format, workers=2, max_retries=1, on_uploaded=on_uploaded)
+
+
+@pytest.mark.parametrize('json_format', ['pretty', 'compact'])
+def test_on_uploaded_receives_only_successful_documents(json_format):
+    client = _Client(failing={'_2.json'})
+    uploaded = []
+    uploader = _uploader(client, json_format, uploaded)
+    for event_id in ('1', '2', '3'):
+        assert uploader.submit(f"2026-10-17/NHK/2026-10-17_{event_id}.json", _document(event_id))
+    assert not uploader.submit('2026-10-17/NHK/invalid.json', {'event_id': '4'})
+    stats = uploader.close()
+
+    assert sorted(uploaded) == ['1', '3']
+    assert (stats['success'], stats['failed'], stats['invalid']) == (2, 1, 1)
+
+
+def test_on_uploaded_receives_bundle_documents_after_upload():
+    client = _Client(failing={'/BS-1/'})
+    uploaded = []
+    uploader = _uploader(client, 'bundle', uploaded)
+    for event_id, channel_code in (('1', 'NHK'), ('2', 'NHK'), ('3', 'BS-1')):
+        uploader.submit('', _document(event_id, channel_code))
+    assert uploaded == []  # 日付の区切り（flush_bundles）まではアップロードしない
+    uploader.close()
+
+    assert sorted(uploaded) == ['1', '2']
+
+
+def test_bundle_round_trips_as_gzip_file(fake_db):
+    uploader = JsonBackupUploader(FakeClient(fake_db), json_format='bundle', workers=1)
+    documents = [_document('1'), _document('2')]
+    for doc in documents:
+        uploader.submit('', doc)
+    uploader.close()
+
+    [(bucket, path)] = fake_db.objects
+    assert bucket == 'json-backups' and path.endswith('.ndjson.gz')
+    # content-encoding を付けないので、保存されたバイト列は gzip のまま（取得側が自分で展開する）
+    assert fake_db.object_options[(bucket, path)] == {'content-type': 'application/gzip', 'upsert': 'true'}
+    body = fake_db.objects[(bucket, path)]
+    assert body[:2] == b'\x1f\x8b'
+    lines = gzip.decompress(body).decode('utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == documents
+
+
+def test_document_is_stored_as_plain_json(fake_db):
+    uploader = JsonBackupUploader(FakeClient(fake_db), json_format='compact', workers=1)
+    uploader.submit('2026-10-17/NHK/1.json', _document('1'))
+    uploader.close()
+
+    key = ('json-backups', '2026-10-17/NHK/1.json')
+    assert 'content-encoding' not in fake_db.object_options[key]
+    assert json.loads(fake_db.objects[key].decode('utf-8')) == _document('1')
@@ -0,0 +1,78 @@
+# tests/test_politician_hits.py
+# v1.0.0 (2026-10-17)
+# politician_matcher.PoliticianHits: 全件照合（名簿の置き換え）、差分更新、未照合時の差分更新の拒否、従来 RPC
+import pytest
+
+from fake_supabase import FakeApiError, FakeClient
+from politician_matcher import PoliticianHits, PoliticianMatcher
+
+GAZETTEER = [
+    {'name': '石破茂', 'reading': 'いしばしげる', 'party': '自民', 'chamber': '衆', 'district': '鳥取1'},
+    {'name': '鬼木誠', 'reading': 'おにきまこと', 'party': '自民', 'chamber': '衆', 'district': '福岡2'},
+    {'name': '鬼木誠', 'reading': 'おにきまこと', 'party': '立憲', 'chamber': '参', 'district': '比例'},
+    {'name': '野田佳彦', 'reading': 'のだよしひこ', 'party': '立憲', 'chamber': '衆', 'district': '千葉14'},
+]
+
+
+def _program(event_id, title, description=''):
+    return {'event_id': event_id, 'program_title': title, 'description': description, 'description_detail': None}
+
+
+def _hits(fake_db, mode):
+    return PoliticianHits(FakeClient(fake_db), matcher=PoliticianMatcher(GAZETTEER), mode=mode,
+                          gazetteer=GAZETTEER, chunk_size=2)
+
+
+def _tv_hits(fake_db):
+    return {row['politician_name']: row['tv_hits'] for row in fake_db.tables.get('politician_tv_hits', [])}
+
+
+@pytest.fixture
+def reconciled(fake_db):
+    fake_db.seed('programs', [
+        _program('1', '日曜討論', '石破茂首相と野田佳彦代表が国会を語る'),
+        _program('2', 'ニュース', '石破茂氏が選挙について'),
+        _program('3', 'バラエティ', '石破茂さんのそっくりさん'),  # 政治文脈の語がない
+    ])
+    fake_db.seed('programs_archive', [_program('0', '過去の番組', '鬼木誠議員に聞く')])
+    assert _hits(fake_db, 'full').refresh() == 3
+    return fake_db
+
+
+def test_full_replaces_roster_and_counts_all_programs(reconciled):
+    assert _tv_hits(reconciled) == {'石破茂': 2, '野田佳彦': 1, '鬼木誠': 1}
+    roster = sorted((row['name'], row['chamber']) for row in reconciled.tables['politician_roster'])
+    assert roster == [('石破茂', '衆'), ('野田佳彦', '衆'), ('鬼木誠', '参'), ('鬼木誠', '衆')]
+
+
+def test_incremental_applies_only_changed_programs(reconciled):
+    programs = reconciled.tables['programs']
+    programs[0].update(description='野田佳彦代表が国会を語る')  # 石破茂が外れた
+    programs.append(_program('4', '国会中継', '石破茂総理が答弁'))
+    programs.append(_program('5', '特番', '鬼木誠大臣'))
+
+    assert _hits(reconciled, 'incremental').refresh(['1', '4', '5', '']) == 3
+    assert _tv_hits(reconciled) == {'石破茂': 2, '野田佳彦': 1, '鬼木誠': 2}
+    assert ('rpc', 'refresh_politician_hits') not in reconciled.calls
+
+
+def test_incremental_refuses_before_first_reconcile(fake_db):
+    fake_db.seed('politician_tv_hits', [{'politician_name': '石破茂', 'tv_hits': 1, 'reconciled_at': None}])
+    fake_db.seed('programs', [_program('1', 'ニュース', '石破茂首相')])
+
+    with pytest.raises(RuntimeError, match='未照合'):
+        _hits(fake_db, 'incremental').refresh(['1'])
+    assert ('rpc', 'apply_politician_hits') not in fake_db.calls
+
+
+def test_rpc_mode_and_fallback_when_tables_are_missing(fake_db, monkeypatch):
+    calls = []
+    fake_db.rpc_handlers['refresh_politician_hits'] = lambda db: calls.append('rpc') or [42]
+
+    assert _hits(fake_db, 'rpc').refresh() == 42
+
+    def missing_table(*args, **kwargs):
+        raise FakeApiError('relation "public.politician_tv_hits" does not exist', code='42P01')
+    monkeypatch.setattr(fake_db, 'execute', missing_table)
+    assert _hits(fake_db, 'incremental').refresh(['1']) == 42
+    assert calls == ['rpc', 'rpc']
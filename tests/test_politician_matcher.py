@@ -0,0 +1,113 @@
+# tests/test_politician_matcher.py
+# v1.0.0 (2026-10-17)
+# politician_matcher の AhoCorasick / PoliticianMatcher を素朴な部分文字列照合と突き合わせる
+import random
+from collections import Counter
+
+import pytest
+
+from politician_matcher import POLITICAL_CONTEXT, AhoCorasick, PoliticianMatcher
+
+
+def _naive_values(patterns, text):
+    """各パターンの出現位置（重なりを含む）を全て数える素朴な照合"""
+    found = Counter()
+    for pattern, value in patterns:
+        start = text.find(pattern)
+        while start != -1:
+            found[value] += 1
+            start = text.find(pattern, start + 1)
+    return found
+
+
+def _automaton(patterns):
+    automaton = AhoCorasick()
+    for pattern, value in patterns:
+        automaton.add(pattern, value)
+    return automaton.build()
+
+
+def test_overlapping_and_nested_patterns_match_naive():
+    patterns = [(p, p) for p in ('he', 'she', 'his', 'hers', 's', 'ers', 'aaa', 'aa')]
+    automaton = _automaton(patterns)
+    for text in ('ushers', 'shehishers', 'aaaaa', '', 'xyz'):
+        assert Counter(automaton.iter_values(text)) == _naive_values(patterns, text), text
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_patterns_match_naive(seed):
+    rng = random.Random(seed)
+    alphabet = 'あいうえ石破茂'
+    patterns = []
+    for i in range(rng.randint(1, 30)):
+        pattern = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 5)))
+        patterns.append((pattern, f"{i}:{pattern}"))  # 同じ文字列のパターンも別の値として数える
+    text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 200)))
+
+    assert Counter(_automaton(patterns).iter_values(text)) == _naive_values(patterns, text)
+
+
+def test_values_are_yielded_in_order_of_match_end():
+    automaton = _automaton([('石破', 'a'), ('石破茂', 'b'), ('茂', 'c'), ('国会', 'd')])
+    assert list(automaton.iter_values('国会で石破茂')) == ['d', 'a', 'b', 'c']
+
+
+GAZETTEER = [
+    {'name': '石破茂', 'reading': 'いしばしげる'},
+    {'name': '石破', 'reading': ''},  # 別の議員の氏名に含まれる名前
+    {'name': '岸田 文雄', 'reading': 'きしだふみお'},
+    {'name': '林芳正', 'reading': 'はやし'},  # 短い読みは照合に使わない
+    {'name': '小泉進次郎', 'reading': 'こいずみしんじろう'},
+]
+
+
+@pytest.fixture
+def matcher():
+    return PoliticianMatcher(GAZETTEER)
+
+
+def test_overlapping_names_are_all_reported(matcher):
+    assert matcher.match('国会で石破茂首相が答弁') == {'石破茂', '石破'}
+    assert matcher.match('石破氏が国会で') == {'石破'}
+
+
+def test_name_with_space_matches_without_space(matcher):
+    assert matcher.match('岸田文雄前首相が選挙応援') == {'岸田 文雄'}
+    assert matcher.match('岸田 文雄 元総理') == {'岸田 文雄'}
+
+
+def test_reading_matches_only_when_long_enough(matcher):
+    assert matcher.match('こいずみしんじろう大臣に聞く') == {'小泉進次郎'}
+    assert matcher.match('きしだふみお と選挙') == {'岸田 文雄'}
+    # 「はやし」（3文字）は一般語と衝突するので照合しない
+    assert matcher.match('はやしの中で国会中継') == set()
+    assert PoliticianMatcher(GAZETTEER, reading_min_length=3).match('はやしの中で国会中継') == {'林芳正'}
+
+
+def test_context_word_is_required(matcher):
+    assert matcher.match('石破茂さんのそっくりさんが登場') == set()
+    assert matcher.match('石破茂さんのそっくりさんが登場。内閣の話も') == {'石破茂', '石破'}
+    assert matcher.match('') == set()
+    assert matcher.match(None) == set()
+
+
+def test_match_program_joins_text_columns(matcher):
+    row = {'program_title': '日曜討論', 'description': '小泉進次郎', 'description_detail': '選挙の行方'}
+    assert matcher.match_program(row) == {'小泉進次郎'}
+    assert matcher.match_program({'program_title': '国会', 'description': None}) == set()
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_matcher_agrees_with_naive_substring_search(matcher, seed):
+    rng = random.Random(seed)
+    pieces = ['石破茂', '石破', '岸田文雄', 'こいずみしんじろう', 'はやし', '国会', '選挙', 'ニュース', '天気', 'の']
+    text = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+
+    names = set()
+    for politician in GAZETTEER:
+        name = politician['name']
+        reading = politician['reading']
+        if name in text or name.replace(' ', '') in text or (len(reading) >= 5 and reading in text):
+            names.add(name)
+    has_context = any(word in text for word in POLITICAL_CONTEXT)
+    assert matcher.match(text) == (names if has_context else set()), text
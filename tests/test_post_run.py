@@ -0,0 +1,97 @@
+# tests/test_post_run.py
+# v1.0.0 (2026-10-17)
+# post_run.TaskGraph: タイムアウト、requires による後続のスキップ、after による順序
+import threading
+import time
+
+import pytest
+
+from post_run import TaskGraph
+from run_metrics import RunMetrics
+
+
+def test_after_runs_once_dependencies_finish_even_if_they_fail():
+    order = []
+    graph = TaskGraph()
+    graph.add('first', lambda: order.append('first'))
+    graph.add('broken', lambda: 1 / 0)
+    graph.add('last', lambda: order.append('last'), after=['first', 'broken'])
+
+    results = graph.run()
+
+    assert order == ['first', 'last']
+    assert results['broken'].status == 'failed'
+    assert 'division' in results['broken'].error
+    assert results['last'].status == 'ok'
+
+
+def test_requires_skips_dependents_of_failed_step_transitively():
+    ran = []
+    graph = TaskGraph()
+    graph.add('archive', lambda: 1 / 0)
+    graph.add('counts', lambda: ran.append('counts'), requires=['archive'])
+    graph.add('report', lambda: ran.append('report'), requires=['counts'])
+    graph.add('notify', lambda: ran.append('notify'), after=['counts', 'report'])
+
+    results = graph.run()
+
+    assert ran == ['notify']
+    assert results['counts'].status == 'skipped'
+    assert 'archive' in results['counts'].error
+    assert results['report'].status == 'skipped'
+    assert graph.problems() == [('archive', '失敗'), ('counts', 'スキップ'), ('report', 'スキップ')]
+
+
+def test_timeout_does_not_block_and_skips_requirers():
+    release = threading.Event()
+    ran = []
+    graph = TaskGraph()
+    graph.add('archive', release.wait, timeout=0.05)
+    graph.add('counts', lambda: ran.append('counts'), requires=['archive'])
+    graph.add('notify', lambda: ran.append('notify'), after=['archive', 'counts'])
+
+    started = time.perf_counter()
+    results = graph.run()
+    elapsed = time.perf_counter() - started
+    release.set()
+
+    assert elapsed < 2
+    assert results['archive'].status == 'timeout'
+    assert results['counts'].status == 'skipped'
+    assert ran == ['notify']
+    assert graph.value('archive', 'default') == 'default'
+
+
+def test_independent_steps_run_in_parallel():
+    barrier = threading.Barrier(2, timeout=2)
+    graph = TaskGraph()
+    graph.add('root', lambda: None)
+    graph.add('a', barrier.wait, requires=['root'])
+    graph.add('b', barrier.wait, requires=['root'])
+
+    results = graph.run()
+
+    assert results['a'].status == results['b'].status == 'ok'
+
+
+def test_value_summary_and_metrics():
+    metrics = RunMetrics('test')
+    graph = TaskGraph(metrics=metrics)
+    graph.add('counts', lambda: {'番組詳細': 10})
+    graph.add('broken', lambda: 1 / 0)
+    graph.add('skipped', lambda: None, requires=['broken'])
+    graph.run()
+
+    assert graph.value('counts') == {'番組詳細': 10}
+    summary = graph.summary()
+    assert summary['counts']['status'] == 'ok'
+    assert summary['skipped'] == {'status': 'skipped', 'seconds': 0.0, 'error': 'broken が完了しなかったため'}
+    assert set(metrics.timings) == {'counts', 'broken'}
+    assert metrics.stage_errors['broken'] == 1
+    assert metrics.counters['post_run_failed'] == 1
+    assert metrics.counters['post_run_skipped'] == 1
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        TaskGraph().add('notify', lambda: None, after=['missing'])
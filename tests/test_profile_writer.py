@@ -0,0 +1,21 @@
+# tests/test_profile_writer.py
+# v1.0.0 (2026-10-17)
+# talent_profiles の一括保存: 項目の揃わない行もまとめて送り、取れなかった項目を NULL で上書きしない
+def test_rows_with_different_keys_are_batched_by_key_set(fake_db):
+    import talent_profile_scraper
+    scraper = talent_profile_scraper.TalentProfileScraperFixed()
+    fake_db.seed('talent_profiles', [{'talent_id': '2', 'full_name': '既存', 'birthplace': '東京都'}])
+    rows = [
+        {'talent_id': '1', 'full_name': 'A', 'birth_date': '1990-01-01'},
+        {'talent_id': '2', 'full_name': 'B'},
+        {'talent_id': '3', 'full_name': 'C', 'birth_date': '1985-05-05'},
+        {'talent_id': '4', 'full_name': 'D'},
+    ]
+
+    assert scraper._write_profiles(rows) == (4, 0)
+    # キー集合ごとに1回ずつ（1件ずつの再試行にはならない）
+    assert fake_db.calls[('talent_profiles', 'upsert')] == 2
+    stored = {row['talent_id']: row for row in fake_db.tables['talent_profiles']}
+    assert stored['2'] == {'talent_id': '2', 'full_name': 'B', 'birthplace': '東京都'}
+    assert stored['3']['birth_date'] == '1985-05-05'
+    assert scraper.stats['success'] == 4 and scraper.stats['failed'] == 0
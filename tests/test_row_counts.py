@@ -0,0 +1,63 @@
+# tests/test_row_counts.py
+# v1.0.0 (2026-10-17)
+# row_counts.RowCounter: counter は集計表を読むだけで照合を呼ばないこと、古い照合・未登録・未適用の扱い
+from datetime import datetime, timedelta, timezone
+
+from fake_supabase import FakeClient
+
+from row_counts import RowCounter
+from time_utils import parse_timestamp
+
+TABLES = ['programs', 'programs_archive', 'talents']
+
+
+def _seed_counts(fake_db, reconciled_at):
+    fake_db.seed('table_row_counts', [
+        {'table_name': name, 'row_count': count, 'reconciled_at': reconciled_at}
+        for name, count in (('programs', 120), ('programs_archive', 3400), ('talents', 56))
+    ])
+
+
+def test_counter_reads_table_without_reconciling(fake_db):
+    _seed_counts(fake_db, (datetime.now() - timedelta(days=1)).isoformat())
+    counter = RowCounter(FakeClient(fake_db))
+
+    assert counter.counts(TABLES) == {'programs': 120, 'programs_archive': 3400, 'talents': 56}
+    assert counter.approximate == set()
+    assert ('rpc', 'reconcile_table_row_counts') not in fake_db.calls
+    assert ('table_row_counts', 'select') in fake_db.calls
+
+
+def test_stale_counter_is_approximate(fake_db):
+    _seed_counts(fake_db, (datetime.now() - timedelta(days=30)).isoformat())
+    counter = RowCounter(FakeClient(fake_db), reconcile_days=8)
+
+    assert counter.counts(TABLES)['programs_archive'] == 3400
+    assert counter.approximate == set(TABLES)
+    assert ('rpc', 'reconcile_table_row_counts') not in fake_db.calls
+
+
+def test_table_missing_from_counter_is_counted(fake_db):
+    fake_db.seed('table_row_counts', [
+        {'table_name': 'programs', 'row_count': 120, 'reconciled_at': datetime.now().isoformat()},
+    ])
+    fake_db.seed('talents', [{'talent_id': str(i)} for i in range(5)])
+    counter = RowCounter(FakeClient(fake_db))
+
+    assert counter.counts(['programs', 'talents']) == {'programs': 120, 'talents': 5}
+
+
+def test_falls_back_to_estimated_without_counter_table(fake_db):
+    fake_db.seed('programs', [{'event_id': str(i)} for i in range(7)])
+    counter = RowCounter(FakeClient(fake_db), exact_below=100)
+
+    assert counter.counts(['programs']) == {'programs': 7}
+    assert counter.approximate == set()
+
+
+def test_parse_timestamp_variants():
+    assert parse_timestamp(None) is None
+    assert parse_timestamp('not a date') is None
+    assert parse_timestamp('2026-10-17 04:00:00.12345') == datetime(2026, 10, 17, 4, 0, 0, 123450)
+    expected = datetime(2026, 10, 17, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    assert parse_timestamp('2026-10-17T00:00:00Z') == expected
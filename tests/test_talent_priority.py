@@ -0,0 +1,25 @@
+# tests/test_talent_priority.py
+# v1.0.0 (2026-10-17)
+# 優先度付けの出演数: 前後 APPEARANCE_*_DAYS 日の番組への出演だけを数える（埋め込みリソースの条件）
+from datetime import datetime, timedelta
+
+
+def test_recent_appearances_count_only_programs_in_window(fake_db):
+    import talent_profile_scraper
+    from refresh_scheduler import APPEARANCE_FUTURE_DAYS, APPEARANCE_PAST_DAYS
+    today = datetime.now().date()
+    fake_db.seed('programs', [
+        {'event_id': 'old', 'broadcast_date': (today - timedelta(days=APPEARANCE_PAST_DAYS + 1)).isoformat()},
+        {'event_id': 'recent', 'broadcast_date': today.isoformat()},
+        {'event_id': 'soon', 'broadcast_date': (today + timedelta(days=APPEARANCE_FUTURE_DAYS)).isoformat()},
+        {'event_id': 'later', 'broadcast_date': (today + timedelta(days=APPEARANCE_FUTURE_DAYS + 1)).isoformat()},
+    ])
+    fake_db.seed('program_talent_appearances', [
+        {'id': i, 'program_event_id': event_id, 'talent_id': talent_id}
+        for i, (event_id, talent_id) in enumerate(
+            [('old', '1'), ('recent', '1'), ('soon', '1'), ('later', '2'), ('old', '3'), ('recent', '3')]
+        )
+    ])
+
+    counts = talent_profile_scraper.TalentProfileScraperFixed()._count_recent_appearances()
+    assert dict(counts) == {'1': 2, '3': 1}
@@ -0,0 +1,25 @@
+# tests/test_talent_targets.py
+# v1.0.0 (2026-10-17)
+# 処理対象の抽出: RPC pending_talents と従来方式（クライアント側除外）で offset の意味が同じこと
+import pytest
+
+
+@pytest.fixture
+def scraper(fake_db):
+    import talent_profile_scraper
+    fake_db.seed('talents', [
+        {'talent_id': f"{i:03d}", 'name': f"タレント{i}", 'link': f"https://www.bangumi.org/talents/{i:03d}"}
+        for i in range(1, 21)
+    ])
+    fake_db.seed('talent_profiles', [{'talent_id': f"{i:03d}"} for i in (1, 2, 3, 5, 8, 13)])
+    return talent_profile_scraper.TalentProfileScraperFixed()
+
+
+@pytest.mark.parametrize('offset, limit', [(0, 5), (3, 4), (10, 50), (20, 5)])
+def test_offset_counts_pending_talents_on_both_paths(scraper, fake_db, offset, limit):
+    via_rpc = [row['talent_id'] for row in scraper.get_talents_to_process(offset, limit)]
+    del fake_db.rpc_handlers['pending_talents']  # 未適用の環境（従来方式へフォールバック）
+    client_side = [row['talent_id'] for row in scraper.get_talents_to_process(offset, limit)]
+
+    pending = [f"{i:03d}" for i in range(1, 21) if i not in (1, 2, 3, 5, 8, 13)]
+    assert via_rpc == client_side == pending[offset:offset + limit]
@@ -0,0 +1,24 @@
+# time_utils.py
+# v1.0.0 (2026-10-17)
+# 追加: PostgREST が返す日時文字列の読み取り（refresh_scheduler / row_counts / politician_matcher で共用）
+import re
+from datetime import datetime
+
+
+_FRACTION = re.compile(r'\.(\d+)')
+
+
+def parse_timestamp(value):
+    """PostgREST が返す timestamp / timestamptz 文字列をローカル時刻の naive datetime にする"""
+    if not value:
+        return None
+    text = str(value).replace('Z', '+00:00').replace(' ', 'T', 1)
+    # Python 3.10 の fromisoformat は小数秒が 3 / 6 桁のときしか読めない
+    text = _FRACTION.sub(lambda m: '.' + m.group(1)[:6].ljust(6, '0'), text, count=1)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
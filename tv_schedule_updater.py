@@ -1,4 +1,23 @@
 # tv_schedule_updater.py
+# v1.2.0 (2026-10-17)
+# 追加: 番組詳細ページをスレッドプールで並列取得し、固定 sleep を全体レート制限に置き換え
+# 追加: 既存 EPG との内容ハッシュ差分で、変更のない番組の詳細取得をスキップ（--force-refresh で無効化）
+# 追加: requests.Session とディスク HTTP キャッシュ（条件付きリクエスト）経由で bangumi.org を取得
+# 追加: 共有 HTTP クライアント（keep-alive 接続プール、ジッタ付き指数バックオフ、Retry-After 対応）を使用
+# 追加: ページ解析を page_parser（lxml 優先・SoupStrainer で必要要素のみ構築）へ分離
+# 追加: 日付ごとの 取得→解析→検証→バッファ付き書き込み パイプラインに変更し、逐次 DB へ flush
+# 追加: チェックポイントジャーナルと --resume（完了済み番組のスキップ、未登録バッチの再投入）
+# 追加: find_channel_code を事前構築済みの ChannelResolver（完全一致辞書・部分文字列索引・LRU メモ）に置き換え
+# 追加: talents を番組ごとの upsert から、talent_id で重複除去したバッファの一括 upsert に変更
+# 追加: 詳細取得のレート制限を http_client.HostRateLimiter（ホスト別トークンバケット）に統一
+# 追加: JSON バックアップを JsonBackupUploader（専用ワーカー・キュー）へ移し、--json-format で compact / bundle を選択可能に
+# 追加: run_metrics による段階別の所要時間（p50/p95/max）・HTTP ステータス/リトライ/転送量の計測、JSON 実行レポートと Discord 要約
+# 追加: METRICS_PORT / METRICS_PUSHGATEWAY_URL 指定時に metrics_exporter で Prometheus 形式のメトリクスを公開
+# 追加: アーカイブを RPC archive_old_programs（DB 内の INSERT … SELECT ＋ DELETE … RETURNING）で行い、未適用なら従来方式へフォールバック
+# 追加: 既存番組の読み込みを db_reader のキーセットページング（OFFSET なし・次ページ先読み）に変更
+# 追加: 累積件数を毎回の COUNT(*) から集計表 table_row_counts（週1回照合）/ 推定件数に変更し、--count-mode で選択
+# 追加: 後処理を post_run.TaskGraph で実行（アーカイブ後に政治家登場数の更新と累積件数を並行、ステップごとのタイムアウト・スキップ記録）
+# 追加: 政治家登場数を今回登録・変更した番組だけ名簿と照合して差分更新（politician_matcher、--politician-mode）
 # v1.1.0 (2026-08-17)
 # 追加: 出演情報を INSERT ではなく upsert(on_conflict) で登録し、日次の重複 409 を解消
 # 追加: アーカイブをページングし、未退避レコードをまとめて消さないように修正
@@ -6,13 +25,25 @@
 import os
 import argparse
 import time
-import random
 import requests
 import json
+import hashlib
 import shutil
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
 from supabase import create_client, Client
+from http_cache import HttpCache
+from http_client import create_session, fetch_concurrently, mount_adapter, HTTP_POOL_MAXSIZE
+from page_parser import clean_text, parse_epg_page, parse_program_detail
+from db_writer import BufferedWriter, upsert_rows, upsert_rows_adaptive
+from db_reader import iter_rows
+from row_counts import RowCounter, COUNT_MODE, COUNT_MODES
+from post_run import TaskGraph
+from politician_matcher import PoliticianHits, POLITICIAN_HITS_MODE, POLITICIAN_HITS_MODES
+from checkpoint import CheckpointJournal
+from channel_resolver import CHANNEL_MAPPING, ChannelResolver
+from json_backup import JsonBackupUploader, JSON_FORMATS, JSON_UPLOAD_WORKERS
+from run_metrics import RunMetrics
+from metrics_exporter import start_metrics_exporter
 
 
 # 連携サービスの設定
@@ -38,117 +69,45 @@ TARGET_CHANNELS = [
 
 TARGET_DAYS = 2  # 取得日数
 ROTATION_DAYS = 120  # データの保持日数
-
-# 改良されたチャンネルマッピング（完全一致優先）
-CHANNEL_MAPPING = {
-    # 東京 地上波
-    "NHKG-TKY": ["NHK総合", "ＮＨＫ総合", "NHK総合 東京"],
-    "NHKE-TKY": ["NHKEテレ", "ＮＨＫＥテレ", "NHKEテレ 東京"], 
-    "NTV-TKY": ["日テレ", "日本テレビ"],
-    "TV-ASAHI-TKY": ["テレビ朝日", "テレ朝"],
-    "TBS-TKY": ["TBS", "ＴＢＳ"],
-    "TV-TOKYO-TKY": ["テレ東", "テレビ東京"],
-    "FUJI-TV-TKY": ["フジテレビ", "フジ"],
-    "TOKYO-MX": ["TOKYO MX", "ＴＯＫＹＯ　ＭＸ"],
-    
-    # 関東 広域
-    "TVS": ["テレ玉"],
-    "CTC": ["チバテレビ", "チバテレ"],
-    "TVK": ["tvk"],
-    
-    # BS無料
-    "NHK-BS": ["ＮＨＫ　ＢＳ", "NHK BS"],
-    "BS-NTV": ["BS日テレ", "ＢＳ日テレ"],
-    "BS-ASAHI": ["BS朝日", "ＢＳ朝日"],
-    "BS-TBS": ["BS-TBS", "ＢＳ－ＴＢＳ"],
-    "BS-TV-TOKYO": ["ＢＳテレ東", "BSテレ東"],
-    "BS-FUJI": ["BSフジ", "ＢＳフジ"],
-    "BS11": ["BS11", "ＢＳ１１"],
-    "BS12-TWELLV": ["BS12", "ＢＳ１２"],
-    "BS-YOSHIMOTO": ["ＢＳよしもと"],
-    "OUJ-TV-BS": ["放送大学"],
-    
-    # BS有料
-    "WOWOW-PRIME-BS": ["WOWOWプライム", "WOWOWプ"],
-    "WOWOW-LIVE-BS": ["WOWOWライブ"],
-    "WOWOW-CINEMA-BS": ["WOWOWシネマ"],
-    "WOWOW-PLUS-BS": ["WOWOWプラス"],
-    "STAR-CH-BS": ["スターｃｈ"],
-    "JSPORTS-1-BS": ["J SPORTS 1"],
-    "JSPORTS-2-BS": ["J SPORTS 2"],
-    "JSPORTS-3-BS": ["J SPORTS 3"],
-    "JSPORTS-4-BS": ["J SPORTS 4"],
-    "GREEN-CH-BS": ["グリーンチャンネル"],
-    "ANIMAX-BS": ["BSアニマックス"],
-    "TSURIVISION-BS": ["BS釣りビジョン"],
-    "DISNEY-CH-BS": ["ディズニーch"],
-    "NIHON-EIGA-BS": ["日本映画専門ch"],
-    
-    # その他
-    "JCOM-BS": ["J:COM"]
+ARCHIVE_CHUNK_SIZE = 5000  # RPC archive_old_programs の1回あたりの移動件数
+
+# 後処理ステップのタイムアウト（秒）。超えたステップは待たずに次へ進み、通知に記載する
+POST_RUN_TIMEOUTS = {
+    'archive': 900,
+    'politician_hits': 300,
+    'politician_hits_full': 3600,  # --politician-mode full（全番組の照合）
+    'cumulative_counts': 120,
+    'notify': 60,
 }
 
+# 番組詳細ページの並列取得設定（bangumi.org 全体への礼儀的なリクエスト上限）
+DETAIL_FETCH_WORKERS = 4  # 同時接続数
+DETAIL_REQUESTS_PER_SECOND = 1.0  # 全ワーカー合計の毎秒リクエスト数
+
+# 差分判定に使う programs_epg の列（これらが前回と同一なら詳細ページを再取得しない）
+EPG_HASH_FIELDS = ("program_title", "program_detail", "start_time", "end_time")
+
 def find_channel_code(channel_name):
     """
     チャンネル名から適切なチャンネルコードを特定
-    完全一致 → 部分一致 → 番号付きチャンネル対応の順で検索
+    完全一致 → 番号付きチャンネル対応 → 部分一致 → NFKC 正規化一致 の順で検索
+    （起動時に構築した索引とメモ化で、番組ごとの判定は定数時間）
     """
-    if not channel_name:
-        return None
-    
-    # チャンネル名のクリーニング
-    clean_name = channel_name.strip()
-    
-    # 1. 完全一致検索（最優先）
-    for code, name_list in CHANNEL_MAPPING.items():
-        for name in name_list:
-            if clean_name == name:
-                return code
-    
-    # 2. 番号付きチャンネル名の処理（例: "7 ＢＳテレ東"）
-    # 番号部分を除去してマッチング
-    import re
-    name_without_number = re.sub(r'^\d+\s*', '', clean_name)
-    if name_without_number != clean_name:
-        for code, name_list in CHANNEL_MAPPING.items():
-            for name in name_list:
-                if name_without_number == name:
-                    return code
-    
-    # 3. 部分一致検索（最も厳密に）
-    # BSチャンネルを優先的にチェック
-    bs_matches = []
-    terrestrial_matches = []
-    
-    for code, name_list in CHANNEL_MAPPING.items():
-        for name in name_list:
-            if name in clean_name or clean_name in name:
-                if code.startswith('BS-') or 'BS' in code:
-                    bs_matches.append((code, name))
-                else:
-                    terrestrial_matches.append((code, name))
-    
-    # BSチャンネル名にBSが含まれている場合、BSマッチを優先
-    if 'BS' in clean_name or 'ＢＳ' in clean_name:
-        if bs_matches:
-            # 最も長いマッチを返す（より具体的なマッチ）
-            best_match = max(bs_matches, key=lambda x: len(x[1]))
-            return best_match[0]
-    
-    # 地上波の場合
-    if terrestrial_matches:
-        best_match = max(terrestrial_matches, key=lambda x: len(x[1]))
-        return best_match[0]
-    
-    # BSマッチがある場合はそれを返す
-    if bs_matches:
-        best_match = max(bs_matches, key=lambda x: len(x[1]))
-        return best_match[0]
-    
-    return None
+    return channel_resolver.resolve(channel_name)
+
+# チャンネル名 → コードの解決器（起動時に一度だけ構築）
+channel_resolver = ChannelResolver(CHANNEL_MAPPING)
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# bangumi.org 取得用の共有セッションとレスポンスキャッシュ
+http_session = create_session(HEADERS)
+http_cache = HttpCache()
+
+# 実行計測（段階ごとの所要時間・HTTP カウンタ。終了時に run_reports/ へ JSON で出力）
+run_metrics = RunMetrics("tv_schedule")
+run_metrics.instrument_session(http_session)
+
 def send_discord_notification(message):
     if not DISCORD_WEBHOOK_URL:
         print("⚠️ Discord Webhook URLが設定されていません。")
@@ -251,171 +210,335 @@ def safe_upsert_appearances(appearances_data, table_name, batch_size=500):
 
     return success_count, error_count
 
-def validate_json_data(data):
-    """JSONデータの妥当性を検証"""
-    try:
-        # 必須フィールドの存在確認
-        required_fields = ['event_id', 'broadcast_date', 'channel', 'program_title']
-        for field in required_fields:
-            if field not in data or data[field] is None or data[field] == "":
-                return False, f"必須フィールド '{field}' が不正です"
-        
-        # データ型の確認
-        if not isinstance(data.get('performers', []), list):
-            return False, "performersフィールドがリスト型ではありません"
-        
-        # JSON文字列として正しくシリアライズできるかテスト
-        json_test = json.dumps(data, ensure_ascii=False)
-        json.loads(json_test)  # デシリアライズテスト
-        
-        return True, "OK"
-    except Exception as e:
-        return False, f"JSON検証エラー: {e}"
+def fetch_program_details(programs, workers=DETAIL_FETCH_WORKERS, requests_per_second=DETAIL_REQUESTS_PER_SECOND):
+    """番組詳細ページを並列取得し、完了した順に (program, response, error) を返すジェネレータ。
 
-def safe_json_upload(storage_path, data_dict, max_retries=3):
-    """安全なJSONファイルアップロード（データ検証付き）"""
-    
-    # 1. データ妥当性検証
-    is_valid, validation_msg = validate_json_data(data_dict)
-    if not is_valid:
-        print(f"❌ JSON検証失敗 ({storage_path}): {validation_msg}")
-        return False
-    
-    # 2. JSON文字列生成
-    try:
-        json_string = json.dumps(data_dict, ensure_ascii=False, indent=2)
-        if len(json_string) < 50:  # 最小サイズチェック
-            print(f"❌ JSONデータが小さすぎます ({storage_path}): {len(json_string)}文字")
-            return False
-    except Exception as e:
-        print(f"❌ JSON生成エラー ({storage_path}): {e}")
-        return False
-    
-    # 3. アップロード試行（リトライ付き）
-    for attempt in range(max_retries):
-        try:
-            supabase.storage.from_('json-backups').upload(
-                path=storage_path,
-                file=json_string.encode('utf-8'),
-                file_options={
-                    "content-type": "application/json;charset=utf-8", 
-                    "upsert": "true"
-                }
-            )
-            return True
-        except Exception as e:
-            print(f"⚠️ JSON保存試行 {attempt + 1}/{max_retries} 失敗 ({storage_path}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # 指数バックオフ
-    
-    return False
+    同時接続数は workers で、送信ペースは requests_per_second で全体として制限する。
+    パースや DB 登録は呼び出し側（メインスレッド）で行う。
+    """
+    def _fetch(program):
+        print(f"詳細取得中: {program['program_title']}")
+        with run_metrics.stage('detail_fetch'):
+            res = http_cache.get(http_session, program['link'], timeout=20)
+            res.raise_for_status()
+        return res
+
+    return fetch_concurrently(
+        programs, _fetch, workers, requests_per_second,
+        on_wait=lambda waited: run_metrics.observe('detail_rate_wait', waited),
+    )
+
+def epg_content_hash(row):
+    """EPG行の内容ハッシュ（タイトル・概要・開始/終了時刻）"""
+    payload = json.dumps(
+        [clean_text(row.get(field)) for field in EPG_HASH_FIELDS],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def _fetch_rows_in_date_window(table_name, columns, date_from, date_to):
+    """broadcast_date が期間内の行を event_id のキーセットで全件取得する（次ページは先読み）"""
+    return list(iter_rows(
+        supabase, table_name, columns, "event_id",
+        filters=lambda query: query.gte("broadcast_date", date_from).lte("broadcast_date", date_to),
+        prefetch=True,
+    ))
 
-def clean_text(text):
-    """テキストのクリーニング（Noneや空文字の処理）"""
-    if text is None:
-        return ""
-    return str(text).strip()
+def load_existing_program_state(date_from, date_to):
+    """期間内の既存 EPG の内容ハッシュと、詳細登録済みの event_id を一括取得する。
 
-def safe_extract_talent_info(link_element):
-    """安全なタレント情報抽出"""
+    取得に失敗した場合は空を返し、全件を取得対象とする（安全側）。
+    """
     try:
-        name = clean_text(link_element.get_text(strip=True))
-        href = link_element.get("href", "")
-        
-        # 基本的な妥当性チェック
-        if not name or not href:
-            return None
-        
-        if href.rstrip("/").endswith("talents"):
-            return None
-            
-        # talent_idの抽出と検証
-        talent_id = href.rstrip("/").split("/")[-1].split("?")[0]
-        if not talent_id.isdigit():
-            return None
-            
-        full_link = "https://bangumi.org" + href if href.startswith("/") else href
-        
-        return {
-            "talent_id": talent_id,
-            "name": name,
-            "link": full_link
-        }
+        with run_metrics.stage('diff_load'):
+            epg_rows = _fetch_rows_in_date_window(
+                'programs_epg', "event_id," + ",".join(EPG_HASH_FIELDS), date_from, date_to
+            )
+            detail_rows = _fetch_rows_in_date_window('programs', "event_id", date_from, date_to)
     except Exception as e:
-        print(f"⚠️ タレント情報抽出エラー: {e}")
-        return None
-
-def archive_old_db_records(page_size=500):
-    """古いレコードをアーカイブへ退避する。
+        print(f"⚠️ 既存番組の差分情報を取得できませんでした（全件取得します）: {e}")
+        return {}, set()
+
+    epg_hashes = {str(row['event_id']): epg_content_hash(row) for row in epg_rows if row.get('event_id')}
+    detail_ids = {str(row['event_id']) for row in detail_rows if row.get('event_id')}
+    print(f"🔎 既存データ: EPG {len(epg_hashes)}件, 詳細 {len(detail_ids)}件（{date_from} ～ {date_to}）")
+    return epg_hashes, detail_ids
+
+def select_changed_programs(programs, epg_hashes, detail_ids):
+    """新規または内容が変わった番組だけを返す（詳細登録済みかつハッシュ一致はスキップ）"""
+    changed = []
+    for program in programs:
+        event_id = program['event_id']
+        if event_id in detail_ids and epg_hashes.get(event_id) == epg_content_hash(program):
+            continue
+        changed.append(program)
+    return changed
+
+def _archive_in_database(table_name, cutoff_date_str, chunk_size):
+    """RPC archive_old_programs（sql/archive_old_programs.sql）で chunk_size 件ずつ DB 内で退避する"""
+    archived = 0
+    chunk_no = 0
+    while True:
+        chunk_no += 1
+        started = time.perf_counter()
+        resp = supabase.rpc('archive_old_programs', {
+            'p_table': table_name,
+            'p_cutoff': cutoff_date_str,
+            'p_chunk_size': chunk_size,
+        }).execute()
+        elapsed = time.perf_counter() - started
+        data = resp.data
+        if isinstance(data, list):
+            data = data[0] if data else 0
+        moved = int(data or 0)
+        archived += moved
+        run_metrics.observe('archive_chunk', elapsed)
+        print(f"  -> {table_name} チャンク {chunk_no}: {moved}件を退避（{elapsed * 1000:.0f}ms, DB 内で移動）")
+        if moved < chunk_size:
+            return archived
+
+
+def _archive_client_side(table_name, cutoff_date_str, page_size):
+    """行を取得して *_archive へ upsert し、取得した event_id だけを削除する（RPC 未適用時）。
 
     PostgREST の既定上限（1000件）で取りこぼした行を date 条件の一括 DELETE
     で消さないよう、取得した event_id だけをページ単位で削除する。
     """
+    archived = 0
+    chunk_no = 0
+    while True:
+        chunk_no += 1
+        started = time.perf_counter()
+        response = (
+            supabase.table(table_name)
+            .select("*")
+            .lt("broadcast_date", cutoff_date_str)
+            .limit(page_size)
+            .execute()
+        )
+        rows = response.data or []
+        if not rows:
+            break
+        try:
+            supabase.table(f"{table_name}_archive").upsert(
+                rows, on_conflict="event_id"
+            ).execute()
+            event_ids = [row["event_id"] for row in rows if row.get("event_id")]
+            if event_ids:
+                supabase.table(table_name).delete().in_("event_id", event_ids).execute()
+            archived += len(rows)
+        except Exception as archive_error:
+            print(f"⚠️ {table_name}のアーカイブをスキップ: {archive_error}")
+            break
+        elapsed = time.perf_counter() - started
+        run_metrics.observe('archive_chunk', elapsed)
+        print(f"  -> {table_name} チャンク {chunk_no}: {len(rows)}件を退避（{elapsed * 1000:.0f}ms, クライアント経由）")
+        if len(rows) < page_size:
+            break
+    return archived
+
+
+def archive_old_db_records(page_size=500, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """古いレコードをアーカイブへ退避する。
+
+    RPC archive_old_programs があればデータベース内で chunk_size 件ずつ移動し、
+    行データを転送しない。未適用・失敗時は従来のクライアント経由（page_size 件ずつ）で行う。
+    """
     print("\n--- 古いデータベースレコードのアーカイブ開始 ---")
     cutoff_date_str = (datetime.now() - timedelta(days=ROTATION_DAYS)).strftime('%Y-%m-%d')
     print(f"{cutoff_date_str} より前のデータをアーカイブします。")
+    use_rpc = True
     try:
         for table_name in ["programs_epg", "programs"]:
-            archived = 0
-            while True:
-                response = (
-                    supabase.table(table_name)
-                    .select("*")
-                    .lt("broadcast_date", cutoff_date_str)
-                    .limit(page_size)
-                    .execute()
-                )
-                rows = response.data or []
-                if not rows:
-                    break
+            started = time.perf_counter()
+            archived = None
+            if use_rpc:
                 try:
-                    supabase.table(f"{table_name}_archive").upsert(
-                        rows, on_conflict="event_id"
-                    ).execute()
-                    event_ids = [row["event_id"] for row in rows if row.get("event_id")]
-                    if event_ids:
-                        supabase.table(table_name).delete().in_("event_id", event_ids).execute()
-                    archived += len(rows)
-                except Exception as archive_error:
-                    print(f"⚠️ {table_name}のアーカイブをスキップ: {archive_error}")
-                    break
-                if len(rows) < page_size:
-                    break
-            print(f" -> {table_name}: {archived}件をアーカイブしました")
+                    archived = _archive_in_database(table_name, cutoff_date_str, chunk_size)
+                except Exception as e:
+                    print(f"⚠️ RPC archive_old_programs が使えないため、クライアント経由で退避します: {e}")
+                    use_rpc = False
+            if archived is None:
+                archived = _archive_client_side(table_name, cutoff_date_str, page_size)
+            run_metrics.count('archived', archived)
+            print(f" -> {table_name}: {archived}件をアーカイブしました（{time.perf_counter() - started:.1f}秒）")
         print("✅ 古いDBレコードのアーカイブ完了。")
     except Exception as e:
         print(f"❌ DBレコードのアーカイブ中にエラー: {e}")
 
 
-def _count_table(table_name):
-    """指定テーブルの総レコード数を取得（失敗時はNoneを返す）"""
-    try:
-        # head=Trueで行データを転送せずカウントのみ取得
-        response = supabase.table(table_name).select("*", count="exact", head=True).execute()
-        return response.count or 0
-    except Exception as e:
-        print(f"⚠️ {table_name}の件数取得をスキップ: {e}")
-        return None
+# 累積件数の表示名 → 合算するテーブル（古いレコードは *_archive へ退避されるため稼働分と合算する）
+CUMULATIVE_TABLES = {
+    "番組概要": ("programs_epg", "programs_epg_archive"),
+    "番組詳細": ("programs", "programs_archive"),
+    "タレント": ("talents",),
+}
 
 
-def get_cumulative_counts():
+def get_cumulative_counts(count_mode=COUNT_MODE):
     """DB全体の累積件数を取得する。
-    古いレコードは *_archive テーブルへ退避されるため、
-    稼働テーブルとアーカイブテーブルの合算を累積値とする。
+
+    件数は row_counts.RowCounter で取得する（既定は集計表 table_row_counts、未適用なら推定件数）。
+    戻り値は (表示名 → 件数, 推定値を含む表示名の集合)。
     """
-    def _total(*table_names):
-        counts = [_count_table(name) for name in table_names]
-        valid = [c for c in counts if c is not None]
+    counter = RowCounter(supabase, mode=count_mode)
+    table_names = [name for names in CUMULATIVE_TABLES.values() for name in names]
+    counts = counter.counts(table_names)
+
+    totals = {}
+    approximate = set()
+    for label, names in CUMULATIVE_TABLES.items():
+        valid = [counts[name] for name in names if counts.get(name) is not None]
         # 全て取得失敗ならNone（通知側で非表示にする）
-        return sum(valid) if valid else None
+        totals[label] = sum(valid) if valid else None
+        if counter.approximate.intersection(names):
+            approximate.add(label)
+    return totals, approximate
+
+def iter_epg_pages(target_date):
+    """[取得] 指定日の EPG 一覧ページ（地上波・BS）を取得し、(date_str_db, html) を順に返す"""
+    date_str_url = target_date.strftime("%Y%m%d")
+    date_str_db = target_date.strftime("%Y-%m-%d")
+    for ch_type in ["td", "bs"]:
+        url = f"https://bangumi.org/epg/{ch_type}?broad_cast_date={date_str_url}"
+        if ch_type == "td":
+            url += "&ggm_group_id=42"
 
-    return {
-        "番組概要": _total("programs_epg", "programs_epg_archive"),
-        "番組詳細": _total("programs", "programs_archive"),
-        "タレント": _total("talents"),
-    }
+        print(f"アクセス中: {url}")
+        try:
+            with run_metrics.stage('epg_fetch'):
+                res = http_cache.get(http_session, url, timeout=20)
+                res.raise_for_status()
+        except Exception as e:
+            print(f"  -> EPGページ取得エラー: {e}")
+            continue
+        yield date_str_db, res.text
+
+def iter_epg_rows(pages, processed_event_ids, run_stats):
+    """[解析] EPG 一覧ページを programs_epg の行に変換する（実行内で重複する event_id は除外）"""
+    for date_str_db, html in pages:
+        try:
+            with run_metrics.stage('epg_parse'):
+                channel_names, page_programs = parse_epg_page(html)
+        except Exception as e:
+            print(f"  -> EPGページ解析エラー: {e}")
+            continue
+
+        for page_program in page_programs:
+            event_id = page_program["event_id"]
+            if event_id in processed_event_ids:
+                continue
+
+            i = page_program["channel_index"]
+            channel_name = channel_names[i] if i < len(channel_names) else "不明"
+            # 改良されたチャンネルコード特定
+            channel_code = find_channel_code(channel_name)
+
+            # BSチャンネルのマッピング状況をログ出力
+            if ('BS' in channel_name or 'ＢＳ' in channel_name) and channel_code in TARGET_CHANNELS:
+                run_stats['bs_channel_count'] += 1
+                if run_stats['bs_channel_count'] <= 5:  # 最初の5件のみ出力
+                    print(f"  🔍 BSチャンネル検出: '{channel_name}' → '{channel_code}'")
+
+            processed_event_ids.add(event_id)
+            yield {
+                "event_id": event_id,
+                "broadcast_date": date_str_db,
+                "channel": channel_name,
+                "start_time": page_program["start_time"],
+                "end_time": page_program["end_time"],
+                "program_title": page_program["program_title"],
+                "program_detail": page_program["program_detail"],
+                "link": "https://bangumi.org" + page_program["href"],
+                "region": "東京",
+                "channel_code": channel_code
+            }
+
+def iter_valid_rows(rows, required_fields, label):
+    """[検証] 必須項目が欠けた行を除外する"""
+    for row in rows:
+        missing = [field for field in required_fields if not row.get(field)]
+        if missing:
+            print(f"  -> {label}検証エラー（{row.get('event_id')}）: 必須項目 {missing} が空です")
+            continue
+        yield row
 
-def main(start_date=None, end_date=None):
+def build_program_records(program, html, talents_seen):
+    """[解析] 番組詳細ページから programs 行・新規タレント・出演情報を組み立てる"""
+    detail = parse_program_detail(html)
+    title = clean_text(program['program_title'])
+
+    # タレント情報の処理
+    talents_to_upsert = []
+    program_appearances = []
+
+    for name, link in detail["performer_links"].items():
+        try:
+            talent_id = link.rstrip("/").split("/")[-1].split("?")[0]
+            if talent_id.isdigit():
+                # タレント情報の重複チェック
+                if talent_id not in talents_seen:
+                    talents_to_upsert.append({
+                        "talent_id": talent_id,
+                        "name": name,
+                        "link": link
+                    })
+                    talents_seen[talent_id] = name
+
+                # 出演情報
+                program_appearances.append({
+                    "program_event_id": program['event_id'],
+                    "talent_id": talent_id
+                })
+        except Exception as e:
+            print(f"⚠️ タレント処理エラー ({name}): {e}")
+            continue
+
+    # 番組詳細データの構築
+    db_data = {
+        "event_id": program['event_id'],
+        "broadcast_date": program['broadcast_date'],
+        "channel": program['channel'],
+        "start_time": program['start_time'],
+        "end_time": program['end_time'],
+        "master_title": title.split("　")[0] if "　" in title and title else title,
+        "program_title": title,
+        "description": detail["description"],
+        "description_detail": detail["description_detail"],
+        "genre": detail["genre"],
+        "official_website": detail["official_website"],
+        "channel_code": program['channel_code']
+    }
+    return db_data, talents_to_upsert, program_appearances
+
+def backup_program_json(uploader, db_data, performers):
+    """番組詳細の JSON バックアップをアップロードキューへ積み、受け付けたかを返す"""
+    date_str = db_data['broadcast_date']
+    start_hhmm = db_data['start_time'][8:12] if len(db_data['start_time']) >= 12 else "0000"
+    file_name = f"{date_str}-{start_hhmm}_{db_data['channel_code']}_{db_data['event_id']}.json"
+    storage_path = f"{date_str}/{db_data['channel_code']}/{file_name}"
+
+    # JSON用データ（必要なフィールドのみ含む、安全なコピー作成）
+    json_data = {
+        **db_data,
+        "performers": performers if performers else [],
+        "performer_count": len(performers),
+        "created_at": datetime.now().isoformat()
+    }
+    return uploader.submit(storage_path, json_data)
+
+def main(start_date=None, end_date=None, workers=DETAIL_FETCH_WORKERS, requests_per_second=DETAIL_REQUESTS_PER_SECOND,
+         force_refresh=False, resume=False, json_format='pretty', json_workers=JSON_UPLOAD_WORKERS,
+         ingested_event_ids=None):
+    """取得 → 解析 → 検証 → バッファ付き書き込み を日付ごとに流すパイプライン。
+
+    各ライタは件数・経過時間のしきい値で逐次 flush するため、取得期間が長くても
+    メモリ使用量は1日分程度に収まり、途中で失敗しても処理済みの分は DB に残る。
+    resume=True なら同じ実行条件のチェックポイントから、完了済み番組を飛ばして再開する。
+    JSON バックアップは json_workers 本のワーカーが裏でアップロードし、取得を待たせない。
+    ingested_event_ids（set）を渡すと、今回 programs への書き込みが成功した event_id を追加する
+    （登録に失敗したバッチの番組は含めない。再開時に再投入して登録できた前回分は含める）。
+    """
     print("🚀 【本格運用】番組表スクリプトを開始します。")
     print(f"📋 取得対象: 地上波7局 + BS7局 = 計{len(TARGET_CHANNELS)}局")
 
@@ -434,251 +557,193 @@ def main(start_date=None, end_date=None):
     if not appearances_table_name:
         print("⚠️ 出演情報テーブルが見つからないため、出演情報の登録は行いません。")
 
-    # --- 1. EPG基本情報の取得 ---
-    epg_data_to_upsert = []
-    processed_event_ids = set()
+    print(f"⚙️ 詳細の並列取得: {workers}ワーカー, 上限 {requests_per_second}件/秒")
+    if workers > HTTP_POOL_MAXSIZE:
+        # ワーカー数に合わせて keep-alive 接続プールを広げる
+        mount_adapter(http_session, pool_maxsize=workers)
+    if force_refresh:
+        print("♻️ --force-refresh 指定のため、全番組の詳細を再取得します。")
+    print(f"⚙️ JSONバックアップ: {json_format}形式, {json_workers}ワーカー")
+
+    # --- チェックポイント（詳細の完了済み event_id と未登録の書き込み行を記録） ---
+    # 期間を指定しない定期実行は日付が毎日ずれるため、ジャーナル名に日付を含めない（翌日の --resume でも再開できる）
+    journal = CheckpointJournal(
+        f"tv_schedule_{start_date}_{end_date}" if start_date and end_date else "tv_schedule_default",
+        {"start_date": start_date if start_date and end_date else None,
+         "end_date": end_date if start_date and end_date else None,
+         "force_refresh": force_refresh},
+        resume=resume,
+    )
 
-    print("\n--- EPG基本情報の取得開始 ---")
-    bs_channel_count = 0
-    
-    for ch_type in ["td", "bs"]:
-        for target_date in target_dates:
-            date_str_url = target_date.strftime("%Y%m%d")
-            date_str_db = target_date.strftime("%Y-%m-%d")
-            url = f"https://bangumi.org/epg/{ch_type}?broad_cast_date={date_str_url}"
-            if ch_type == "td":
-                url += "&ggm_group_id=42"
+    def mark_backed_up(documents):
+        # 番組の完了はバックアップのアップロードが確定してから記録する（未確定のまま中断したら再開時に取り直す）
+        for doc in documents:
+            journal.mark_done('event', doc['event_id'])
 
-            print(f"アクセス中: {url}")
-            try:
-                res = requests.get(url, headers=HEADERS, timeout=20)
-                res.raise_for_status()
-                soup = BeautifulSoup(res.text, 'html.parser')
-                channel_tags = soup.find_all("li", class_="js_channel topmost")
-                channel_names = [tag.text.strip() for tag in channel_tags]
-                program_lines = soup.find_all("ul", id=lambda x: x and x.startswith("program_line_"))
-
-                for i, line in enumerate(program_lines):
-                    programs = line.find_all("li")
-                    for program_tag in programs:
-                        a_tag = program_tag.find("a", class_="title_link")
-                        if not a_tag:
-                            continue
-
-                        href = a_tag.get("href", "")
-                        event_id = href.split("/")[-1].split("?")[0]
-                        if not event_id or event_id in processed_event_ids:
-                            continue
-
-                        channel_name = channel_names[i] if i < len(channel_names) else "不明"
-                        # 改良されたチャンネルコード特定
-                        channel_code = find_channel_code(channel_name)
-
-                        # BSチャンネルのマッピング状況をログ出力
-                        if ('BS' in channel_name or 'ＢＳ' in channel_name) and channel_code in TARGET_CHANNELS:
-                            bs_channel_count += 1
-                            if bs_channel_count <= 5:  # 最初の5件のみ出力
-                                print(f"  🔍 BSチャンネル検出: '{channel_name}' → '{channel_code}'")
-
-                        # 番組タイトルと詳細の安全な取得
-                        title_elem = a_tag.find("p", class_="program_title")
-                        detail_elem = a_tag.find("p", class_="program_detail")
-                        
-                        program_title = clean_text(title_elem.text if title_elem else "")
-                        program_detail = clean_text(detail_elem.text if detail_elem else "")
-
-                        epg_data_to_upsert.append({
-                            "event_id": event_id,
-                            "broadcast_date": date_str_db,
-                            "channel": channel_name,
-                            "start_time": clean_text(program_tag.get("s", "")),
-                            "end_time": clean_text(program_tag.get("e", "")),
-                            "program_title": program_title,
-                            "program_detail": program_detail,
-                            "link": "https://bangumi.org" + href,
-                            "region": "東京",
-                            "channel_code": channel_code
-                        })
-                        processed_event_ids.add(event_id)
-            except Exception as e:
-                print(f"  -> EPGページ取得エラー: {e}")
-                continue
+    json_uploader = JsonBackupUploader(
+        supabase, json_format=json_format, workers=json_workers, metrics=run_metrics, on_uploaded=mark_backed_up,
+    )
 
-    if not epg_data_to_upsert:
-        raise Exception("EPG情報が一件も取得できませんでした。処理を中断します。")
+    # --- 書き込みライタ（出演情報は FK の親である programs / talents を先に flush する） ---
+    epg_writer = BufferedWriter(
+        "EPG",
+        run_metrics.timed_batch('epg_upsert', lambda rows: upsert_rows(supabase, 'programs_epg', rows, 'event_id', "EPGバッチ")),
+        max_rows=1000,
+    )
+    program_writer = BufferedWriter(
+        "詳細",
+        run_metrics.timed_batch('program_upsert', lambda rows: upsert_rows(supabase, 'programs', rows, 'event_id', "詳細バッチ")),
+        max_rows=500,
+        journal=journal, journal_key='programs',
+        on_written=(
+            (lambda rows: ingested_event_ids.update(row['event_id'] for row in rows))
+            if ingested_event_ids is not None else None
+        ),
+    )
+    talent_writer = BufferedWriter(
+        "タレント",
+        run_metrics.timed_batch(
+            'talent_upsert', lambda rows: upsert_rows_adaptive(supabase, 'talents', rows, 'talent_id', "タレントバッチ")
+        ),
+        max_rows=1000,
+        journal=journal, journal_key='talents',
+        key=lambda row: row['talent_id'],
+    )
+    appearance_writer = None
+    if appearances_table_name:
+        appearance_writer = BufferedWriter(
+            "出演",
+            run_metrics.timed_batch(
+                'appearances_upsert',
+                lambda rows: safe_upsert_appearances(rows, appearances_table_name, batch_size=len(rows)),
+            ),
+            max_rows=500,
+            depends_on=[program_writer, talent_writer],
+            journal=journal, journal_key=appearances_table_name,
+        )
 
-    print(f"\n✅ {len(epg_data_to_upsert)}件のユニークなEPG情報を取得。DBに登録します...")
-    
-    # EPGデータをバッチ処理で登録
-    batch_size = 1000
-    for i in range(0, len(epg_data_to_upsert), batch_size):
-        batch = epg_data_to_upsert[i:i + batch_size]
-        try:
-            supabase.table('programs_epg').upsert(batch, on_conflict='event_id').execute()
-            print(f"  -> EPGバッチ {i//batch_size + 1}: {len(batch)}件登録完了")
-        except Exception as e:
-            print(f"  -> EPGバッチ {i//batch_size + 1} 登録エラー: {e}")
+    # キュー長（メトリクス公開時の queue_depth）
+    writers = {'programs_epg': epg_writer, 'programs': program_writer, 'talents': talent_writer}
+    if appearance_writer:
+        writers[appearances_table_name] = appearance_writer
+    for table_name, writer in writers.items():
+        run_metrics.track_queue(f"writer:{table_name}", lambda writer=writer: len(writer.buffer))
+    run_metrics.track_queue("json_upload", json_uploader.pending)
+
+    if journal.resumed:
+        replayed = (
+            program_writer.replay() + talent_writer.replay()
+            + (appearance_writer.replay() if appearance_writer else 0)
+        )
+        if replayed:
+            print(f"♻️ 前回未登録だった {replayed}件を再投入します。")
+            program_writer.flush()
+            talent_writer.flush()
+            if appearance_writer:
+                appearance_writer.flush()
 
-    # --- 2. 番組詳細情報の取得 ---
-    print("\n--- 番組詳細情報の取得開始 ---")
-    program_details_to_upsert = []
-    appearances_to_upsert = []
+    processed_event_ids = set()
     talents_seen = {}
-    json_upload_success = 0
-    json_upload_errors = 0
-
-    # 取得対象の番組をフィルタリング
-    target_programs = [p for p in epg_data_to_upsert if p.get('channel_code') in TARGET_CHANNELS]
-    print(f"📺 詳細取得対象: {len(target_programs)}番組（全{len(epg_data_to_upsert)}番組中）")
+    channel_breakdown = {}
+    run_stats = {
+        'bs_channel_count': 0,
+        'epg': 0,
+        'details': 0,
+        'unchanged': 0,
+        'appearances': 0,
+    }
 
-    for program in target_programs:
-        if not program.get('link'):
-            continue
+    # 途中で例外になっても、キューに積んだバックアップはアップロードしきってから終える
+    # （ワーカーはデーモンスレッドなので、close しないと未送信分が消える）
+    try:
+        for target_date in target_dates:
+            date_str_db = target_date.strftime('%Y-%m-%d')
+            print(f"\n=== {date_str_db} ===")
 
-        print(f"詳細取得中: {program['program_title']}")
-        try:
-            res_detail = requests.get(program['link'], headers=HEADERS, timeout=20)
-            res_detail.raise_for_status()
-            soup_detail = BeautifulSoup(res_detail.text, 'html.parser')
-
-            title = clean_text(program['program_title'])
-            
-            # メタ情報の安全な取得
-            meta_desc = soup_detail.find("meta", {"name": "description"})
-            description = clean_text(meta_desc["content"] if meta_desc else "")
-            
-            letter_body = soup_detail.find("p", class_="letter_body")
-            description_detail = clean_text(letter_body.get_text(strip=True) if letter_body else "")
-            
-            genre_tag = soup_detail.find("p", class_="genre nomal")
-            genre = clean_text(genre_tag.get_text(strip=True).replace("\u3000", " ") if genre_tag else "")
-            
-            site_tag = soup_detail.select_one("ul.related_link a")
-            official_website = clean_text(site_tag.get("href") if site_tag else "")
-
-            # 出演者リンク抽出（堅牢化）
-            performer_links = {}
-            talent_links = soup_detail.select("a[href*='/talents/']")
-            
-            for link_elem in talent_links:
-                talent_info = safe_extract_talent_info(link_elem)
-                if talent_info:
-                    performer_links[talent_info["name"]] = talent_info["link"]
-
-            # タレント情報の処理
-            talents_to_upsert = []
-            current_program_appearances = []
-            
-            for name, link in performer_links.items():
-                try:
-                    talent_id = link.rstrip("/").split("/")[-1].split("?")[0]
-                    if talent_id.isdigit():
-                        # タレント情報の重複チェック
-                        if talent_id not in talents_seen:
-                            talents_to_upsert.append({
-                                "talent_id": talent_id,
-                                "name": name,
-                                "link": link
-                            })
-                            talents_seen[talent_id] = name
-                        
-                        # 出演情報
-                        current_program_appearances.append({
-                            "program_event_id": program['event_id'],
-                            "talent_id": talent_id
-                        })
-                except Exception as e:
-                    print(f"⚠️ タレント処理エラー ({name}): {e}")
+            # 差分判定用の既存データ（EPG の upsert で上書きされる前に読み込む）
+            if force_refresh:
+                existing_epg_hashes, existing_detail_ids = {}, set()
+            else:
+                existing_epg_hashes, existing_detail_ids = load_existing_program_state(date_str_db, date_str_db)
+
+            # --- 1. EPG基本情報: 取得 → 解析 → 検証 → 書き込み ---
+            print("--- EPG基本情報の取得 ---")
+            target_programs = []
+            epg_rows = iter_valid_rows(
+                iter_epg_rows(iter_epg_pages(target_date), processed_event_ids, run_stats),
+                ("event_id", "broadcast_date", "link"),
+                "EPG",
+            )
+            for row in epg_rows:
+                epg_writer.add(row)
+                run_stats['epg'] += 1
+                if row.get('channel_code') in TARGET_CHANNELS:
+                    target_programs.append(row)
+                    channel_breakdown[row['channel_code']] = channel_breakdown.get(row['channel_code'], 0) + 1
+            epg_writer.flush()
+
+            # --- 2. 番組詳細: 新規・変更分のみ取得 → 解析 → 書き込み ---
+            changed_programs = select_changed_programs(target_programs, existing_epg_hashes, existing_detail_ids)
+            run_stats['unchanged'] += len(target_programs) - len(changed_programs)
+            print(f"--- 番組詳細情報の取得: {len(changed_programs)}番組（対象局 {len(target_programs)}番組中, 変更なしスキップ {len(target_programs) - len(changed_programs)}件） ---")
+
+            fetchable_programs = [
+                p for p in changed_programs if p.get('link') and not journal.is_done('event', p['event_id'])
+            ]
+            if len(fetchable_programs) < len(changed_programs):
+                print(f"♻️ チェックポイント済み・リンクなしの {len(changed_programs) - len(fetchable_programs)}件をスキップ")
+            for program, res_detail, fetch_error in fetch_program_details(fetchable_programs, workers, requests_per_second):
+                if fetch_error is not None:
+                    print(f"❌ 番組詳細取得失敗: {program['program_title']} - {fetch_error}")
                     continue
 
-            # タレント情報のDB登録
-            if talents_to_upsert:
                 try:
-                    supabase.table('talents').upsert(talents_to_upsert, on_conflict='talent_id').execute()
+                    with run_metrics.stage('detail_parse'):
+                        db_data, talents_to_upsert, program_appearances = build_program_records(
+                            program, res_detail.text, talents_seen
+                        )
                 except Exception as e:
-                    print(f"⚠️ タレント登録エラー: {e}")
-
-            # 出演情報をまとめて追加
-            appearances_to_upsert.extend(current_program_appearances)
-
-            # 番組詳細データの構築
-            db_data = {
-                "event_id": program['event_id'],
-                "broadcast_date": program['broadcast_date'],
-                "channel": program['channel'],
-                "start_time": program['start_time'],
-                "end_time": program['end_time'],
-                "master_title": title.split("　")[0] if "　" in title and title else title,
-                "program_title": title,
-                "description": description,
-                "description_detail": description_detail,
-                "genre": genre,
-                "official_website": official_website,
-                "channel_code": program['channel_code']
-            }
-            program_details_to_upsert.append(db_data)
-
-            # JSONバックアップ作成（妥当性検証付き）
-            date_str = program['broadcast_date']
-            start_hhmm = program['start_time'][8:12] if len(program['start_time']) >= 12 else "0000"
-            file_name = f"{date_str}-{start_hhmm}_{program['channel_code']}_{program['event_id']}.json"
-            storage_path = f"{date_str}/{program['channel_code']}/{file_name}"
-            
-            # JSON用データ（必要なフィールドのみ含む、安全なコピー作成）
-            json_data = {
-                **db_data,
-                "performers": talents_to_upsert if talents_to_upsert else [],
-                "performer_count": len(talents_to_upsert),
-                "created_at": datetime.now().isoformat()
-            }
-
-            # JSON保存試行
-            if safe_json_upload(storage_path, json_data):
-                print(f"  -> JSON保存完了: {storage_path}")
-                json_upload_success += 1
-            else:
-                print(f"  -> JSON保存失敗: {storage_path}")
-                json_upload_errors += 1
-
-            time.sleep(random.uniform(1.5, 2.5))
-            
-        except Exception as e:
-            print(f"❌ 番組詳細取得失敗: {program['program_title']} - {e}")
-            continue
+                    print(f"❌ 番組詳細解析失敗: {program['program_title']} - {e}")
+                    continue
 
-    # --- 3. データベース一括登録 ---
-    if program_details_to_upsert:
-        print(f"\n✅ {len(program_details_to_upsert)}件の詳細情報をDB登録します...")
-        batch_size = 500
-        for i in range(0, len(program_details_to_upsert), batch_size):
-            batch = program_details_to_upsert[i:i + batch_size]
-            try:
-                supabase.table('programs').upsert(batch, on_conflict='event_id').execute()
-                print(f"  -> 詳細バッチ {i//batch_size + 1}: {len(batch)}件登録完了")
-            except Exception as e:
-                print(f"  -> 詳細バッチ {i//batch_size + 1} 登録エラー: {e}")
+                # タレント情報はバッファへ（出演情報の flush 前に必ず書き込まれる）
+                talent_writer.extend(talents_to_upsert)
+
+                for row in iter_valid_rows([db_data], ("event_id", "broadcast_date", "channel_code"), "詳細"):
+                    program_writer.add(row)
+                    run_stats['details'] += 1
+                if appearance_writer:
+                    appearance_writer.extend(program_appearances)
+                run_stats['appearances'] += len(program_appearances)
+
+                # JSONバックアップ（妥当性検証後、アップロードはワーカーに任せる）。完了の記録は on_uploaded で行い、
+                # 検証で弾かれた番組はアップロードするものがないのでここで完了にする
+                if not backup_program_json(json_uploader, db_data, talents_to_upsert):
+                    journal.mark_done('event', program['event_id'])
+
+            # 日付の区切りで書き込みを確定させる
+            program_writer.flush()
+            talent_writer.flush()
+            if appearance_writer:
+                appearance_writer.flush()
+            json_uploader.flush_bundles()
+    finally:
+        json_uploader.close()
+    if run_stats['epg'] == 0:
+        raise Exception("EPG情報が一件も取得できませんでした。処理を中断します。")
 
-    # --- 4. 出演情報登録 ---
-    if appearances_to_upsert and appearances_table_name:
-        success, errors = safe_upsert_appearances(appearances_to_upsert, appearances_table_name)
+    if appearance_writer:
+        success, errors = appearance_writer.close()
         print(f"✅ 出演情報登録結果: 成功 {success}件, 失敗 {errors}件")
-    elif not appearances_table_name:
-        print("⚠️ 出演情報テーブルが特定できないため、出演情報の登録をスキップします。")
     else:
-        print("📝 出演情報なし")
-
-    # 最終結果サマリー
-    channel_breakdown = {}
-    for program in target_programs:
-        code = program.get('channel_code')
-        if code:
-            channel_breakdown[code] = channel_breakdown.get(code, 0) + 1
+        print("⚠️ 出演情報テーブルが特定できないため、出演情報の登録をスキップします。")
 
     print(f"\n📊 【本格運用】最終結果サマリー:")
-    print(f"  • EPG取得: {len(epg_data_to_upsert)}件")
-    print(f"  • 詳細取得: {len(program_details_to_upsert)}件")
-    print(f"  • JSON保存: 成功 {json_upload_success}件, 失敗 {json_upload_errors}件")
-    print(f"  • 出演情報: {len(appearances_to_upsert)}件")
+    print(f"  • EPG取得: {run_stats['epg']}件（登録失敗 {epg_writer.errors}件）")
+    print(f"  • 詳細取得: {run_stats['details']}件（変更なしスキップ {run_stats['unchanged']}件, 登録失敗 {program_writer.errors}件）")
+    print(f"  • {json_uploader.summary()}")
+    print(f"  • 出演情報: {run_stats['appearances']}件")
+    print(f"  • タレント登録: {talent_writer.success}件（{talent_writer.batches}バッチ, 失敗 {talent_writer.errors}件）")
     print(f"  • 対象チャンネル: {len(TARGET_CHANNELS)}局")
     
     # チャンネル別内訳（地上波とBSを分けて表示）
@@ -693,81 +758,155 @@ def main(start_date=None, end_date=None):
         channel_type = "🏢" if not channel_code.startswith('BS-') and 'BS' not in channel_code else "📡"
         print(f"    {channel_type} {channel_code}: {count}件")
     
+    # 実行レポート用の件数
+    for key in ('epg', 'details', 'unchanged', 'appearances'):
+        run_metrics.count(key, run_stats[key])
+    run_metrics.count('talents', talent_writer.success)
+    run_metrics.count('write_errors', epg_writer.errors + program_writer.errors + talent_writer.errors)
+
+    channel_resolver.report_unresolved()
+    http_cache.prune()
+    print(f"  • {http_cache.summary()}")
+
+    # 正常終了したのでチェックポイントは不要
+    journal.finish()
+
     print("\n🎉 本格運用が正常に完了しました。")
     
-    return len(epg_data_to_upsert), len(program_details_to_upsert)
+    return run_stats['epg'], run_stats['details']
+
+
+def refresh_politician_hits(event_ids=(), mode=POLITICIAN_HITS_MODE):
+    """政治家名簿のテレビ登場数を更新し、登場のある議員数を返す（incremental: 今回登録・変更した番組のみ照合）"""
+    politician_tv = PoliticianHits(supabase, mode=mode).refresh(event_ids)
+    print(f"🏛️ 政治家テレビ登場を更新: {politician_tv}名")
+    return politician_tv
+
+
+def build_success_message(start_date, end_date, epg_count, detail_count, cumulative_counts, politician_tv,
+                          post_run_problems=()):
+    """成功通知メッセージ（日次運用版）。取得できなかった項目は表示しない"""
+    cumulative, approximate_labels = cumulative_counts
+    run_date = datetime.now().strftime('%Y-%m-%d')
+
+    # 累積データ欄を組み立て（取得できた項目のみ表示）
+    cumulative_lines = ""
+    cumulative_rows = [
+        f"  • {label} 累計: {'約' if label in approximate_labels else ''}{count:,}件"
+        for label, count in cumulative.items()
+        if count is not None
+    ]
+    if cumulative_rows:
+        cumulative_lines = (
+            f"**🗄️ 累積データ（DB全体）**:\n"
+            + "\n".join(cumulative_rows)
+            + "\n"
+        )
+
+    # 政治家テレビ登場の行（取得できたときのみ）
+    politician_line = (
+        f"**🏛️ 政治家テレビ登場**: {politician_tv}名（名簿711名中）\n"
+        if politician_tv is not None else ""
+    )
+
+    # 完了しなかった後処理の行
+    post_run_line = (
+        f"**⚠️ 後処理**: " + ", ".join(f"{name} {label}" for name, label in post_run_problems) + "\n"
+        if post_run_problems else ""
+    )
+
+    return (
+        f"✅ 番組表 日次更新が完了しました（{run_date}）。\n\n"
+        f"**📅 対象期間**: {start_date} ～ {end_date}\n"
+        f"**📊 今回の取得**:\n"
+        f"  • 番組概要: {epg_count:,}件\n"
+        f"  • 番組詳細: {detail_count:,}件\n"
+        f"**📺 対象チャンネル**: 地上波7局 + BS7局\n"
+        f"{cumulative_lines}"
+        f"{politician_line}"
+        f"{post_run_line}"
+        f"**🚀 ステータス**: 日次更新 正常終了\n"
+        f"{run_metrics.discord_summary()}"
+    )
 
         
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='TV番組表スクレイパー')
     parser.add_argument('--start-date', help='取得開始日 (YYYY-MM-DD)', default=None)
     parser.add_argument('--end-date', help='取得終了日 (YYYY-MM-DD)', default=None)
+    parser.add_argument('--workers', type=int, default=DETAIL_FETCH_WORKERS, help='番組詳細の同時取得数')
+    parser.add_argument('--requests-per-second', type=float, default=DETAIL_REQUESTS_PER_SECOND,
+                        help='bangumi.org への毎秒リクエスト上限（全ワーカー合計）')
+    parser.add_argument('--force-refresh', action='store_true',
+                        help='差分判定を無効化し、全番組の詳細を再取得する')
+    parser.add_argument('--resume', action='store_true',
+                        help='同じ実行条件のチェックポイントがあれば、完了済みの番組を飛ばして再開する')
+    parser.add_argument('--json-format', choices=JSON_FORMATS, default='pretty',
+                        help='JSONバックアップの形式（pretty: 番組ごとの整形JSON / compact: 空白なしJSON / bundle: 日付×局ごとの gzip NDJSON）')
+    parser.add_argument('--json-workers', type=int, default=JSON_UPLOAD_WORKERS, help='JSONバックアップの同時アップロード数')
+    parser.add_argument('--count-mode', choices=COUNT_MODES, default=COUNT_MODE,
+                        help='累積件数の取得方法（counter: 集計表 table_row_counts / estimated: 推定件数 / exact: COUNT(*)）')
+    parser.add_argument('--politician-mode', choices=POLITICIAN_HITS_MODES, default=POLITICIAN_HITS_MODE,
+                        help='政治家登場数の更新方法（incremental: 今回の番組のみ照合 / full: 全番組を照合（週1回） / rpc: 従来の refresh_politician_hits、既定）')
     args = parser.parse_args()
+    metrics_exporter = start_metrics_exporter(run_metrics)
 
     start_date = args.start_date or (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
     end_date = args.end_date or (datetime.now() + timedelta(days=TARGET_DAYS)).strftime('%Y-%m-%d')
 
     try:
-        epg_count, detail_count = main(start_date, end_date)
-        archive_old_db_records()
-
-        # 政治家名簿のテレビ登場数を再計算（氏名×政治文脈で番組表照合）
-        politician_tv = None
-        try:
-            resp = supabase.rpc('refresh_politician_hits').execute()
-            data = resp.data
-            # スカラー返り（テレビ登場のある議員数）を頑健に取り出す
-            if isinstance(data, list):
-                data = data[0] if data else None
-            politician_tv = int(data) if data is not None else None
-            print(f"🏛️ 政治家テレビ登場を更新: {politician_tv}名")
-        except Exception as e:
-            print(f"⚠️ 政治家登場数の更新をスキップ: {e}")
-
-        # 累積データ（DB全体の総件数）を取得
-        cumulative = get_cumulative_counts()
-        run_date = datetime.now().strftime('%Y-%m-%d')
-
-        # 累積データ欄を組み立て（取得できた項目のみ表示）
-        cumulative_lines = ""
-        cumulative_rows = [
-            f"  • {label} 累計: {count:,}件"
-            for label, count in cumulative.items()
-            if count is not None
-        ]
-        if cumulative_rows:
-            cumulative_lines = (
-                f"**🗄️ 累積データ（DB全体）**:\n"
-                + "\n".join(cumulative_rows)
-                + "\n"
-            )
+        ingested_event_ids = set()
+        # 期間の指定がなければ main の既定期間（昨日〜TARGET_DAYS日後）で実行し、チェックポイントを日付に依存させない
+        dates_given = bool(args.start_date or args.end_date)
+        epg_count, detail_count = main(
+            start_date if dates_given else None, end_date if dates_given else None, args.workers, args.requests_per_second, force_refresh=args.force_refresh,
+            resume=args.resume, json_format=args.json_format, json_workers=args.json_workers,
+            ingested_event_ids=ingested_event_ids,
+        )
 
-        # 政治家テレビ登場の行（取得できたときのみ）
-        politician_line = (
-            f"**🏛️ 政治家テレビ登場**: {politician_tv}名（名簿711名中）\n"
-            if politician_tv is not None else ""
+        # 後処理: アーカイブ → 政治家登場数の更新 ‖ 累積件数 → 通知
+        # タイムアウトしたアーカイブは裏で動き続け、稼働テーブルとアーカイブの間で行が移動中になる。
+        # 件数や照合がその途中の状態を読まないよう、アーカイブの完了を requires にする
+        # （archive_old_db_records はエラーを自分で記録して返すので、スキップされるのはタイムアウト時のみ）。
+        post_run = TaskGraph(metrics=run_metrics)
+        post_run.add('archive', archive_old_db_records, timeout=POST_RUN_TIMEOUTS['archive'])
+        post_run.add(
+            'politician_hits', lambda: refresh_politician_hits(ingested_event_ids, args.politician_mode),
+            requires=['archive'],
+            timeout=POST_RUN_TIMEOUTS['politician_hits_full' if args.politician_mode == 'full' else 'politician_hits'],
+        )
+        post_run.add(
+            'cumulative_counts', lambda: get_cumulative_counts(args.count_mode),
+            requires=['archive'], timeout=POST_RUN_TIMEOUTS['cumulative_counts'],
+        )
+        post_run.add(
+            'notify',
+            lambda: send_discord_notification(build_success_message(
+                start_date, end_date, epg_count, detail_count,
+                post_run.value('cumulative_counts', ({}, set())), post_run.value('politician_hits'), post_run.problems(),
+            )),
+            after=['politician_hits', 'cumulative_counts'], timeout=POST_RUN_TIMEOUTS['notify'],
         )
+        post_run.run()
 
-        # 成功通知メッセージ（日次運用版）
-        success_message = (
-            f"✅ 番組表 日次更新が完了しました（{run_date}）。\n\n"
-            f"**📅 対象期間**: {start_date} ～ {end_date}\n"
-            f"**📊 今回の取得**:\n"
-            f"  • 番組概要: {epg_count:,}件\n"
-            f"  • 番組詳細: {detail_count:,}件\n"
-            f"**📺 対象チャンネル**: 地上波7局 + BS7局\n"
-            f"{cumulative_lines}"
-            f"{politician_line}"
-            f"**🚀 ステータス**: 日次更新 正常終了"
+        report_path = run_metrics.write_report(
+            status="success", start_date=start_date, end_date=end_date, post_run=post_run.summary()
         )
-        send_discord_notification(success_message)
+        if report_path:
+            print(f"📝 実行レポート: {report_path}")
+        metrics_exporter.close(success=True)
         
     except Exception as e:
         error_message = (
             f"🚨 番組表 日次更新でエラーが発生しました。\n\n"
             f"**エラー内容**:\n```\n{e}\n```\n\n"
             f"**対象期間**: {start_date} ～ {end_date}\n"
-            f"**対象**: 地上波7局 + BS7局"
+            f"**対象**: 地上波7局 + BS7局\n"
+            f"{run_metrics.discord_summary()}"
         )
+        report_path = run_metrics.write_report(status="error", error=str(e), start_date=start_date, end_date=end_date)
+        if report_path:
+            print(f"📝 実行レポート: {report_path}")
+        metrics_exporter.close(success=False)
         print(error_message)
         send_discord_notification(error_message)